@@ -31,6 +31,7 @@ import cogdb.query
 import cogdb.scanners
 import cogdb.scrape
 import cogdb.side
+import cogdb.side.mirror
 import cogdb.spy_squirrel as spy
 import cog.inara
 import cog.task_monitor
@@ -45,6 +46,10 @@ async def bot_shutdown(bot):  # pragma: no cover
     Shutdown the bot. Gives background jobs grace window to finish  unless empty.
     """
     logging.getLogger(__name__).error('FINAL SHUTDOWN REQUESTED')
+    if spy.SCRAPER:
+        await spy.SCRAPER.close()
+    spy.SNAPSHOTS.close()
+    await cog.util.HTTP.close()
     cog.scheduler.POOL.shutdown()
     await bot.logout()
 
@@ -815,7 +820,7 @@ If we should contact Gears or Sidewinder"""
     async def execute(self):
         try:
             func = getattr(self, self.args.subcmd)
-            with cogdb.session_scope(cogdb.SideSession) as side_session, \
+            with cogdb.session_scope(cogdb.side.mirror.session_maker()) as side_session, \
                  cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
                 response = await func(' '.join(self.args.system),
                                       side_session=side_session, eddb_session=eddb_session)
@@ -1337,6 +1342,32 @@ class KOS(Action):
             'is_friendly': self.args.is_friendly,
         })
 
+    async def search(self):
+        """
+        Search the KOS list for matching cmdrs.
+        With --inara, every match is also looked up on Inara at once, see InaraApi.fetch_profiles.
+
+        Returns: The message to send.
+        """
+        msg = f'Searching for "{self.args.term}" against known CMDRs\n\n'
+        cmdrs = cogdb.query.kos_search_cmdr(self.session, self.args.term)
+        if not cmdrs:
+            return msg + "No matches!"
+
+        lines = [['CMDR Name', 'Faction', 'Is Friendly?', 'Reason']]
+        lines += [[x.cmdr, x.squad, x.friendly, x.reason] for x in cmdrs]
+        if self.args.inara and cog.inara.HEADER_PROTO:
+            try:
+                profiles = await cog.inara.api.fetch_profiles([x.cmdr for x in cmdrs], self.msg.channel)
+                lines[0] += ['Inara Squad']
+                for line in lines[1:]:
+                    profile = profiles.get(line[0]) or {}
+                    line += [profile.get('commanderSquadron', {}).get('squadronName', '')]
+            except cog.exc.RemoteError:
+                msg = 'Inara lookup failed, showing KOS only.\n\n' + msg
+
+        return msg + cog.tbl.format_table(lines, header=True)[0]
+
     async def execute(self):
         msg = 'KOS: Invalid subcommand'
 
@@ -1354,14 +1385,7 @@ class KOS(Action):
             msg = 'KOS list refreshed from sheet.'
 
         elif self.args.subcmd == 'search':
-            msg = 'Searching for "{self.args.term}" against known CMDRs\n\n'
-            cmdrs = cogdb.query.kos_search_cmdr(self.session, self.args.term)
-            if cmdrs:
-                lines = [['CMDR Name', 'Faction', 'Is Friendly?', 'Reason']]
-                lines += [[x.cmdr, x.squad, x.friendly, x.reason] for x in cmdrs]
-                msg += cog.tbl.format_table(lines, header=True)[0]
-            else:
-                msg += "No matches!"
+            msg = await self.search()
 
         if msg:
             await self.bot.send_message(self.msg.channel, msg)
@@ -1825,7 +1849,7 @@ def time_cmd_helper():
     now = datetime.datetime.utcnow().replace(microsecond=0)
     weekly_tick = cog.util.next_weekly_tick(now)
 
-    with cogdb.session_scope(cogdb.SideSession) as side_session:
+    with cogdb.session_scope(cogdb.side.mirror.session_maker()) as side_session:
         try:
             tick = cogdb.side.next_bgs_tick(side_session, now)
         except (cog.exc.NoMoreTargets, cog.exc.RemoteError) as exc:
@@ -2528,16 +2552,21 @@ async def monitor_snipe_merits(client, *, repeat=True):  # pragma: no cover
         )
 
 
-async def push_spy_to_gal_scanner():  # pragma: no cover | tested elsewhere
+async def push_spy_to_gal_scanner(power_ids=None):  # pragma: no cover | tested elsewhere
     """
     Push spy information into the gal scanner sheet.
+
+    Args:
+        power_ids: If set, only push the sheets of these powers.
     """
     gal_scanner = cogdb.scanners.get_scanner("hudson_gal")
     with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
         powers = eddb_session.query(cogdb.eddb.Power).\
             filter(cogdb.eddb.Power.text != "None").\
-            order_by(cogdb.eddb.Power.eddn).\
-            all()
+            order_by(cogdb.eddb.Power.eddn)
+        if power_ids is not None:
+            powers = powers.filter(cogdb.eddb.Power.id.in_(power_ids))
+        powers = powers.all()
 
         loop = asyncio.get_event_loop()
         for power in powers:
@@ -2620,27 +2649,25 @@ async def monitor_powerplay_api(client, *, repeat=True, delay=1800):
         params = {'token': cog.util.CONF.scrape.token}
 
         try:
-            with cfut.ProcessPoolExecutor(max_workers=4) as pool:
-                try:
-                    if last_base != cog.util.current_cycle():
-                        last_base = cog.util.current_cycle()
-                        log.warning("Fetching base.json.")
-                        base_text = await cog.util.get_url(os.path.join(cog.util.CONF.scrape.api, 'getraw', 'base.json'), params=params)
-                        await client.loop.run_in_executor(
-                            pool, spy.load_base_json, base_text,
-                        )
-
-                    log.warning("Fetching refined.json.")
-                    ref_text = await cog.util.get_url(os.path.join(cog.util.CONF.scrape.api, 'getraw', 'refined.json'), params=params)
-                    await client.loop.run_in_executor(
-                        pool, spy.load_refined_json, ref_text,
-                    )
-                except (asyncio.CancelledError, asyncio.InvalidStateError) as exc:
-                    log.error("Error with future: %s", str(exc))
-
-            log.warning("Handle sheet updates.")
-            await push_spy_to_gal_scanner()
-            await push_spy_to_sheets()
+            changed = {}
+            try:
+                if last_base != cog.util.current_cycle():
+                    log.warning("Fetching base.json.")
+                    changed.update(await spy.SNAPSHOTS.load('base.json', parse=spy.parse_base_json, params=params))
+                    last_base = cog.util.current_cycle()
+
+                log.warning("Fetching refined.json.")
+                changed.update(await spy.SNAPSHOTS.load('refined.json', parse=spy.parse_refined_json, params=params))
+            except (asyncio.CancelledError, asyncio.InvalidStateError) as exc:
+                log.error("Error with future: %s", str(exc))
+
+            if any(changed.values()):
+                log.warning("Handle sheet updates.")
+                await push_spy_to_gal_scanner(power_ids=spy.snapshot_power_ids(changed))
+                if changed.get('systems'):
+                    await push_spy_to_sheets()
+            else:
+                log.warning("Powerplay unchanged, sheets not updated.")
 
             log.warning("Check held for federal.")
             await spy.check_federal_held()
@@ -2691,6 +2718,31 @@ async def monitor_spy_site(client, *, repeat=True, delay=900):
             working = False
 
 
+async def monitor_side_mirror(client, *, repeat=True, delay=900):
+    """
+    Sync the local mirror of side's db every delay seconds, see cogdb.side.mirror.
+
+    Until a sync completes queries of side's db go to the remote.
+
+    Args:
+        client: The discord.py client.
+        repeat: If True schedule self at end of execution to run again.
+        delay: The delay in seconds between syncs.
+    """
+    log = logging.getLogger(__name__)
+    log.warning("Started side mirror monitor.")
+
+    while True:
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, cogdb.side.mirror.sync_mirror)
+        except sqlalchemy.exc.SQLAlchemyError as exc:
+            log.error("Side mirror sync failed, will try again in %d seconds: %s", delay, str(exc))
+
+        if not repeat:
+            break
+        await asyncio.sleep(delay)
+
+
 async def report_to_leadership(client, msg, **kwargs):  # pragma: no cover
     """
     Send messages to the channel configured to receive reports.
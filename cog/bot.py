@@ -54,6 +54,7 @@ import cogdb
 import cogdb.scanners
 import cogdb.query
 import cogdb.eddb
+import cogdb.spy_squirrel
 
 
 SYNC_NOTICE = """Synchronizing sheet changes.
@@ -226,12 +227,21 @@ class CogBot(discord.Client):
                         cog.actions.monitor_powerplay_api, self, repeat=True, delay=1800,
                     ),
                     'PowerplayMonitor', 'Updates powerplay info on schedule',
+                ],
+                [
+                    functools.partial(
+                        cog.actions.monitor_side_mirror, self, repeat=True, delay=900,
+                    ),
+                    'SideMirrorMonitor', 'Syncs the local mirror of the side db',
                 ]
             ]
 
             for func, name, description in groups:
                 TASK_MON.add_task(func, name=name, description=description)
 
+            # Continue any scrapes queued before a restart
+            asyncio.ensure_future(cogdb.spy_squirrel.get_scraper().resume())
+
             # Runs right after launch after short delay, ensuring bot ready
             asyncio.ensure_future(
                 cog.actions.monitor_powerplay_api(self, repeat=False, delay=75)
@@ -88,6 +88,12 @@ class CmdAborted(UserException):
     """ Raised to cancel a multistep command. """
 
 
+class WorkerPoolFull(UserException):
+    """ Raised when a shared WorkerPool has too many jobs pending. """
+    def __init__(self, max_pending):
+        super().__init__(f"I'm very busy right now with {max_pending} jobs pending. Please try again in a few minutes.")
+
+
 class InternalException(CogException):
     """
     An internal exception that went uncaught.
@@ -29,7 +29,6 @@ try:
 except ImportError:
     import json
 
-import aiohttp
 import bs4
 import discord
 import discord.ui as dui
@@ -38,6 +37,7 @@ import cog
 import cog.exc
 import cog.util
 import cogdb
+import cogdb.query
 
 # Disable line too long, pylint: disable=C0301
 
@@ -86,9 +86,8 @@ EMPTY_INARA = 'unknown'
 INARA_SYSTEM_SEARCH = "https://inara.cz/galaxy-starsystem/?search={}"
 INARA_STATION_SEARCH = "https://inara.cz/galaxy-station/?search={}%20[{}]"  # system, station_name
 INARA_FACTION_SEARCH = "https://inara.cz/galaxy-minorfaction/?search={}"
-RATE_MAX = 12
-RATE_RESUME = 9
-RATE_WINDOW = 60  # seconds of the rate window
+BATCH_WINDOW = 0.5  # seconds lookups are collected before being sent together
+BATCH_MAX = 25  # most events sent in one request to the api
 BUT_CANCEL = 'Cancel'
 BUT_FRIENDLY = 'Friendly'
 BUT_HOSTILE = 'Hostile'
@@ -149,50 +148,112 @@ class InaraApiInput():
                                             lvl='exception') from exc
 
 
-class RateLimiter():
+class InaraBatcher():
     """
-    Implement a simple rate limiter.
-    Rate of requests will be limited to max_rate within window seconds.
-    Requests once they exceed maximum will resume when they hit the resume_rate.
+    Coalesce lookups made close together into one multi-event request to the Inara API.
+    Lookups are collected for window seconds, or until max_events are waiting, then sent as one request.
+    Each request takes one token of the rate limit, the events are fanned back to each caller.
     """
-    def __init__(self, *, max_rate, resume_rate, window=RATE_WINDOW):
-        self.window = window  # Window of the rate limiter in seconds
-        self.rate = 0  # Rate of requests in last 60 seconds
-        self.max_rate = max_rate
-        self.resume_rate = resume_rate
-        self.rate_event = asyncio.Event()
+    def __init__(self, *, rate_limit, window=BATCH_WINDOW, max_events=BATCH_MAX):
+        self.rate_limit = rate_limit
+        self.window = window
+        self.max_events = max_events
+        self.pending = []  # [(event_name, event_data, future, channel), ...]
+        self.flusher = None
 
-    async def increment(self, bot_client, channel):
+    def __repr__(self):
+        return f"InaraBatcher(window={self.window!r}, max_events={self.max_events!r}, pending={len(self.pending)!r})"
+
+    async def lookup(self, event_name, event_data, channel):
         """
-        Will increment the current rate.
-        While the current rate exceeds the max, wait for event from decrement.
+        Send an event in the next request and wait for the response to it.
+
+        Args:
+            event_name: The name of the api event, i.e. getCommanderProfile.
+            event_data: The data of the event.
+            channel: The channel to notify should the rate limit be approached.
+
+        Raises:
+            RemoteError - If response code invalid or remote unreachable (Inara itself).
+            InternalException - JSON serialization failed.
+
+        Returns: The response event, a dictionary with at least eventStatus.
         """
-        self.rate += 1
-        msg = None
+        fut = asyncio.get_event_loop().create_future()
+        self.pending += [(event_name, event_data, fut, channel)]
+        if len(self.pending) >= self.max_events:
+            asyncio.ensure_future(self.flush())
+        elif not self.flusher:
+            self.flusher = asyncio.ensure_future(self.flush(delay=self.window))
 
-        if self.rate >= self.max_rate:
-            msg = await bot_client.send_message(
-                channel, "Approaching inara rate limit, please wait a moment until we are under.")
+        return await fut
 
-        while self.rate >= self.max_rate:
-            await self.rate_event.wait()
-            self.rate_event.clear()
+    async def flush(self, *, delay=0):
+        """
+        Send all waiting lookups, at most max_events per request.
 
-        if msg:
-            await msg.delete()
+        Args:
+            delay: Seconds to wait before sending.
+        """
+        if delay:
+            await asyncio.sleep(delay)
+            self.flusher = None
 
-    async def decrement(self, delay=None):
+        while self.pending:
+            batch, self.pending = self.pending[:self.max_events], self.pending[self.max_events:]
+            try:
+                events = await self.send(batch)
+                for ind, (_, _, fut, _) in enumerate(batch):
+                    if not fut.done():
+                        fut.set_result(events[ind])
+            except Exception as exc:  # pylint: disable=broad-except
+                for _, _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+
+    async def send(self, batch):
         """
-        Will decrement the rate after delay and notify anyone waiting to resume via an event.
+        Send one request with an event for each lookup in the batch.
+
+        Args:
+            batch: The lookups to send, see pending.
+
+        Raises:
+            RemoteError - If response code invalid or remote unreachable (Inara itself).
+            InternalException - JSON serialization failed.
+
+        Returns: The response events in the order of the batch.
         """
-        if not delay:
-            delay = self.window
+        api_input = InaraApiInput()
+        for ind, (event_name, event_data, _, _) in enumerate(batch):
+            api_input.add_event(event_name, event_data)
+            api_input.events[-1]["eventCustomID"] = ind
+
+        # Ensure we don't flood inara, they have low rate.
+        msg = None
+        if self.rate_limit.would_wait():
+            msg = await cog.util.BOT.send_message(
+                batch[0][-1], "Approaching inara rate limit, please wait a moment until we are under.")
+        try:
+            await self.rate_limit.acquire()
+        finally:
+            if msg:
+                await msg.delete()
 
-        await asyncio.sleep(delay)
+        async with cog.util.HTTP.session().post(API_ENDPOINT, data=api_input.serialize(),
+                                                headers=API_HEADERS) as resp:
+            if resp.status != 200:
+                raise cog.exc.RemoteError(f"Inara search failed. HTTP Response code bad: {resp.status}")
+            response_json = await resp.json(loads=wrap_json_loads)
 
-        self.rate -= 1
-        if self.rate <= self.resume_rate:
-            self.rate_event.set()
+        # check if api accepted our request.
+        r_code = response_json["header"]["eventStatus"]
+        events = response_json.get("events", [])
+        if r_code == API_RESPONSE_CODES["error"] or r_code not in API_RESPONSE_CODES.values() or len(events) != len(batch):
+            logging.getLogger(__name__).error("INARA Response Failure: \n%s", response_json)
+            raise cog.exc.RemoteError(f"Inara search failed. See log for details. API Response code bad: {r_code}")
+
+        return sorted(events, key=lambda x: x.get("eventCustomID", 0))
 
 
 class InaraApi():
@@ -203,7 +264,8 @@ class InaraApi():
     def __init__(self):
         self.req_counter = 0  # count how many searches done with search_in_inara
         self.waiting_messages = {}  # 'Searching in inara.cz' messages. keys are req_id.
-        self.rate_limit = RateLimiter(max_rate=RATE_MAX, resume_rate=RATE_RESUME)
+        self.rate_limit = cog.util.rate_limit('inara')
+        self.batcher = InaraBatcher(rate_limit=self.rate_limit)
 
     async def delete_waiting_message(self, req_id):  # pragma: no cover
         """ Delete the message which informs user about start of search """
@@ -248,6 +310,53 @@ class InaraApi():
             if not kos_embeds:
                 return await self.should_cmdr_be_on_kos(exc.req_id, looking_for_cmdr, msg)
 
+    async def fetch_profiles(self, cmdr_names, channel):
+        """
+        Fetch the Inara profiles of many cmdrs at once, no user interaction.
+        Cached profiles are read in one query, the rest are sent in as few requests as the batcher allows.
+
+        Args:
+            cmdr_names: The names of the cmdrs to look up.
+            channel: The channel to notify should the rate limit be approached.
+
+        Raises:
+            RemoteError - If response code invalid or remote unreachable (Inara itself).
+
+        Returns: A dictionary of name -> event_data of the best match, None when there was no match.
+        """
+        names = list(dict.fromkeys(cmdr_names))
+        found = await cache_get('profile', names)
+        missing = [name for name in names if name not in found]
+        profiles = await asyncio.gather(*[self.lookup_profile(name, channel, use_cache=False) for name in missing])
+        found.update(zip(missing, profiles))
+
+        return {name: found[name] for name in names}
+
+    async def lookup_profile(self, cmdr_name, channel, *, use_cache=True):
+        """
+        Look up the Inara profile of a cmdr, the cache is consulted before the api.
+        Both found profiles and lookups that found nothing are cached, see InaraCache.
+
+        Args:
+            cmdr_name: The name of the cmdr to search for.
+            channel: The channel to notify should the rate limit be approached.
+            use_cache: When False, skip reading the cache. The result is still cached.
+
+        Raises:
+            RemoteError - If response code invalid or remote unreachable (Inara itself).
+
+        Returns: The event_data of the best match, None when there was no match.
+        """
+        cached = await cache_get('profile', [cmdr_name]) if use_cache else {}
+        if cmdr_name in cached:
+            return cached[cmdr_name]
+
+        event = await self.batcher.lookup("getCommanderProfile", {"searchName": cmdr_name}, channel)
+        event_data = event.get("eventData") if event["eventStatus"] != API_RESPONSE_CODES["no result"] else None
+        await cache_put('profile', cmdr_name, event_data)
+
+        return event_data
+
     async def search_with_api(self, looking_for_cmdr, msg, ignore_multiple_match=False):
         """
         Search for a commander on Inara.
@@ -278,39 +387,15 @@ class InaraApi():
         req_id = self.req_counter
         self.req_counter = (self.req_counter + 1) % 1000
         try:
-            # Ensure we don't flood inara, they have low rate.
-            await self.rate_limit.increment(cog.util.BOT, msg.channel)
-
             # inform user about initiating the search.
             self.waiting_messages[req_id] = await cog.util.BOT.send_message(msg.channel,
                                                                             "Searching inara.cz ...")
 
-            api_input = InaraApiInput()
-            api_input.add_event("getCommanderProfile", {"searchName": looking_for_cmdr})
-
-            # search for commander
-            async with aiohttp.ClientSession() as http:
-                async with http.post(API_ENDPOINT, data=api_input.serialize(),
-                                     headers=API_HEADERS) as resp:
-                    if resp.status != 200:
-                        raise cog.exc.RemoteError(f"Inara search failed. HTTP Response code bad: {resp.status}")
-                    response_json = await resp.json(loads=wrap_json_loads)
-
-            # after here many things are unorthodox due api structure.
-            # check if api accepted our request.
-            r_code = response_json["header"]["eventStatus"]
-
-            # handle rejection.
-            if r_code == API_RESPONSE_CODES["error"] or r_code not in API_RESPONSE_CODES.values():
-                logging.getLogger(__name__).error("INARA Response Failure: \n%s", response_json)
-                raise cog.exc.RemoteError("Inara search failed. See log for details. API Response code bad: {r_code}")
-
-            event = response_json["events"][0]
-            if event["eventStatus"] == API_RESPONSE_CODES["no result"]:
+            # search for commander, sent with any other lookups waiting
+            event_data = await self.lookup_profile(looking_for_cmdr, msg.channel)
+            if not event_data:
                 raise InaraNoResult(f"No matching CMDR on Inara for: {looking_for_cmdr}", req_id)
 
-            event_data = event["eventData"]
-
             # fetch commander name, use userName if there is no commanderName set
             inara_cmdr_name = event_data.get("commanderName", event_data["userName"])
             inara_result = {
@@ -341,7 +426,6 @@ class InaraApi():
             # it will search using returned names, so ignore multiple match this time.
             return await self.search_with_api(selected_cmdr, msg, ignore_multiple_match=True)
         finally:
-            asyncio.ensure_future(self.rate_limit.decrement())
             try:
                 # Delete waiting message regardless of what happens.
                 await self.delete_waiting_message(req_id)
@@ -512,7 +596,13 @@ async def squad_details_embed(event_data, cmdr):
     cmdr["squad_rank"] = squad_data.get("squadronMemberRank", cmdr["squad_rank"])
     cmdr["squad_count"] = squad_data.get("squadronMembersCount", cmdr["squad_count"])
 
-    extra = await inara_squad_parse(squad_data['inaraURL'])
+    url = squad_data['inaraURL']
+    cached = await cache_get('squad', [url])
+    if url in cached:
+        extra = cached[url]
+    else:
+        extra = await inara_squad_parse(url)
+        await cache_put('squad', url, extra)
     return discord.Embed.from_dict({
         'color': PP_COLORS.get(extra[2]["value"], PP_COLORS['default']),
         'author': {
@@ -560,10 +650,9 @@ async def inara_squad_parse(url):
     }
     # Squadron information moved to an about page, redirect request
     url = url.replace('/squadron/', '/squadron-about/')
-    async with aiohttp.ClientSession() as http:
-        async with http.get(url) as resp:
-            text = await resp.text()
-            soup = bs4.BeautifulSoup(text, 'html.parser')
+    async with cog.util.HTTP.session().get(url) as resp:
+        text = await resp.text()
+        soup = bs4.BeautifulSoup(text, 'html.parser')
 
     # Content seems split amongst divs, iterate them all
     for div in soup.find_all('div', class_='incontent'):
@@ -792,6 +881,49 @@ def kos_report_cmdr_embed(reporter, kos_info):
     })
 
 
+def cache_get_sync(kind, keys):
+    """
+    Get the fresh results of previous lookups on inara.cz in one query, see cogdb.schema.InaraCache.
+    Blocks on the database, from the event loop use cache_get.
+
+    Args:
+        kind: The kind of lookup, i.e. 'profile'.
+        keys: The search terms or ids looked up.
+
+    Returns: A dictionary of key -> result for keys with a fresh result, None if the lookup found nothing.
+    """
+    with cogdb.session_scope(cogdb.Session) as session:
+        return cogdb.query.inara_cache_get_many(session, kind, keys)
+
+
+def cache_put_sync(kind, key, payload):
+    """
+    Cache the result of a lookup on inara.cz, see cogdb.schema.InaraCache.
+    Blocks on the database, from the event loop use cache_put.
+
+    Args:
+        kind: The kind of lookup, i.e. 'profile'.
+        key: The search term or id looked up.
+        payload: The result, None if the lookup found nothing.
+    """
+    with cogdb.session_scope(cogdb.Session) as session:
+        cogdb.query.inara_cache_put(session, kind, key, payload)
+
+
+async def cache_get(kind, keys):
+    """
+    Run cache_get_sync in an executor so the event loop is not blocked.
+    """
+    return await asyncio.get_event_loop().run_in_executor(None, cache_get_sync, kind, keys)
+
+
+async def cache_put(kind, key, payload):
+    """
+    Run cache_put_sync in an executor so the event loop is not blocked.
+    """
+    await asyncio.get_event_loop().run_in_executor(None, cache_put_sync, kind, key, payload)
+
+
 def wrap_json_loads(string):
     """ Loads JSON. Make aiohttp use this function for custom exceptions. """
     try:
@@ -800,12 +932,13 @@ def wrap_json_loads(string):
         raise cog.exc.RemoteError('Inara API responded with bad JSON.') from exc
 
 
-async def fetch_inara_info(inara_cmdr_id):
+async def fetch_inara_info(inara_cmdr_id, *, use_cache=True):
     """
     Get information on a CMDRs public inara.cz page.
 
     Args:
         inara_cmdr_id: The integer ID of the inara.cz CMDR.
+        use_cache: When False, skip reading the cache. The result is still cached.
 
     Raises:
         cog.exc.RemoteError: Failed to connect to inara.cz to scrape info.
@@ -813,6 +946,10 @@ async def fetch_inara_info(inara_cmdr_id):
 
     Returns: inara_info: A dictionary with the required information.
     """
+    cached = await cache_get('page', [inara_cmdr_id]) if use_cache else {}
+    if inara_cmdr_id in cached:
+        return cached[inara_cmdr_id]
+
     page_src = await cog.util.get_url(f'https://inara.cz/elite/cmdr/{inara_cmdr_id}')
     soup = bs4.BeautifulSoup(page_src, 'html.parser')
     header_td = soup.find('td', class_='header')
@@ -833,6 +970,7 @@ async def fetch_inara_info(inara_cmdr_id):
             })
     except (TypeError, ValueError):
         pass
+    await cache_put('page', inara_cmdr_id, inara_info)
 
     return inara_info
 
@@ -428,6 +428,8 @@ def subs_kos(subs, prefix):
         Request whitelisting a friendly.
 **{prefix}kos search user_name**
         Search for a user, list all possible matching users.
+**{prefix}kos search user_name --inara**
+        As above, also show the current Inara squadron of every match.
 **{prefix}kos pull**
         Pull all changes from sheet. Mainly to be used after modifying list.
     """
@@ -443,6 +445,7 @@ def subs_kos(subs, prefix):
     subcmd.add_argument('--friendly', dest='is_friendly', default=False, action='store_true', help='Report user to kill.')
     subcmd = subcmds.add_parser('search', help='Search for a user.')
     subcmd.add_argument('term', help='The username to look for.')
+    subcmd.add_argument('-i', '--inara', action='store_true', help='Also look up every match on Inara.')
     subcmd = subcmds.add_parser('pull', help='Pull data from sheet.')
 
 
@@ -1,7 +1,7 @@
 """
 Implements a very simple scheduler for updating the sheets when they change.
 
-  - Uses rpc logic that wakes up scheduler on loop. Subscribes to POSTs.
+  - Uses rpc logic that wakes up scheduler on loop. Serves POSTs relayed by web.app and acknowledges them.
   - Updater logic to schedule jobs with the executor pool.
   - Scheduler registers scanners and commands to block during update.
 """
@@ -39,6 +39,7 @@ class Scheduler(aiozmq.rpc.AttrHandler, cog.util.ReprMixin):
         self.delay = delay  # Seconds of timeout before running actual update
         self.wrap_map = {}
         self.cmd_map = {}
+        self.last_posts = {}  # scanner -> timestamp of last POST scheduled
 
     def __str__(self):
         msg = f"### Schedule ###\n\n\tDelay: {self.delay}"
@@ -130,14 +131,30 @@ class Scheduler(aiozmq.rpc.AttrHandler, cog.util.ReprMixin):
             self.schedule(name, delay)
 
     @aiozmq.rpc.method
-    def remote_func(self, scanner, timestamp):  # pragma: no cover
-        """ Remote function to be executed. """
+    def remote_func(self, scanner, timestamp):
+        """
+        Remote function called by web.app when a sheet changed.
+        Delivery is at least once, a POST already scheduled is acknowledged without scheduling again.
+
+        Args:
+            scanner: The name of the scanner to schedule.
+            timestamp: The time of the change sent with the POST.
+
+        Returns: True, acknowledges the POST was received.
+        """
+        log = logging.getLogger(__name__)
+        if self.last_posts.get(scanner) == timestamp:
+            log.info('POST duplicate ignored: %s %s', scanner, timestamp)
+            return True
+
         self.count = (self.count + 1) % 1000
-        logging.getLogger(__name__).info(
-            'POST %d received: %s %s', self.count, scanner, timestamp)
+        self.last_posts[scanner] = timestamp
+        log.info('POST %d received: %s %s', self.count, scanner, timestamp)
         self.schedule(scanner)
         print('SCHEDULED: ', scanner, timestamp)
 
+        return True
+
     def close(self):  # pragma: no cover
         """ Properly close pubsub connection on termination. """
         if self.sub and self.count != -1:
@@ -145,12 +162,10 @@ class Scheduler(aiozmq.rpc.AttrHandler, cog.util.ReprMixin):
             time.sleep(0.5)
 
     async def connect_sub(self):  # pragma: no cover
-        """ Connect the zmq subscriber. """
-        channel = 'POSTs'
-        self.sub = await aiozmq.rpc.serve_pubsub(self, subscribe=channel,
-                                                 connect=ADDR, log_exceptions=True)
+        """ Connect the zmq rpc server, web.app binds and relays POSTs to it. """
+        self.sub = await aiozmq.rpc.serve_rpc(self, connect=ADDR, log_exceptions=True)
         atexit.register(self.close)
-        print(f"Scheduler Subscribed to: {ADDR} with tag '{channel}'")
+        print(f"Scheduler serving POSTs from: {ADDR}")
         print(aiozmq.rpc.logger)
 
 
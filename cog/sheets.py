@@ -198,7 +198,7 @@ class AsyncGSheet():
         """
         IMPORTANT: Call this before any other calls made to sheet.
         """
-        sclient = await AGCM.authorize()
+        sclient = await authorize()
         self.document = await sclient.open_by_key(self.sheet_id)
         self.worksheet = await self.document.worksheet(self.sheet_page)
         logging.getLogger(__name__).info("GSHEET Finished init for %s, set to '%s'",
@@ -209,7 +209,7 @@ class AsyncGSheet():
         Change to a new worksheet.
         """
         self.sheet_page = sheet_page
-        await AGCM.authorize()
+        await authorize()
         self.worksheet = await self.document.worksheet(self.sheet_page)
 
     async def batch_clear(self, cells):
@@ -219,7 +219,7 @@ class AsyncGSheet():
         Args:
             cells: List of A1 format like [A1:B2, C12, C4:D8, ...]
         """
-        await AGCM.authorize()
+        await authorize()
         return await self.worksheet.batch_clear(cells)
 
     async def batch_get(self, cells, dim='ROWS', value_render='UNFORMATTED_VALUE'):
@@ -232,7 +232,7 @@ class AsyncGSheet():
             value_render: The rendering option to format the data in.
                                By default, unformatted will only return the data.
         """
-        await AGCM.authorize()
+        await authorize()
         return await self.worksheet.batch_get(cells, major_dimension=dim,
                                               value_render_option=value_render)
 
@@ -250,7 +250,7 @@ class AsyncGSheet():
             resp_value_render: The rendering option to format the data in.
                           By default, unformatted will only return the data.
         """
-        await AGCM.authorize()
+        await authorize()
         await self.worksheet.batch_update(data, value_input_option=input_opt,
                                           response_value_render_option=resp_value_render)
 
@@ -263,7 +263,7 @@ class AsyncGSheet():
             value_render: The rendering option to format the data in.
                           By default, unformatted will only return the data.
         """
-        await AGCM.authorize()
+        await authorize()
         return await self.worksheet.col_values(col_index, value_render_option=value_render)
 
     async def values_row(self, row_index, value_render='UNFORMATTED_VALUE'):
@@ -275,7 +275,7 @@ class AsyncGSheet():
             value_render: The rendering option to format the data in.
                           By default, unformatted will only return the data.
         """
-        await AGCM.authorize()
+        await authorize()
         return await self.worksheet.row_values(row_index, value_render_option=value_render)
 
     async def cells_get(self, a1_range):
@@ -287,7 +287,7 @@ class AsyncGSheet():
 
         Returns: A list of cells.
         """
-        await AGCM.authorize()
+        await authorize()
         return await self.worksheet.range(a1_range)
 
     async def cells_update(self, cells, input_opt='RAW'):
@@ -299,7 +299,7 @@ class AsyncGSheet():
             input_opt: Default is 'RAW', store data as it exists.
                        'USER_ENTERED' would parse data as if entered in sheet.
         """
-        await AGCM.authorize()
+        await authorize()
         await self.worksheet.update_cells(cells, value_input_option=input_opt)
 
     async def whole_sheet(self):
@@ -311,7 +311,7 @@ class AsyncGSheet():
         Args:
             update_indices: When True, update the sheets last indices based on new sheet.
         """
-        await AGCM.authorize()
+        await authorize()
         return await self.worksheet.get_all_values()
 
         # TODO: An idea, returns non-square table, need to pad up to expected.
@@ -327,7 +327,7 @@ class AsyncGSheet():
             duplicate_sheet_page (string): Sheet page name to duplicate.
             new_name (string): Newly duplicated sheet page name.
         """
-        await AGCM.authorize()
+        await authorize()
         template_worksheet = await self.document.worksheet(duplicate_sheet_page)
         return await self.document.duplicate_sheet(template_worksheet.id, new_sheet_name=new_name)
 
@@ -337,11 +337,21 @@ class AsyncGSheet():
         Args:
             page_name (string): Sheet page name to delete.
         """
-        await AGCM.authorize()
+        await authorize()
         delete_page = await self.document.worksheet(page_name)
         return await self.document.del_worksheet(delete_page)
 
 
+async def authorize():
+    """
+    Wait on the rate limit shared by all requests to the sheets API, then authorize.
+
+    Returns: The authorized gspread_asyncio client.
+    """
+    await cog.util.rate_limit('sheets').acquire()
+    return await AGCM.authorize()
+
+
 def init_agcm(json_secret, loop=None):
     """
     Initialize the global AGCM, share with all sheets.
@@ -3,6 +3,7 @@ Utility functions
 -----------------
     BOT - Global reference to cog.bot.CogBot set post startup.
     CONF - The global configuration object, manages the file on change.
+    HTTP - The HTTPClient shared by all requests of the process.
     rel_to_abs - Convert relative paths to rooted at project ones.
     init_logging - Project wide logging initialization.
     msg_splitter - Long message splitter, not ideal.
@@ -12,6 +13,7 @@ import asyncio
 import concurrent.futures as cfut
 import contextlib
 import datetime
+import functools
 import hashlib
 import json
 import logging
@@ -23,6 +25,8 @@ import re
 import shutil
 import sys
 import tempfile
+import threading
+import time
 import zipfile
 
 import aiofiles
@@ -62,6 +66,7 @@ HEX_MAP.update({str(x): x for x in range(0, 10)})
 REV_HEX_MAP = {val: key for key, val in HEX_MAP.items()}
 TIME_STRP = "%Y-%m-%dT%H:%M:%SZ"
 TIME_STRP_MICRO = "%Y-%m-%dT%H:%M:%S.%fZ"
+TIMESTAMP_FRACTION = re.compile(r"\.(\d+)(?=[Zz+-]|$)")  # Fractional seconds of an ISO 8601 timestamp
 FNAME_FORBIDDEN = [
     '/', '\\', '<', '>', ':', '-', '|', '?', '*', '\0',
     '[', ']', '(', ')', '{', '}',
@@ -69,6 +74,21 @@ FNAME_FORBIDDEN = [
 DISCORD_RATE_LIMIT = 1  # Seconds
 DISCORD_FILE_LIMIT = 7.5 * 1024 ** 2  # Stay safely under 8MB limit
 DISCORD_TIMEOUT = 300
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read per chunk when streaming downloads
+WORKER_POOL_QUEUE = 16  # Jobs allowed to wait for a free worker in a WorkerPool
+# The shared HTTPClient, every setting may be overridden under http in the config
+HTTP_LIMIT = 100  # Connections open at once across all hosts
+HTTP_LIMIT_PER_HOST = 10
+HTTP_DNS_TTL = 300  # Seconds
+HTTP_CONNECT_TIMEOUT = 15  # Seconds
+HTTP_READ_TIMEOUT = 60  # Seconds between chunks read
+# Default limits of the external APIs, rate in requests per second, see rate_limit
+RATE_LIMITS = {
+    'inara': {'rate': 12 / 60, 'capacity': 6},  # Inara bans for more than 25 requests a minute
+    'sheets': {'rate': 50 / 60, 'capacity': 10},  # Google allows 60 requests a minute per user
+    'spy': {'rate': 1 / 60, 'capacity': 2},
+}
+RATE_LIMITERS = {}  # name -> TokenBucket shared by all requests to the API
 
 
 class ReprMixin():
@@ -242,6 +262,284 @@ class WaitCB():
             await self.resume_cb()
 
 
+def worker_pid(_=None):
+    """
+    Trivial job to run on a worker, returns the pid of the worker.
+    """
+    return os.getpid()
+
+
+class WorkerPool(cfut.ProcessPoolExecutor):
+    """
+    A long lived process pool meant to be shared for the lifetime of a bot.
+
+    - Call warm() once to start all workers so jobs don't pay for interpreter start up.
+    - At most max_workers + max_queued jobs may be pending, past that submit raises WorkerPoolFull.
+    - Metrics are kept per job name, where the name is the function submitted.
+    Can be used anywhere a ProcessPoolExecutor is, including loop.run_in_executor.
+    """
+    def __init__(self, max_workers=None, *, max_queued=WORKER_POOL_QUEUE, **kwargs):
+        super().__init__(max_workers=max_workers, **kwargs)
+        self.max_pending = self._max_workers + max_queued
+        self.pending = 0
+        self.metrics = {}
+        self.metrics_lock = threading.Lock()
+
+    def __str__(self):
+        lines = [f"Pending: {self.pending}/{self.max_pending}"]
+        with self.metrics_lock:
+            for name, stats in sorted(self.metrics.items()):
+                avg = stats['total'] / stats['count'] if stats['count'] else 0
+                lines += [f"    {name}: count {stats['count']}, failed {stats['failed']}, "
+                          f"avg {avg:.2f}s, max {stats['max']:.2f}s"]
+
+        return '\n'.join(lines)
+
+    async def warm(self):
+        """
+        Start all workers in the pool up front.
+
+        Returns: The set of pids of workers that ran the warm up jobs.
+        """
+        loop = asyncio.get_event_loop()
+        return set(await asyncio.gather(
+            *[loop.run_in_executor(self, worker_pid) for _ in range(self._max_workers)]
+        ))
+
+    def submit(self, fn, /, *args, **kwargs):  # pylint: disable=arguments-differ
+        """
+        Submit a job to the pool, same as ProcessPoolExecutor.submit.
+
+        Raises:
+            cog.exc.WorkerPoolFull - There are too many jobs pending.
+
+        Returns: A concurrent.futures.Future for the job.
+        """
+        with self.metrics_lock:
+            if self.pending >= self.max_pending:
+                raise cog.exc.WorkerPoolFull(self.max_pending)
+            self.pending += 1
+
+        name = getattr(getattr(fn, 'func', fn), '__name__', str(fn))
+        try:
+            fut = super().submit(fn, *args, **kwargs)
+        except Exception:
+            with self.metrics_lock:
+                self.pending -= 1
+            raise
+        fut.add_done_callback(functools.partial(self.job_done, name=name, started=time.time()))
+
+        return fut
+
+    def job_done(self, fut, *, name, started):
+        """
+        Callback for finished jobs, records the metrics for the job.
+
+        Args:
+            fut: The finished future.
+            name: The name of the job.
+            started: The time the job was submitted.
+        """
+        elapsed = time.time() - started
+        failed = fut.cancelled() or fut.exception() is not None
+        with self.metrics_lock:
+            self.pending -= 1
+            stats = self.metrics.setdefault(name, {'count': 0, 'failed': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['failed'] += int(failed)
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+
+        logging.getLogger(__name__).debug("WorkerPool job %s finished in %.2fs, failed: %s", name, elapsed, failed)
+
+
+class TokenBucket():
+    """
+    Limit the rate of an operation with a token bucket.
+    Tokens refill continuously at rate per second up to capacity, every acquire takes one token.
+    A full bucket allows a burst of capacity operations before the rate applies.
+
+    Waiters are served first in first out. A waiter cancelled while waiting takes no token.
+    The lock is created on first acquire so a bucket made at import is not bound to another loop.
+    """
+    def __init__(self, *, rate, capacity=1, name=None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.lock = None
+        self.waiting = 0  # Callers blocked in acquire
+        self.acquired = 0  # Tokens taken in total
+        self.waited = 0  # Seconds callers spent waiting in total
+
+    def __repr__(self):
+        return f"TokenBucket(rate={self.rate!r}, capacity={self.capacity!r}, tokens={self.tokens!r}, name={self.name!r})"
+
+    def __str__(self):
+        status = self.status()
+        return f"{self.name or 'TokenBucket'}: {status['tokens']:.1f}/{self.capacity} tokens, "\
+               f"{status['waiting']} waiting, {status['acquired']} acquired, waited {status['waited']:.1f}s"
+
+    def refill(self):
+        """
+        Add the tokens accrued since last refill.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def delay(self):
+        """
+        Returns: The seconds until a token is available, 0 if one is available now.
+        """
+        self.refill()
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def would_wait(self):
+        """
+        Returns: True if an acquire now would have to wait.
+        """
+        return bool(self.waiting or self.delay())
+
+    def status(self):
+        """
+        Returns: A dictionary with the current state and the totals of the bucket.
+        """
+        self.refill()
+        return {
+            'tokens': self.tokens,
+            'waiting': self.waiting,
+            'acquired': self.acquired,
+            'waited': self.waited,
+        }
+
+    async def acquire(self):
+        """
+        Take a token, waiting until one is available. Waiters are served in order.
+        """
+        if not self.lock:
+            self.lock = asyncio.Lock()
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self.lock:
+                wait = self.delay()
+                while wait:
+                    await asyncio.sleep(wait)
+                    wait = self.delay()
+                self.tokens -= 1
+                self.acquired += 1
+        finally:
+            self.waiting -= 1
+            self.waited += time.monotonic() - start
+
+
+def rate_limit(name):
+    """
+    Get the TokenBucket shared by every request to an external API.
+    The defaults in RATE_LIMITS are overridden by the rate_limits section of the config.
+
+    Args:
+        name: The name of the API, a key of RATE_LIMITS.
+
+    Returns: The TokenBucket of the API.
+    """
+    if name not in RATE_LIMITERS:
+        conf = CONF.rate_limits.unwrap if CONF.rate_limits else {}
+        settings = {**RATE_LIMITS[name], **conf.get(name, {})}
+        RATE_LIMITERS[name] = TokenBucket(name=name, rate=settings['rate'], capacity=settings['capacity'])
+
+    return RATE_LIMITERS[name]
+
+
+class HTTPClient():
+    """
+    One long lived aiohttp.ClientSession shared by all requests of the process.
+    Connections are kept alive and pooled with a limit per host, DNS lookups are cached
+    and responses are transparently decompressed.
+
+    The session is created on first use in the running loop and recreated if closed.
+    """
+    def __init__(self):
+        self.http = None
+        self.loop = None
+        self.settings = {}
+
+    def __repr__(self):
+        return f"HTTPClient(http={self.http!r}, settings={self.settings!r})"
+
+    def timeout(self, *, read=None):
+        """
+        Create the timeout for a request, a request timeout replaces that of the session.
+
+        Args:
+            read: The seconds to wait between chunks read, default is the configured read_timeout.
+
+        Returns: An aiohttp.ClientTimeout.
+        """
+        if not self.settings:
+            self.configure()
+
+        return aiohttp.ClientTimeout(
+            total=None, sock_connect=self.settings['connect_timeout'],
+            sock_read=read if read is not None else self.settings['read_timeout'],
+        )
+
+    def configure(self):
+        """
+        Load the settings from the config, falling back on the module defaults.
+        """
+        conf = CONF.http.unwrap if CONF.http else {}
+        self.settings = {
+            'limit': conf.get('limit', HTTP_LIMIT),
+            'limit_per_host': conf.get('limit_per_host', HTTP_LIMIT_PER_HOST),
+            'dns_ttl': conf.get('dns_ttl', HTTP_DNS_TTL),
+            'connect_timeout': conf.get('connect_timeout', HTTP_CONNECT_TIMEOUT),
+            'read_timeout': conf.get('read_timeout', HTTP_READ_TIMEOUT),
+        }
+
+    def session(self):
+        """
+        Get the shared session, create it if needed. Must be called within the running loop.
+
+        Returns: An aiohttp.ClientSession.
+        """
+        loop = asyncio.get_running_loop()
+        if not self.http or self.http.closed or self.loop is not loop:
+            self.configure()
+            connector = aiohttp.TCPConnector(
+                limit=self.settings['limit'], limit_per_host=self.settings['limit_per_host'],
+                ttl_dns_cache=self.settings['dns_ttl'],
+            )
+            self.http = aiohttp.ClientSession(connector=connector, timeout=self.timeout(), auto_decompress=True,
+                                              headers={'Accept-Encoding': 'gzip, deflate'})
+            self.loop = loop
+
+        return self.http
+
+    async def close(self):
+        """
+        Close the session and all pooled connections.
+        """
+        if self.http and not self.http.closed and self.loop is asyncio.get_running_loop():
+            await self.http.close()
+        self.http = None
+        self.loop = None
+
+
+def pool_or_temporary(pool=None):
+    """
+    Use the pool provided if present, otherwise a single worker pool that is shut down on exit.
+
+    Args:
+        pool: A ProcessPoolExecutor or None.
+
+    Returns: A context manager that yields a ProcessPoolExecutor.
+    """
+    return contextlib.nullcontext(pool) if pool else cfut.ProcessPoolExecutor(max_workers=1)
+
+
 # TODO: Name? This isn't the fuzzy find but I crap at naming.
 def fuzzy_find(needle, stack, *, obj_attr=DUMMY_ATTRIBUTE, obj_type='String', ignore_case=True, skip_spaces=True):
     """Search for needle in stack with optional flags.
@@ -373,12 +671,11 @@ async def pastebin_login(dev_key, user, pword):  # pragma: no cover
         "api_user_name": user,
         "api_user_password": pword,
     }
-    async with aiohttp.ClientSession() as http:
-        async with http.post(PASTE_LOGIN, data=data) as resp:
-            if resp.status != 200:
-                raise cog.exc.RemoteError("Pastebin upload failed!")
+    async with HTTP.session().post(PASTE_LOGIN, data=data) as resp:
+        if resp.status != 200:
+            raise cog.exc.RemoteError("Pastebin upload failed!")
 
-            return await resp.text()
+        return await resp.text()
 
 
 async def pastebin_upload(dev_key, title, content, session=None):  # pragma: no cover
@@ -398,12 +695,11 @@ async def pastebin_upload(dev_key, title, content, session=None):  # pragma: no
     if session:
         data["api_user_key"] = session
 
-    async with aiohttp.ClientSession() as http:
-        async with http.post(PASTE_UPLOAD, data=data) as resp:
-            if resp.status != 200:
-                raise cog.exc.RemoteError("Pastebin upload failed!")
+    async with HTTP.session().post(PASTE_UPLOAD, data=data) as resp:
+        if resp.status != 200:
+            raise cog.exc.RemoteError("Pastebin upload failed!")
 
-            return await resp.text()
+        return await resp.text()
 
 
 async def pastebin_new_paste(title, content):  # pragma: no cover
@@ -624,6 +920,31 @@ def current_cycle():
     return (datetime.datetime.utcnow() - WEEK_ZERO).days // 7
 
 
+def parse_timestamp(text):
+    """
+    Parse an ISO 8601 timestamp, like those of EDDN, into a UTC timezone AWARE datetime.
+    Fractional seconds are optional, timestamps without an offset are assumed UTC.
+    The text is normalized first, before python 3.11 fromisoformat rejects a trailing 'Z'
+    and fractions of other than 3 or 6 digits.
+
+    Args:
+        text: The timestamp string.
+
+    Returns: A datetime object in UTC.
+
+    Raises:
+        ValueError: The text is not a timestamp.
+    """
+    text = TIMESTAMP_FRACTION.sub(lambda mat: '.' + mat.group(1)[:6].ljust(6, '0'), text.strip())
+    if text.endswith(('Z', 'z')):
+        text = text[:-1] + '+00:00'
+    parsed_time = datetime.datetime.fromisoformat(text)
+    if parsed_time.tzinfo is None:
+        return parsed_time.replace(tzinfo=datetime.timezone.utc)
+
+    return parsed_time.astimezone(datetime.timezone.utc)
+
+
 def cycle_to_start(cycle_number):
     """
     Returns: The starting datetime of cycle_number.
@@ -673,27 +994,63 @@ def hex_encode(line):
     return "".join(encs)
 
 
-async def get_url(url, params=None):
+async def get_url(url, params=None, *, timeout=None):
     """Get a url asynchronously and return the textual response.
 
-    Using aiohttp, make a single request for a page.
+    Using the shared HTTP session, make a single request for a page.
 
     Args:
         url: The full URL to GET.
         params: The optional params to append to the URL. Of form: [('key1', 'value1'), ...]
+        timeout: The read timeout, default is that of the HTTP session.
 
     Raises:
         cog.exc.RemoteError: The remote did not respond, likely down.
     """
-    async with aiohttp.ClientSession(read_timeout=0) as http:
-        try:
-            async with http.get(url, params=params) as resp:
-                if resp.status != 200:
-                    raise cog.exc.RemoteError(f"Failed to GET from remote site [{url}]: {resp.status}")
+    try:
+        async with HTTP.session().get(url, params=params, timeout=HTTP.timeout(read=timeout)) as resp:
+            if resp.status != 200:
+                raise cog.exc.RemoteError(f"Failed to GET from remote site [{url}]: {resp.status}")
+
+            return await resp.text()
+    except aiohttp.ClientError as exc:
+        raise cog.exc.RemoteError("Some unexpected failure on GET.") from exc
+
+
+async def get_url_conditional(url, params=None, *, validators=None, timeout=None):
+    """Get a url asynchronously only if it changed since it was last fetched.
 
-                return await resp.text()
-        except aiohttp.ClientError as exc:
-            raise cog.exc.RemoteError("Some unexpected failure on GET.") from exc
+    The validators returned by the last fetch are sent as If-None-Match and If-Modified-Since,
+    a remote that supports either responds 304 when unchanged without sending the content.
+
+    Args:
+        url: The full URL to GET.
+        params: The optional params to append to the URL. Of form: [('key1', 'value1'), ...]
+        validators: The validators returned by the last call for url, None fetches unconditionally.
+        timeout: The read timeout, default is that of the HTTP session.
+
+    Raises:
+        cog.exc.RemoteError: The remote did not respond, likely down.
+
+    Returns: (text, validators), text is None when the remote reports the url unchanged.
+    """
+    validators = validators if validators else {}
+    headers = {}
+    if validators.get('ETag'):
+        headers['If-None-Match'] = validators['ETag']
+    if validators.get('Last-Modified'):
+        headers['If-Modified-Since'] = validators['Last-Modified']
+
+    try:
+        async with HTTP.session().get(url, params=params, headers=headers, timeout=HTTP.timeout(read=timeout)) as resp:
+            if resp.status == 304:
+                return None, validators
+            if resp.status != 200:
+                raise cog.exc.RemoteError(f"Failed to GET from remote site [{url}]: {resp.status}")
+
+            return await resp.text(), {x: resp.headers[x] for x in ('ETag', 'Last-Modified') if x in resp.headers}
+    except aiohttp.ClientError as exc:
+        raise cog.exc.RemoteError("Some unexpected failure on GET.") from exc
 
 
 async def post_json_url(url, payload, *, headers=None, timeout=60):
@@ -719,15 +1076,15 @@ async def post_json_url(url, payload, *, headers=None, timeout=60):
             'Content-Type': 'application/json',
         }
 
-    async with aiohttp.ClientSession(read_timeout=timeout) as http:
-        try:
-            async with http.post(url, data=json.dumps(payload), headers=headers) as resp:
-                if resp.status != 200:
-                    raise cog.exc.RemoteError(f"Failed to POST from remote site [{url}]: {resp.status}")
+    try:
+        async with HTTP.session().post(url, data=json.dumps(payload), headers=headers,
+                                       timeout=HTTP.timeout(read=timeout)) as resp:
+            if resp.status != 200:
+                raise cog.exc.RemoteError(f"Failed to POST from remote site [{url}]: {resp.status}")
 
-                return await resp.text()
-        except aiohttp.ClientError as exc:
-            raise cog.exc.RemoteError("Some unexpected failure on POST.") from exc
+            return await resp.text()
+    except aiohttp.ClientError as exc:
+        raise cog.exc.RemoteError("Some unexpected failure on POST.") from exc
 
 
 async def emergency_notice(client, msg):  # pragma: no cover just a convenience, depends on client
@@ -743,22 +1100,79 @@ async def emergency_notice(client, msg):  # pragma: no cover just a convenience,
     await chan.send(msg)
 
 
-async def hash_file(fname, *, alg=None):
+def hash_file_sync(fname, *, alg=None, chunk_size=DOWNLOAD_CHUNK_SIZE):
     """
     Hash a file and return the hex digest.
+    The file is read in chunks, memory use does not depend on the size of the file.
 
     Args:
         fname: The filename to hash.
         alg: The hash algorithm to use. Default sha512.
+        chunk_size: The size of chunks to read from the file.
 
     Returns: The hexdigest
     """
     if not alg:
         alg = 'sha512'
 
-    func = getattr(hashlib, alg, 'sha512')
-    async with aiofiles.open(fname, 'rb') as fin:
-        return func(await fin.read()).hexdigest()
+    hasher = hashlib.new(alg)
+    with open(fname, 'rb') as fin:
+        for chunk in iter(functools.partial(fin.read, chunk_size), b''):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+async def hash_file(fname, *, alg=None, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Hash a file and return the hex digest.
+    Hashing is done in chunks in the default executor to not block the loop.
+
+    Args:
+        fname: The filename to hash.
+        alg: The hash algorithm to use. Default sha512.
+        chunk_size: The size of chunks to read from the file.
+
+    Returns: The hexdigest
+    """
+    return await asyncio.get_event_loop().run_in_executor(
+        None, functools.partial(hash_file_sync, fname, alg=alg, chunk_size=chunk_size)
+    )
+
+
+async def download_and_hash(url, fname, *, alg=None, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Download a url to a local file, hashing the content as each chunk arrives.
+    Avoids rereading the file from disk just to hash it.
+
+    Args:
+        url: The full URL to GET, for instance a discord.Attachment.url.
+        fname: The local filename to write the content to.
+        alg: The hash algorithm to use. Default sha512.
+        chunk_size: The size of chunks to read from the response.
+
+    Raises:
+        cog.exc.RemoteError: The remote did not respond or failed the download.
+
+    Returns: The hexdigest of the downloaded content.
+    """
+    if not alg:
+        alg = 'sha512'
+
+    hasher = hashlib.new(alg)
+    try:
+        async with HTTP.session().get(url) as resp:
+            if resp.status != 200:
+                raise cog.exc.RemoteError(f"Failed to download from remote site [{url}]: {resp.status}")
+
+            async with aiofiles.open(fname, 'wb') as fout:
+                async for chunk in resp.content.iter_chunked(chunk_size):
+                    hasher.update(chunk)
+                    await fout.write(chunk)
+    except aiohttp.ClientError as exc:
+        raise cog.exc.RemoteError("Some unexpected failure on download.") from exc
+
+    return hasher.hexdigest()
 
 
 def clean_fname(fname, *, replacement='', extras=None, replace_spaces=True):
@@ -816,16 +1230,17 @@ def is_zipfile(fname):
     return is_zip
 
 
-async def is_zipfile_async(fname):
+async def is_zipfile_async(fname, *, pool=None):
     """
     Is the file a zip?
 
     Args:
         fname: The filename.
+        pool: A ProcessPoolExecutor to run on, when not provided a temporary one is used.
 
     Returns: A boolean.
     """
-    with cfut.ProcessPoolExecutor(max_workers=1) as pool:
+    with pool_or_temporary(pool) as pool:
         return await asyncio.get_event_loop().run_in_executor(pool, is_zipfile, fname)
 
 
@@ -849,16 +1264,17 @@ def is_log_file(fname):
     return False
 
 
-async def is_log_file_async(fname):
+async def is_log_file_async(fname, *, pool=None):
     """
     Is the file a player journal?
 
     Args:
         fname: The filename.
+        pool: A ProcessPoolExecutor to run on, when not provided a temporary one is used.
 
     Returns: A boolean.
     """
-    with cfut.ProcessPoolExecutor(max_workers=1) as pool:
+    with pool_or_temporary(pool) as pool:
         return await asyncio.get_event_loop().run_in_executor(pool, is_log_file, fname)
 
 
@@ -915,7 +1331,7 @@ def extracted_archive(archive, *, glob_pat=None):
 
 
 @contextlib.asynccontextmanager
-async def extracted_archive_async(archive, *, glob_pat=None):
+async def extracted_archive_async(archive, *, glob_pat=None, pool=None):
     """
     Extract a given archive then return a generator of files inside it matching a glob.
     The extracted folder and all files within will be deleted on exit.
@@ -924,6 +1340,7 @@ async def extracted_archive_async(archive, *, glob_pat=None):
     Args:
         archive: A zip archive.
         glob_pat: The glob pattern to match log files from extracted directory. Defaults: **/*.log
+        pool: A ProcessPoolExecutor to extract on, when not provided a temporary one is used.
 
     Returns: A generator of files matching the glob_pat.
 
@@ -940,7 +1357,7 @@ async def extracted_archive_async(archive, *, glob_pat=None):
         if not archive.exists():
             raise FileNotFoundError(f'Zip archive expected at path: {archive}')
 
-        with cfut.ProcessPoolExecutor(max_workers=1) as pool:
+        with pool_or_temporary(pool) as pool:
             # Yield a list of all found files
             yield await asyncio.get_event_loop().\
                 run_in_executor(pool, extract_zipfile, archive, extract_to, glob_pat)
@@ -1197,3 +1614,4 @@ def is_a_carrier(station_name):
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONF = cog.config.Config(rel_to_abs('data', 'config.yml'))
+HTTP = HTTPClient()
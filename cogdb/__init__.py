@@ -59,6 +59,12 @@ side_engine = sqlalchemy.create_engine(MYSQL_SPEC.format(
 )
 SideSession = sqlalchemy.orm.sessionmaker(bind=side_engine)
 
+# Local mirror of side's tables on the eddb server, see cogdb.side.mirror
+# The side models are used unchanged, their tables are mapped into the mirror database
+SIDE_MIRROR_DB = 'side_mirror_test' if TEST_DB else 'side_mirror'
+side_mirror_engine = eddb_engine.execution_options(schema_translate_map={None: SIDE_MIRROR_DB})
+SideMirrorSession = sqlalchemy.orm.sessionmaker(bind=side_mirror_engine)
+
 CREDS = None
 
 
@@ -5,10 +5,12 @@ import json
 import os
 
 import sqlalchemy as sqla
+import sqlalchemy.dialects.mysql
 
 import cog.util
 
 PRELOAD_DIR = cog.util.rel_to_abs('data', 'preload')
+PAIRS_BATCH = 500  # Pairs looked up per query in oldest_for_pairs
 
 
 def dump_dbobjs_to_file(*, cls, db_objs):
@@ -81,6 +83,67 @@ def bulk_insert_from_file(session, *, fname, cls):
         session.commit()
 
 
+def bulk_upsert(session, *, cls, rows, update_keys=None):
+    """
+    Insert or update many rows in a single statement, rows colliding with
+    a primary or unique key of the table are updated in place.
+    Every row must have the same keys, columns absent get their defaults on insert.
+
+    Args:
+        session: A session onto the database to upsert into.
+        cls: The sqlalchemy database class of the table.
+        rows: A list of dictionaries of the column values.
+        update_keys: The columns to update on collision, by default every key of the rows not in a primary or unique key.
+    """
+    if not rows:
+        return
+
+    if update_keys is None:
+        table = cls.__table__
+        key_columns = {x.name for x in table.primary_key} | {
+            col.name for cons in table.constraints if isinstance(cons, sqla.UniqueConstraint) for col in cons.columns
+        }
+        update_keys = [x for x in rows[0] if x not in key_columns]
+    stmt = sqlalchemy.dialects.mysql.insert(cls.__table__)
+    stmt = stmt.on_duplicate_key_update({x: stmt.inserted[x] for x in update_keys})
+    session.execute(stmt, rows)
+
+
+def oldest_for_pairs(session, *, cls, pairs, since=None):
+    """
+    Find the oldest influence of every (system_id, faction_id) pair in a history table.
+    Pairs are matched with a row value IN so the index on the pair can be used.
+    Should several rows share the oldest updated_at, the one with the lowest primary key is chosen.
+
+    Args:
+        session: A session onto the database of the table.
+        cls: The history class, needs system_id, faction_id, influence and updated_at columns.
+        pairs: An iterable of (system_id, faction_id) pairs.
+        since: If set, only consider rows updated at or after this timestamp.
+
+    Returns: A dictionary of (system_id, faction_id) -> influence, pairs without history are absent.
+    """
+    pairs = list({tuple(x) for x in pairs})
+    keys = list(cls.__table__.primary_key)
+    found = {}
+    for ind in range(0, len(pairs), PAIRS_BATCH):
+        oldest = session.query(cls.system_id, cls.faction_id, sqla.func.min(cls.updated_at).label('updated_at')).\
+            filter(sqla.tuple_(cls.system_id, cls.faction_id).in_(pairs[ind:ind + PAIRS_BATCH]))
+        if since is not None:
+            oldest = oldest.filter(cls.updated_at >= since)
+        oldest = oldest.group_by(cls.system_id, cls.faction_id).subquery()
+
+        rows = session.query(cls.system_id, cls.faction_id, cls.influence).\
+            join(oldest, sqla.and_(cls.system_id == oldest.c.system_id,
+                                   cls.faction_id == oldest.c.faction_id,
+                                   cls.updated_at == oldest.c.updated_at)).\
+            order_by(*keys)
+        for system_id, faction_id, influence in rows:
+            found.setdefault((system_id, faction_id), influence)
+
+    return found
+
+
 def single_insert_from_file(session, *, fname, cls):
     """
     Single insert all objects into database based on information from a file.
@@ -13,6 +13,7 @@ import enum
 import math
 import string
 import sys
+import time
 
 # Selected backend set in ijson.backend as string.
 import sqlalchemy as sqla
@@ -64,6 +65,8 @@ CONTROL_DISTANCE = 15  # A control exploits all systems in this distance
 HISTORY_INF_LIMIT = 40
 HOUR_SECONDS = 60 * 60
 HISTORY_INF_TIME_GAP = HOUR_SECONDS * 4  # min seconds between data points
+HISTORY_TRACK_REFRESH = 300  # seconds between reloading the tracked systems
+HISTORY_INF_COLUMNS = ['system_id', 'faction_id', 'happiness_id', 'influence', 'is_controlling_faction', 'updated_at']
 DEFAULT_DIST = 75
 DEFAULT_ARRIVAL = 5000
 # To select planetary stations
@@ -866,16 +869,161 @@ def add_history_influence(eddb_session, latest_inf):
 
     if data:
         last = data[-1]
-        # Influence stored as decimal of [0.0, 1.0]
-        inf_diff = math.fabs(last.influence - latest_inf.influence)
-        time_diff = latest_inf.updated_at - last.updated_at
-        if (inf_diff >= 0.01 and time_diff > HOUR_SECONDS) or time_diff >= HISTORY_INF_TIME_GAP:
+        if is_history_point_due(last_influence=last.influence, last_updated_at=last.updated_at,
+                                influence=latest_inf.influence, updated_at=latest_inf.updated_at):
             eddb_session.add(HistoryInfluence.from_influence(latest_inf))
 
     else:
         eddb_session.add(HistoryInfluence.from_influence(latest_inf))
 
 
+def is_history_point_due(*, last_influence, last_updated_at, influence, updated_at):
+    """
+    Decide if a new history point should follow the last one, see add_history_influence for rules.
+
+    Args:
+        last_influence: The influence of the last point.
+        last_updated_at: The timestamp of the last point.
+        influence: The new influence.
+        updated_at: The timestamp of the new influence.
+
+    Returns: True iff a new point should be added.
+    """
+    # Influence stored as decimal of [0.0, 1.0]
+    inf_diff = math.fabs(last_influence - influence)
+    time_diff = updated_at - last_updated_at
+    return (inf_diff >= 0.01 and time_diff > HOUR_SECONDS) or time_diff >= HISTORY_INF_TIME_GAP
+
+
+class HistoryInfluenceCache():
+    """
+    Decide history points for many influences at once without querying history per influence.
+    Keeps in memory the set of tracked systems, reloaded every refresh seconds, and the
+    last point and number of points of every (system_id, faction_id) pair of tracked systems seen.
+
+    Only use one per process writing history, points added by others are not seen.
+    """
+    def __init__(self, *, refresh=HISTORY_TRACK_REFRESH):
+        self.refresh = refresh
+        self.tracked = set()
+        self.tracked_at = 0
+        self.loaded = set()
+        self.last = {}
+        self.counts = {}
+
+    def clear(self):
+        """
+        Forget everything, forces a reload on next use.
+        """
+        self.tracked = set()
+        self.tracked_at = 0
+        self.loaded = set()
+        self.last = {}
+        self.counts = {}
+
+    def tracked_systems(self, eddb_session):
+        """
+        The ids of all systems tracked, reloaded if older than refresh seconds.
+
+        Args:
+            eddb_session: A session onto the db.
+
+        Returns: A set of system ids.
+        """
+        if (time.time() - self.tracked_at) >= self.refresh:
+            self.tracked = {x[0] for x in eddb_session.query(HistoryTrack.system_id)}
+            self.tracked_at = time.time()
+            self.loaded &= self.tracked
+
+        return self.tracked
+
+    def load_system(self, eddb_session, system_id):
+        """
+        Load the last point and count of points of every faction in a system, once.
+
+        Args:
+            eddb_session: A session onto the db.
+            system_id: The id of the system.
+        """
+        if system_id in self.loaded:
+            return
+
+        for key in [x for x in self.counts if x[0] == system_id]:
+            del self.counts[key]
+            self.last.pop(key, None)
+
+        rows = eddb_session.query(HistoryInfluence.faction_id, HistoryInfluence.influence, HistoryInfluence.updated_at).\
+            filter(HistoryInfluence.system_id == system_id).\
+            order_by(HistoryInfluence.updated_at)
+        for faction_id, influence, updated_at in rows:
+            key = (system_id, faction_id)
+            self.last[key] = (influence, updated_at)
+            self.counts[key] = self.counts.get(key, 0) + 1
+        self.loaded.add(system_id)
+
+    def add_points(self, eddb_session, influences):
+        """
+        Add history points for all influences that are due one, in one statement.
+        Pairs exceeding HISTORY_INF_LIMIT points have their oldest points removed.
+
+        Args:
+            eddb_session: A session onto the db.
+            influences: A list of dictionaries with the columns of Influence.
+
+        Returns: The list of history points added, as dictionaries.
+        """
+        tracked = self.tracked_systems(eddb_session)
+        points = []
+        for influence in influences:
+            if influence['system_id'] not in tracked or influence.get('influence') is None:
+                continue
+
+            self.load_system(eddb_session, influence['system_id'])
+            key = (influence['system_id'], influence['faction_id'])
+            try:
+                last_influence, last_updated_at = self.last[key]
+                if not is_history_point_due(last_influence=last_influence, last_updated_at=last_updated_at,
+                                            influence=influence['influence'], updated_at=influence['updated_at']):
+                    continue
+            except KeyError:
+                pass
+
+            points += [{col: influence.get(col) for col in HISTORY_INF_COLUMNS}]
+            self.last[key] = (influence['influence'], influence['updated_at'])
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+        if points:
+            eddb_session.execute(HistoryInfluence.__table__.insert(), points)
+            for point in points:
+                key = (point['system_id'], point['faction_id'])
+                if self.counts[key] > HISTORY_INF_LIMIT:
+                    self.trim(eddb_session, key)
+
+        return points
+
+    def trim(self, eddb_session, key):
+        """
+        Remove the oldest points of a pair beyond HISTORY_INF_LIMIT.
+
+        Args:
+            eddb_session: A session onto the db.
+            key: The (system_id, faction_id) pair.
+        """
+        system_id, faction_id = key
+        old_ids = [
+            x[0] for x in eddb_session.query(HistoryInfluence.id).
+            filter(HistoryInfluence.system_id == system_id,
+                   HistoryInfluence.faction_id == faction_id).
+            order_by(HistoryInfluence.updated_at.desc()).
+            offset(HISTORY_INF_LIMIT)
+        ]
+        if old_ids:
+            eddb_session.query(HistoryInfluence).\
+                filter(HistoryInfluence.id.in_(old_ids)).\
+                delete(synchronize_session=False)
+        self.counts[key] = HISTORY_INF_LIMIT
+
+
 def service_status(eddb_session):
     """
     Poll for the status of the local EDDB database.
@@ -7,8 +7,12 @@ Will have the following parts:
 """
 import abc
 import argparse
+import collections
 import datetime
+import functools
+import hashlib
 import logging
+import multiprocessing
 import os.path
 import pprint
 import sys
@@ -24,14 +28,18 @@ try:
     import rapidjson as json
 except ImportError:
     import json
+try:
+    from orjson import loads as fast_loads
+except ImportError:
+    fast_loads = json.loads
 
 import cog.util
-from cog.util import TIME_STRP, TIME_STRP_MICRO
 import cogdb
 import cogdb.eddb
+import cogdb.eddn_stats
 import cogdb.query
 import cogdb.spansh
-from cogdb.eddn_logger import EDDNLogger
+from cogdb.eddn_logger import EDDNCapture
 from cogdb.eddb import (
     Conflict, Faction, Influence, Ship, ShipSold, System, Station, CarrierSighting,
     StationEconomy, StationFeatures, FactionActiveState, FactionPendingState, FactionRecoveringState
@@ -47,6 +55,17 @@ SCHEMA_MAP = {
     #  "https://eddn.edcd.io/schemas/outfitting/2": "OutfittingV2",
     #  "https://eddn.edcd.io/schemas/shipyard/2": "ShipyardV2",
 }
+# Schemas are sharded by family onto separate pools of workers, see supervise
+SCHEMA_FAMILIES = {
+    "https://eddn.edcd.io/schemas/commodity/3": "market",
+    "https://eddn.edcd.io/schemas/journal/1": "journal",
+    "https://eddn.edcd.io/schemas/outfitting/2": "market",
+    "https://eddn.edcd.io/schemas/shipyard/2": "market",
+}
+WORKER_SOCKETS = os.path.join(tempfile.gettempdir(), 'eddn_workers')
+WORKER_QUEUE_SIZE = 5000  # Messages queued per worker before dropping
+WORKER_POOL_SIZE = 2
+WORKER_CHECK_DELAY = 30
 LOG_FILE = os.path.join(tempfile.gettempdir(), 'eddn_log')
 ALL_MSGS = os.path.join(tempfile.gettempdir(), 'eddn_all')
 JOURNAL_MSGS = os.path.join(tempfile.gettempdir(), 'eddn_journals')
@@ -64,6 +83,24 @@ STATION_FEATS = [
 COMMS_SEEN = []
 BLACKLIST_SOFTWARE = ["EVA [iPad]"]
 LOGS = {}
+# Duplicate snapshot suppression, see SnapshotCache
+SNAPSHOT_CACHE_SIZE = 25000
+SNAPSHOT_FLUSH_SIZE = 100
+SNAPSHOT_FLUSH_DELAY = 60
+SNAPSHOT_TTL = 60 * 60  # Force a full update at least this often, keeps history points flowing
+SNAPSHOT_KEYS = [
+    'Conflicts', 'Population', 'Powers', 'PowerplayState', 'SystemEconomy',
+    'SystemFaction', 'SystemSecondEconomy', 'SystemSecurity',
+]
+# MyReputation and similar differ between commanders reporting the same state
+SNAPSHOT_FACTION_KEYS = [
+    'ActiveStates', 'FactionState', 'Happiness', 'Influence', 'Name', 'PendingStates', 'RecoveringStates',
+]
+STATE_TABLES = [
+    ('active_states', FactionActiveState),
+    ('pending_states', FactionPendingState),
+    ('recovering_states', FactionRecoveringState),
+]
 
 
 def station_key(*, system, station):
@@ -86,6 +123,19 @@ def station_key(*, system, station):
     return key
 
 
+class LazyPformat():
+    """
+    Defer pretty formatting an object for logging until a record is actually emitted.
+    """
+    __slots__ = ['obj']
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        return pprint.pformat(self.obj)
+
+
 class StopParsing(Exception):
     """
     Interrupt any further parsing of the msg.
@@ -104,6 +154,193 @@ class SchemaIgnored(Exception):
     """
 
 
+def allocate_faction_ids(names):
+    """
+    Allocate ids to factions not yet mapped, appending them to the journal of the faction map.
+    Safe when run by many listener workers, see cogdb.spansh.allocate_name_ids.
+
+    Args:
+        names: The names of the factions.
+
+    Returns: A dictionary of every name onto its id.
+    """
+    cogdb.spansh.update_faction_map(names, cache=FACTION_CACHE)
+
+    return {name: FACTION_CACHE['known'][name] for name in names}
+
+
+def allocate_station_ids(keys):
+    """
+    Allocate ids to stations not yet mapped, appending them to the journal of the station map.
+    Safe when run by many listener workers, see cogdb.spansh.allocate_name_ids.
+
+    Args:
+        keys: The keys of the stations, see station_key.
+
+    Returns: A dictionary of every key onto its id.
+    """
+    cogdb.spansh.allocate_station_ids(keys, cache=STATION_CACHE)
+
+    return {key: STATION_CACHE['known'][key] for key in keys}
+
+
+def decode_msg(payload):
+    """
+    Decode a raw EDDN payload straight from the compressed bytes.
+    Uses orjson when available, it decodes bytes directly without an intermediate str.
+
+    Args:
+        payload: The zlib compressed JSON payload received from EDDN.
+
+    Returns: The message as a dictionary.
+    """
+    return fast_loads(zlib.decompress(payload))
+
+
+def group_by_keys(rows):
+    """
+    Group dictionaries by the keys they have, rows of a group can share one executemany.
+
+    Args:
+        rows: A list of dictionaries.
+
+    Returns: A dictionary of tuples of sorted keys onto the list of rows having exactly those keys.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    return groups
+
+
+def snapshot_fingerprint(body):
+    """
+    Compute a fingerprint of the state of a system reported in a journal message.
+    Covers the factions, influences, states, conflicts, power and population.
+    Anything specific to the reporting commander or the time of the report is excluded.
+
+    Args:
+        body: The message portion of a journal/1 EDDN message.
+
+    Returns: A hex digest string, equal for messages reporting the same state.
+    """
+    snapshot = {key: body[key] for key in SNAPSHOT_KEYS if key in body}
+    snapshot['Factions'] = sorted(
+        [{key: faction[key] for key in SNAPSHOT_FACTION_KEYS if key in faction} for faction in body.get('Factions', [])],
+        key=lambda x: x.get('Name', '')
+    )
+
+    return hashlib.blake2b(json.dumps(snapshot, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+class SnapshotCache():
+    """
+    Remember the fingerprint of the last snapshot applied to the database for every system.
+    When an identical snapshot arrives only the updated_at of the system and its
+    influences needs bumping, these are collected and written in batches.
+
+    Attributes:
+        size: The maximum number of systems to remember, least recently seen are dropped first.
+        flush_size: Flush pending bumps when this many systems are pending.
+        flush_delay: Flush pending bumps when the oldest is this many seconds old.
+        ttl: Seconds after which a remembered snapshot no longer counts as a duplicate.
+    """
+    def __init__(self, *, size=SNAPSHOT_CACHE_SIZE, flush_size=SNAPSHOT_FLUSH_SIZE,
+                 flush_delay=SNAPSHOT_FLUSH_DELAY, ttl=SNAPSHOT_TTL):
+        self.size = size
+        self.flush_size = flush_size
+        self.flush_delay = flush_delay
+        self.ttl = ttl
+        self.seen = collections.OrderedDict()
+        self.pending = {}
+        self.last_flush = time.time()
+
+    def __len__(self):
+        return len(self.seen)
+
+    def clear(self):
+        """
+        Forget all snapshots and pending bumps.
+        """
+        self.seen.clear()
+        self.pending.clear()
+        self.last_flush = time.time()
+
+    def is_duplicate(self, system_name, fingerprint):
+        """
+        Check if the fingerprint matches the last snapshot applied for the system.
+
+        Args:
+            system_name: The name of the system.
+            fingerprint: The fingerprint of the new snapshot, see snapshot_fingerprint.
+
+        Returns: True iff the snapshot was already applied within the ttl.
+        """
+        try:
+            last_print, applied_at = self.seen[system_name]
+        except KeyError:
+            return False
+
+        self.seen.move_to_end(system_name)
+        return last_print == fingerprint and (time.time() - applied_at) < self.ttl
+
+    def applied(self, system_name, fingerprint):
+        """
+        Record that a snapshot was written to the database for the system.
+
+        Args:
+            system_name: The name of the system.
+            fingerprint: The fingerprint of the snapshot applied.
+        """
+        self.seen[system_name] = (fingerprint, time.time())
+        self.seen.move_to_end(system_name)
+        while len(self.seen) > self.size:
+            self.seen.popitem(last=False)
+
+    def bump(self, system_id, timestamp):
+        """
+        Queue an update of updated_at for the system and its influences.
+
+        Args:
+            system_id: The id of the system.
+            timestamp: The timestamp of the duplicate message.
+        """
+        self.pending[system_id] = max(timestamp, self.pending.get(system_id, 0))
+
+    def should_flush(self):
+        """
+        Returns: True iff the pending bumps should be written now.
+        """
+        return bool(self.pending) and (
+            len(self.pending) >= self.flush_size or (time.time() - self.last_flush) >= self.flush_delay
+        )
+
+    def flush(self, eddb_session):
+        """
+        Write all pending bumps to the database, one batched statement per table.
+
+        Args:
+            eddb_session: A session onto the EDDB database.
+
+        Returns: The number of systems updated.
+        """
+        values = [{'b_id': key, 'b_updated_at': value} for key, value in self.pending.items()]
+        if values:
+            for cls, column in ((System, System.__table__.c.id), (Influence, Influence.__table__.c.system_id)):
+                eddb_session.execute(
+                    cls.__table__.update().
+                    where(sqla.and_(column == sqla.bindparam('b_id'),
+                                    cls.__table__.c.updated_at < sqla.bindparam('b_updated_at'))).
+                    values(updated_at=sqla.bindparam('b_updated_at')),
+                    values
+                )
+            eddb_session.commit()
+
+        self.pending.clear()
+        self.last_flush = time.time()
+        return len(values)
+
+
 class MsgParser(abc.ABC):
     """
     Parse a given EDDN message.
@@ -128,16 +365,12 @@ class MsgParser(abc.ABC):
         """ The body of the message. """
         return self.msg['message']
 
-    @property
+    @functools.cached_property
     def date_obj(self):
-        """ The UTC timezone AWARE datetime object of the message. """
-        try:
-            parsed_time = datetime.datetime.strptime(self.body['timestamp'], TIME_STRP_MICRO)
-        except ValueError:
-            parsed_time = datetime.datetime.strptime(self.body['timestamp'], TIME_STRP)
-        return parsed_time.replace(tzinfo=datetime.timezone.utc)
+        """ The UTC timezone AWARE datetime object of the message, parsed once. """
+        return cog.util.parse_timestamp(self.body['timestamp'])
 
-    @property
+    @functools.cached_property
     def timestamp(self):
         """ The UTC timestamp of the message. """
         return int(self.date_obj.timestamp())
@@ -324,12 +557,20 @@ class JournalV1(MsgParser):
     Parse an journal/1 message for pertinent information and update
     the database as possible. Not all elements are guaranteed so parse as possible.
     """
+    def __init__(self, session, eddb_session, msg):
+        super().__init__(session, eddb_session, msg)
+        self.fingerprint = None
+
     def parse_msg(self):
         """
         Perform whole message parsing.
+
+        Raises:
+            SkipDatabaseFlush: The message repeats the last snapshot applied for the system.
         """
         log = logging.getLogger(__name__)
         star_system = self.body.get('StarSystem', 'Unknown System')
+        self.check_duplicate_snapshot()
         try:
             if 'Factions' in self.body:
                 self.parse_factions()
@@ -338,28 +579,28 @@ class JournalV1(MsgParser):
 
             system = self.parse_system()
             log.info("JournalV1 (%s) Parsing system", star_system)
-            log.info(pprint.pformat(system))
+            log.info("%s", LazyPformat(system))
 
             if 'Factions' in self.body:
                 log.info("JournalV1 (%s) Parsing factions", star_system)
-                log.debug(pprint.pformat(self.parsed['factions']))
+                log.debug("%s", LazyPformat(self.parsed['factions']))
 
             if 'StationName' in self.body and "StationType" in self.body:
                 log.info("JournalV1 (%s) Parsing station", star_system)
-                log.debug(pprint.pformat(self.parse_station()))
+                log.debug("%s", LazyPformat(self.parse_station()))
 
                 if self.body["StationType"] == "FleetCarrier":
                     parsed = self.parse_and_flush_carrier()
                     LOGS['carriers'].write_msg(self.msg)
-                    log.info(pprint.pformat(parsed))
+                    log.info("%s", LazyPformat(parsed))
 
             if 'Factions' in self.body:
                 log.info("JournalV1 (%s) Parsing influences", star_system)
-                log.debug(pprint.pformat(self.parse_influence()))
+                log.debug("%s", LazyPformat(self.parse_influence()))
                 LOGS['journals'].write_msg(self.msg)
                 if 'Conflicts' in self.body:
                     log.info("JournalV1 (%s) Parsing conflicts", star_system)
-                    log.debug(pprint.pformat(self.parse_conflicts()))
+                    log.debug("%s", LazyPformat(self.parse_conflicts()))
 
         except StopParsing:
             self.eddb_session.rollback()
@@ -392,6 +633,27 @@ class JournalV1(MsgParser):
             self.flush_conflicts_to_db()
         self.eddb_session.commit()
 
+        if self.fingerprint and self.parsed.get('influences'):
+            SNAPSHOTS.applied(self.body['StarSystem'], self.fingerprint)
+
+    def check_duplicate_snapshot(self):
+        """
+        Check if the message reports the same system state as the last one applied.
+        Only messages reporting factions while not docked are considered, docked messages carry station updates.
+        Duplicates only queue a bump of updated_at, see SnapshotCache.flush.
+
+        Raises:
+            SkipDatabaseFlush: The message repeats the last snapshot applied for the system.
+        """
+        body = self.body
+        if 'Factions' not in body or 'StationName' in body or body.get('StarSystem') not in MAPS['systems']:
+            return
+
+        self.fingerprint = snapshot_fingerprint(body)
+        if SNAPSHOTS.is_duplicate(body['StarSystem'], self.fingerprint):
+            SNAPSHOTS.bump(MAPS['systems'][body['StarSystem']], self.timestamp)
+            raise SkipDatabaseFlush(f"Duplicate snapshot for system: {body['StarSystem']}")
+
     def parse_system(self):
         """
         Parse the system portion of an EDDN message and return anything present in dictionary.
@@ -556,9 +818,7 @@ class JournalV1(MsgParser):
             try:
                 station['id'] = STATION_CACHE['known'][station['name']]
             except KeyError:
-                added = cogdb.spansh.update_station_map([station['name']], cache=STATION_CACHE)
-                cogdb.spansh.write_station_cache(STATION_CACHE)
-                station['id'] = added[station['name']]
+                station['id'] = allocate_station_ids([station['name']])[station['name']]
 
             station_db = Station.carrier(
                 name=station['name'],
@@ -640,9 +900,7 @@ class JournalV1(MsgParser):
             try:
                 station['id'] = STATION_CACHE['known'][skey]
             except KeyError:
-                added = cogdb.spansh.update_station_map([skey], cache=STATION_CACHE)
-                cogdb.spansh.write_station_cache(STATION_CACHE)
-                station['id'] = added[skey]
+                station['id'] = allocate_station_ids([skey])[skey]
 
             station_db = Station(**station)
             self.eddb_session.add(station_db)
@@ -695,9 +953,7 @@ class JournalV1(MsgParser):
                 faction['id'] = FACTION_CACHE['known'][body_faction['Name']]
             except KeyError:
                 # Faction not mapped, add it immediately, incurs write out cost
-                added = cogdb.spansh.update_faction_map([body_faction['Name']], cache=FACTION_CACHE)
-                cogdb.spansh.write_faction_cache(FACTION_CACHE)
-                faction['id'] = added[body_faction['Name']]
+                faction['id'] = allocate_faction_ids([body_faction['Name']])[body_faction['Name']]
 
             factions[faction['name']] = faction
 
@@ -763,37 +1019,44 @@ class JournalV1(MsgParser):
     def flush_influences_to_db(self):
         """
         Flush influences and states information to db.
+        The states of the whole system are replaced and all influences written with
+        one statement per table, history points are decided by HISTORY_CACHE.
         """
         system = self.parsed.get('system')
         influences = self.parsed.get('influences')
         if not influences or not system or 'id' not in system:
             raise SkipDatabaseFlush("Influences flush: system or factions improperly parsed.")
 
-        for faction in self.parsed['factions'].values():
-            for cls in (FactionActiveState, FactionPendingState, FactionRecoveringState):
-                self.eddb_session.query(cls).\
-                    filter(cls.system_id == system['id'],
-                           cls.faction_id == faction['id']).\
-                    delete()
-            self.eddb_session.commit()
-            for key in ("active_states", "pending_states", "recovering_states"):
-                if key in faction:
-                    self.eddb_session.add_all(faction[key])
-                    del faction[key]
+        for key, cls in STATE_TABLES:
+            table = cls.__table__
+            states = {
+                (x.system_id, x.faction_id, x.state_id)
+                for faction in self.parsed['factions'].values() for x in faction.pop(key, [])
+            }
+            self.eddb_session.execute(table.delete().where(table.c.system_id == system['id']))
+            if states:
+                self.eddb_session.execute(
+                    table.insert(),
+                    [{'system_id': x[0], 'faction_id': x[1], 'state_id': x[2]} for x in sorted(states)]
+                )
+
+        existing = dict(
+            self.eddb_session.query(Influence.faction_id, Influence.id).
+            filter(Influence.system_id == system['id'])
+        )
+        table = Influence.__table__
+        for keys, rows in group_by_keys([x for x in influences if x['faction_id'] in existing]).items():
+            self.eddb_session.execute(
+                table.update().
+                where(table.c.id == sqla.bindparam('b_id')).
+                values({key: sqla.bindparam(f'b_{key}') for key in keys}),
+                [{'b_id': existing[x['faction_id']], **{f'b_{key}': x[key] for key in keys}} for x in rows]
+            )
+        for rows in group_by_keys([x for x in influences if x['faction_id'] not in existing]).values():
+            self.eddb_session.execute(table.insert(), rows)
 
-        for influence in influences:
-            try:
-                influence_db = self.eddb_session.query(Influence).\
-                    filter(Influence.system_id == influence['system_id'],
-                           Influence.faction_id == influence['faction_id']).\
-                    one()
-                influence_db.update(**influence)
-            except sqla_orm.exc.NoResultFound:
-                influence_db = Influence(**influence)
-                self.eddb_session.add(Influence(**influence))
-            finally:
-                cogdb.eddb.add_history_influence(self.eddb_session, influence_db)
-                self.flushed += [influence_db]
+        HISTORY_CACHE.add_points(self.eddb_session, influences)
+        self.flushed += [Influence(id=existing.get(x['faction_id']), **x) for x in influences]
 
     def parse_conflicts(self):
         """
@@ -920,72 +1183,372 @@ def create_parser(msg):
 def timestamp_is_recent(msg, window=30):
     """ Returns true iff the timestamp is less than window minutes old."""
     try:
-        parsed_time = datetime.datetime.strptime(msg['header']['gatewayTimestamp'], TIME_STRP_MICRO)
+        parsed_time = cog.util.parse_timestamp(msg['header']['gatewayTimestamp'])
     except ValueError:
-        try:
-            parsed_time = datetime.datetime.strptime(msg['header']['gatewayTimestamp'], TIME_STRP)
-        except ValueError:
-            return False
+        return False
 
-    parsed_time = parsed_time.replace(tzinfo=datetime.timezone.utc)
     return (datetime.datetime.now(datetime.timezone.utc) - parsed_time) < datetime.timedelta(minutes=window)
 
 
-def get_msgs(sub):  # pragma: no cover
-    """ Continuously receive messages and log them. """
+def msg_is_wanted(msg):
+    """ Returns true iff the message is recent and not from blacklisted software. """
+    return timestamp_is_recent(msg) and msg['header']['softwareName'] not in BLACKLIST_SOFTWARE
+
+
+def flush_snapshots(force=False):
+    """
+    Write out the updated_at bumps of duplicate snapshots if they are due.
+
+    Args:
+        force: When True, write out any pending bumps regardless.
+
+    Returns: The number of systems updated.
+    """
+    if not force and not SNAPSHOTS.should_flush():
+        return 0
+
+    with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
+        updated = SNAPSHOTS.flush(eddb_session)
+    logging.getLogger(__name__).info("Flushed updated_at of %d systems with duplicate snapshots.", updated)
+    return updated
+
+
+def process_msg(msg):  # pragma: no cover
+    """
+    Parse a single message and update the database with it.
+
+    Args:
+        msg: The decoded EDDN message.
+
+    Raises:
+        SkipDatabaseFlush: The message required no update to the database.
+    """
+    try:
+        parser = create_parser(msg)
+        parser.parse_msg()
+    except SchemaIgnored:  # Schema not mapped
+        return
+    except StopParsing:
+        pass
+
+    parser.update_database()
+
+
+def get_msgs(sub, reporter=None):  # pragma: no cover
+    """
+    Continuously receive messages and log them.
+
+    Args:
+        sub: The connected zmq SUB socket.
+        reporter: When set, a cogdb.eddn_stats.StatsReporter to report every message handled to.
+    """
     while True:
-        msg = sub.recv()
+        payload = sub.recv()
 
-        if not msg:
+        if not payload:
             raise zmq.ZMQError("Sub problem.")
 
-        msg = json.loads(zlib.decompress(msg).decode())
-        try:
-            # Drop messages with old timestamps or blacklisted software
-            if not timestamp_is_recent(msg) or msg['header']['softwareName'] in BLACKLIST_SOFTWARE:
-                continue
-
-            lfname = LOGS['all'].write_msg(msg)
-            try:
-                if lfname:
-                    print("Message:", lfname)
-                parser = create_parser(msg)
-                parser.parse_msg()
-            except SchemaIgnored:  # Schema not mapped
-                continue
-            except StopParsing:
-                pass
+        flush_snapshots()
+        msg = decode_msg(payload)
+        if not msg_is_wanted(msg):
+            continue
 
-            parser.update_database()
+        LOGS['all'].write_payload(payload)
+        try:
+            process_msg(msg)
         except SkipDatabaseFlush as exc:
             logging.getLogger(__name__).info("SKIP: %s", exc)
 
+        if reporter:
+            reporter.report(msg)
+
 
-def connect_loop(sub):  # pragma: no cover
+def connect_loop(sub, addr=EDDN_ADDR, reporter=None):  # pragma: no cover
     """
     Continuously connect and get messages until user cancels.
     All messages logged to file and printed.
+
+    Args:
+        sub: The zmq SUB socket.
+        addr: The address of the relay to connect to.
+        reporter: Optional, see get_msgs.
     """
     while True:
         try:
-            sub.connect(EDDN_ADDR)
-            get_msgs(sub)
+            sub.connect(addr)
+            get_msgs(sub, reporter)
         except zmq.ZMQError as exc:
             logging.getLogger(__name__).info("ZMQ Socket error. Reconnecting soon.\n\n%s", exc)
-            sub.discconect(EDDN_ADDR)
+            sub.disconnect(addr)
             time.sleep(5)
 
 
-def init_eddn_log(fname, log_level="INFO", disable_log_all=True):  # pragma: no cover
+def route_msg(msg, workers):
+    """
+    Select the worker to handle a message.
+    Messages are sharded by system so the same worker always sees a given system,
+    this keeps updates to a system ordered and the duplicate snapshot cache effective.
+
+    Args:
+        msg: The decoded EDDN message.
+        workers: A dictionary of the families in SCHEMA_FAMILIES onto the number of workers of that family.
+
+    Returns: (family, index) of the worker, None if the schema is not enabled.
+    """
+    schema = msg.get('$schemaRef')
+    family = SCHEMA_FAMILIES.get(schema)
+    if schema not in SCHEMA_MAP or not workers.get(family):
+        return None
+
+    body = msg.get('message', {})
+    system = body.get('StarSystem', body.get('systemName', ''))
+    return family, zlib.crc32(system.encode()) % workers[family]
+
+
+def worker_addr(family, index):
+    """
+    Returns: The address the supervisor pushes messages to a worker on.
+    """
+    return f"ipc://{WORKER_SOCKETS}/{family}_{index}"
+
+
+def rebind_sessions(pool_size=WORKER_POOL_SIZE):  # pragma: no cover
+    """
+    Bind the sessions of this process to pooled engines, each worker keeps its connections open.
+
+    Args:
+        pool_size: The number of connections to keep open per engine.
+
+    Returns: The list of new engines.
+    """
+    engines = []
+    for maker in (cogdb.Session, cogdb.EDDBSession):
+        engine = sqla.create_engine(
+            maker.kw['bind'].url, echo=False, pool_size=pool_size, pool_recycle=3600,
+            pool_pre_ping=True, connect_args={'connect_timeout': 3}
+        )
+        maker.configure(bind=engine)
+        engines += [engine]
+
+    return engines
+
+
+def worker_main(family, index, *, log_level="INFO", stats=None):  # pragma: no cover
+    """
+    Entry point of a worker process forked by supervise.
+    Receive messages from the supervisor and update the database with them.
+
+    Args:
+        family: The family of schemas this worker handles.
+        index: The index of the worker in the family.
+        log_level: The STDOUT logging level.
+        stats: When set, report every message handled to this cogdb.eddn_replay stats address.
+    """
+    name = f"{family}_{index}"
+    LOGS.clear()  # Capture threads of the supervisor do not survive the fork
+    init_eddn_log(f"{LOG_FILE}_{name}", log_level, name=name)
+    engines = rebind_sessions()
+    reporter = cogdb.eddn_stats.StatsReporter(stats, engines) if stats else None
+
+    pull = zmq.Context().socket(zmq.PULL)
+    pull.setsockopt(zmq.RCVHWM, WORKER_QUEUE_SIZE)
+    pull.setsockopt(zmq.RCVTIMEO, SNAPSHOT_FLUSH_DELAY * 1000)
+    pull.connect(worker_addr(family, index))
+    try:
+        while True:
+            try:
+                payload = pull.recv()
+            except zmq.Again:
+                flush_snapshots()
+                continue
+
+            flush_snapshots()
+            msg = decode_msg(payload)
+            try:
+                process_msg(msg)
+            except SkipDatabaseFlush as exc:
+                logging.getLogger(__name__).info("SKIP: %s", exc)
+            if reporter:
+                reporter.report(msg)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        flush_snapshots(force=True)
+        close_eddn_log()
+        pull.close(linger=0)
+        if reporter:
+            reporter.close()
+
+
+def start_worker(family, index, *, log_level="INFO", stats=None):  # pragma: no cover
+    """
+    Fork a worker process, forking shares the maps and caches loaded on import copy on write.
+
+    Returns: The started multiprocessing.Process.
+    """
+    proc = multiprocessing.get_context('fork').Process(
+        target=worker_main, args=(family, index), kwargs={'log_level': log_level, 'stats': stats},
+        name=f"eddn_{family}_{index}", daemon=True,
+    )
+    proc.start()
+
+    return proc
+
+
+def start_workers(context, workers, *, log_level="INFO", stats=None):  # pragma: no cover
+    """
+    Bind a PUSH socket for every worker and start them.
+
+    Args:
+        context: The zmq context of the supervisor.
+        workers: A dictionary of the families in SCHEMA_FAMILIES onto the number of workers of that family.
+        log_level: The STDOUT logging level of workers.
+        stats: Passed to every worker, see worker_main.
+
+    Returns: (pushes, procs), dictionaries of (family, index) onto the sockets and processes respectively.
+    """
+    os.makedirs(WORKER_SOCKETS, exist_ok=True)
+    pushes, procs = {}, {}
+    for family, count in workers.items():
+        for index in range(count):
+            push = context.socket(zmq.PUSH)
+            push.setsockopt(zmq.SNDHWM, WORKER_QUEUE_SIZE)
+            push.bind(worker_addr(family, index))
+            pushes[(family, index)] = push
+            procs[(family, index)] = start_worker(family, index, log_level=log_level, stats=stats)
+
+    return pushes, procs
+
+
+def restart_workers(procs, *, log_level="INFO", stats=None):  # pragma: no cover
+    """
+    Restart any worker process that exited.
+
+    Args:
+        procs: A dictionary of (family, index) onto the worker processes, updated in place.
+        log_level: The STDOUT logging level of workers.
+        stats: Passed to every worker, see worker_main.
+    """
+    for key, proc in procs.items():
+        if not proc.is_alive():
+            logging.getLogger(__name__).error("Worker %s exited with %s, restarting.", proc.name, proc.exitcode)
+            procs[key] = start_worker(*key, log_level=log_level, stats=stats)
+
+
+def forward_msg(payload, pushes, workers, dropped, reporter=None):
+    """
+    Decode, filter and capture a message received from the relay then push it to its worker.
+    The push never blocks, when the worker is behind the message is dropped and counted.
+
+    Args:
+        payload: The payload received from the relay.
+        pushes: A dictionary of (family, index) onto the PUSH socket of the worker.
+        workers: A dictionary of the families in SCHEMA_FAMILIES onto the number of workers of that family.
+        dropped: A collections.Counter of (family, index) onto messages dropped, updated in place.
+        reporter: When set, a cogdb.eddn_stats.StatsReporter. Messages no worker will handle are reported as skipped.
+    """
+    msg = decode_msg(payload)
+    if not msg_is_wanted(msg):
+        return
+
+    LOGS['all'].write_payload(payload)
+    key = route_msg(msg, workers)
+    if key:
+        try:
+            pushes[key].send(payload, zmq.NOBLOCK)
+            return
+        except zmq.Again:
+            dropped[key] += 1
+
+    if reporter:
+        reporter.report(msg, skipped=True)
+
+
+def check_workers(procs, dropped, *, log_level="INFO", stats=None):  # pragma: no cover
+    """
+    Restart dead workers and report any messages dropped since the last check.
+
+    Args:
+        procs: A dictionary of (family, index) onto the worker processes, updated in place.
+        dropped: A collections.Counter of (family, index) onto messages dropped, cleared after reporting.
+        log_level: The STDOUT logging level of workers.
+        stats: Passed to every worker, see worker_main.
+    """
+    restart_workers(procs, log_level=log_level, stats=stats)
+    if dropped:
+        logging.getLogger(__name__).error("Workers behind, dropped messages: %s", dict(dropped))
+        dropped.clear()
+
+
+def supervise(sub, workers, *, addr=EDDN_ADDR, log_level="INFO", stats=None):  # pragma: no cover
+    """
+    Receive messages from the relay and shard them onto pools of worker processes by schema family.
+    The supervisor only decodes, filters and captures messages, workers parse and update the database.
+    A worker that falls behind by WORKER_QUEUE_SIZE messages has further messages dropped rather than
+    stalling the other families.
+
+    Like connect_loop, the relay is reconnected on a socket error or after TIMEOUT without messages.
+    Workers keep running across reconnects and are checked every WORKER_CHECK_DELAY, dead ones are restarted.
+
+    Args:
+        sub: The zmq SUB socket, not yet connected.
+        workers: A dictionary of the families in SCHEMA_FAMILIES onto the number of workers of that family.
+        addr: The address of the relay to connect to.
+        log_level: The STDOUT logging level of workers.
+        stats: Passed to every worker, see worker_main. Messages not sent to a worker are reported as skipped.
+    """
+    log = logging.getLogger(__name__)
+    pushes, procs = start_workers(sub.context, workers, log_level=log_level, stats=stats)
+    reporter = cogdb.eddn_stats.StatsReporter(stats, []) if stats else None
+    dropped = collections.Counter()
+    poller = zmq.Poller()
+    poller.register(sub, zmq.POLLIN)
+    last_check = time.time()
+    try:
+        while True:
+            try:
+                sub.connect(addr)
+                last_msg = time.time()
+                while time.time() - last_msg < TIMEOUT / 1000:
+                    if poller.poll(WORKER_CHECK_DELAY * 1000):
+                        forward_msg(sub.recv(zmq.NOBLOCK), pushes, workers, dropped, reporter)
+                        last_msg = time.time()
+
+                    if time.time() - last_check > WORKER_CHECK_DELAY:
+                        last_check = time.time()
+                        check_workers(procs, dropped, log_level=log_level, stats=stats)
+                log.info("No messages for %d seconds. Reconnecting.", TIMEOUT // 1000)
+            except zmq.ZMQError as exc:
+                log.info("ZMQ Socket error. Reconnecting soon.\n\n%s", exc)
+                time.sleep(5)
+
+            try:
+                sub.disconnect(addr)
+            except zmq.ZMQError:
+                pass
+    finally:
+        for proc in procs.values():
+            proc.terminate()
+            proc.join(5)
+        for push in pushes.values():
+            push.close(linger=0)
+        if reporter:
+            reporter.close()
+
+
+def init_eddn_log(fname, log_level="INFO", disable_log_all=True, name=None):  # pragma: no cover
     """
     Create a simple file and stream logger for eddn separate from main bot's logging.
+    When name is set, messages are captured into folders suffixed by it, used by workers.
     """
     log = logging.getLogger(__name__)
     for hand in log.handlers:
         log.removeHandler(hand)
     log.setLevel("DEBUG")
 
-    log_fmt = logging.Formatter(fmt="[%(levelname)-5.5s] %(asctime)s %(name)s.%(funcName)s()::%(lineno)s | %(message)s")
+    log_fmt = logging.Formatter(
+        fmt="[%(levelname)-5.5s] %(asctime)s %(processName)s %(name)s.%(funcName)s()::%(lineno)s | %(message)s"
+    )
     handler = logging.handlers.RotatingFileHandler(fname, maxBytes=2 ** 20, backupCount=3, encoding='utf8')
     handler.setFormatter(log_fmt)
     handler.setLevel('DEBUG')
@@ -998,16 +1561,26 @@ def init_eddn_log(fname, log_level="INFO", disable_log_all=True):  # pragma: no
     log.addHandler(handler)
 
     # Specific loggers for separate streams of messages
+    suffix = f"_{name}" if name else ''
     LOGS.update({
-        'all': EDDNLogger(folder=ALL_MSGS, reset=True, disabled=disable_log_all),
-        'carriers': EDDNLogger(folder=CARRIER_MSGS, keep_n=200, reset=True, disabled=False),
-        'journals': EDDNLogger(folder=JOURNAL_MSGS, keep_n=200, reset=True, disabled=False),
-        'commodities': EDDNLogger(folder=COMMS_MSGS, reset=True, disabled=False),
-        'modules': EDDNLogger(folder=MODS_MSGS, reset=True, disabled=False),
-        'shipyards': EDDNLogger(folder=SHIPS_MSGS, reset=True, disabled=False),
+        'all': EDDNCapture(folder=ALL_MSGS + suffix, reset=True, disabled=disable_log_all),
+        'carriers': EDDNCapture(folder=CARRIER_MSGS + suffix, reset=True, disabled=False),
+        'journals': EDDNCapture(folder=JOURNAL_MSGS + suffix, reset=True, disabled=False),
+        'commodities': EDDNCapture(folder=COMMS_MSGS + suffix, reset=True, disabled=False),
+        'modules': EDDNCapture(folder=MODS_MSGS + suffix, reset=True, disabled=False),
+        'shipyards': EDDNCapture(folder=SHIPS_MSGS + suffix, reset=True, disabled=False),
     })
 
 
+def close_eddn_log():  # pragma: no cover
+    """
+    Write out any messages still queued for capture and stop the writers.
+    """
+    for capture in LOGS.values():
+        capture.close()
+    LOGS.clear()
+
+
 def create_args_parser():  # pragma: no cover
     """
     Return parser for using this component on command line.
@@ -1017,6 +1590,16 @@ def create_args_parser():  # pragma: no cover
                         help='Set the STDOUT logging level.')
     parser.add_argument('--no-all', '-a', action='store_false', dest='disable_all',
                         help='Capture all messages received.')
+    parser.add_argument('--addr', default=EDDN_ADDR,
+                        help='The relay to connect to, i.e. a local cogdb.eddn_replay.')
+    parser.add_argument('--stats',
+                        help='Report every message handled to this cogdb.eddn_replay stats address.')
+    parser.add_argument('--supervise', action='store_true',
+                        help='Shard messages by schema family onto pools of worker processes.')
+    parser.add_argument('--journal-workers', type=int, default=1,
+                        help='The number of worker processes for journal messages, with --supervise.')
+    parser.add_argument('--market-workers', type=int, default=1,
+                        help='The number of worker processes for market messages, with --supervise.')
 
     return parser
 
@@ -1033,6 +1616,9 @@ def main():  # pragma: no cover
     sub = zmq.Context().socket(zmq.SUB)
     sub.setsockopt(zmq.SUBSCRIBE, b'')
     sub.setsockopt(zmq.RCVTIMEO, TIMEOUT)
+    reporter = None
+    if args.stats and not args.supervise:
+        reporter = cogdb.eddn_stats.StatsReporter(args.stats, [cogdb.engine, cogdb.eddb_engine])
 
     try:
         print(f"connection established, reading messages.\nOutput at: {LOG_FILE}")
@@ -1040,10 +1626,19 @@ def main():  # pragma: no cover
         for key in SCHEMA_MAP:
             print('\t' + key)
         print('\n')
-        connect_loop(sub)
+        if args.supervise:
+            workers = {'journal': args.journal_workers, 'market': args.market_workers}
+            supervise(sub, workers, addr=args.addr, log_level=args.level, stats=args.stats)
+        else:
+            connect_loop(sub, args.addr, reporter)
     except KeyboardInterrupt:
         msg = """Terminating ZMQ connection."""
         print(msg)
+    finally:
+        flush_snapshots(force=True)
+        close_eddn_log()
+        if reporter:
+            reporter.close()
 
 
 try:
@@ -1055,6 +1650,8 @@ except (sqla_orm.exc.NoResultFound, sqla.exc.ProgrammingError):
     MAPS = None
     FACTION_CACHE = None
     STATION_CACHE = None
+SNAPSHOTS = SnapshotCache()
+HISTORY_CACHE = cogdb.eddb.HistoryInfluenceCache()
 
 
 if __name__ == "__main__":
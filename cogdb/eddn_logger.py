@@ -1,15 +1,38 @@
 """
 cogdb.eddn_logger
 A loger for tracking the last n EDDN messages into a folder.
+
+EDDNCapture is the low overhead alternative used by the listener, messages are appended
+compressed to rotating segment files by a background thread.
+To inspect captured messages later see documentation with -h.
+    python -m cogdb.eddn_logger /tmp/eddn_journals --last 5
 """
+import argparse
+import collections
 import logging
 import os
 import pathlib
 import pprint
+import queue
 import shutil
+import struct
+import sys
+import threading
+import zlib
+try:
+    import rapidjson as json
+except ImportError:
+    import json
 
 import cog.util
 
+CAPTURE_SEGMENT_SIZE = 8 * 1024 * 1024  # bytes, rotate segments beyond this
+CAPTURE_KEEP_SEGMENTS = 4
+CAPTURE_QUEUE_SIZE = 10000
+CAPTURE_GLOB = 'segment_*.eddn'
+# Every record in a segment is the length of the payload followed by the zlib compressed JSON payload
+RECORD_HEADER = struct.Struct('>I')
+
 
 def log_fname(msg):
     """
@@ -31,6 +54,36 @@ def log_fname(msg):
     return cog.util.clean_fname(fname, replacement='_', replace_spaces=True)
 
 
+def prepare_folder(folder, reset=False):
+    """
+    Ensure a folder exists and is writable to log messages into.
+
+    Args:
+        folder: The pathlib.Path of the folder.
+        reset: When True, recreate the folder to get a clean slate.
+
+    Raises:
+        OSError: One of the following situations occurred.
+            - Failed to reset the directory due to permissions.
+            - Folder set is a file or no permission to write into it.
+            - Failed to create the folder when it didn't exist.
+    """
+    if reset:
+        try:
+            shutil.rmtree(folder)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logging.getLogger(__name__).error("EDDNLog: Failed to reset folder: %s", folder)
+            raise
+
+    if not folder.exists():
+        folder.mkdir()
+
+    if folder.is_file() or not os.access(str(folder), os.W_OK):
+        raise OSError(f"EDDNLog: Set folder is a file or unable to write to directory: {folder}")
+
+
 class EDDNLogger():
     """
     Create an EDDN Logger to manage writing out received EDDN messages, allows a dev to inspect
@@ -52,25 +105,9 @@ class EDDNLogger():
             reset: When True, recreate the messages folder to get a clean slate.
 
         Raises:
-            OSError: One of the following situations occurred.
-                - Failed to reset the directory due to permissions.
-                - Folder set is a file or no permission to write into it.
-                - Failed to create the folder when it didn't exist.
+            OSError: See prepare_folder.
         """
-        if reset:
-            try:
-                shutil.rmtree(self.folder)
-            except FileNotFoundError:
-                pass
-            except OSError:
-                logging.getLogger(__name__).error("EDDNLog: Failed to reset folder: %s", self.folder)
-                raise
-
-        if not self.folder.exists():
-            self.folder.mkdir()
-
-        if self.folder.is_file() or not os.access(str(self.folder), os.W_OK):
-            raise OSError(f"EDDNLog: Set folder is a file or unable to write to directory: {self.folder}")
+        prepare_folder(self.folder, reset)
 
     def check_kept_messages(self):
         """
@@ -106,3 +143,229 @@ class EDDNLogger():
 
         self.count = (self.count + 1) % self.keep_n
         return fpath
+
+
+class EDDNCapture():
+    """
+    Capture EDDN messages with minimal overhead on the listener.
+    Messages are queued and a background thread appends them compressed to segment files.
+    Segments rotate once they exceed segment_size bytes, only the newest keep_segments are kept.
+    When the writer can't keep up messages are dropped rather than blocking the listener.
+
+    Attributes:
+        folder: The folder to write segments into.
+        segment_size: Rotate to a new segment once the current is this many bytes.
+        keep_segments: The number of segments to keep, including the one being written.
+        disabled: When True, nothing is captured.
+        dropped: The number of messages dropped because the queue was full.
+    """
+    def __init__(self, *, folder, segment_size=CAPTURE_SEGMENT_SIZE, keep_segments=CAPTURE_KEEP_SEGMENTS,
+                 queue_size=CAPTURE_QUEUE_SIZE, reset=False, disabled=False):
+        self.folder = pathlib.Path(folder)
+        self.segment_size = segment_size
+        self.keep_segments = keep_segments
+        self.disabled = disabled
+        self.dropped = 0
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.fout = None
+        self.segment = None
+        self.thread = None
+        prepare_folder(self.folder, reset)
+
+        segments = list_segments(self.folder)
+        self.segment_num = int(segments[-1].stem.split('_')[-1]) + 1 if segments else 0
+        if not self.disabled:
+            self.thread = threading.Thread(target=self.writer, name=f'EDDNCapture-{self.folder.name}', daemon=True)
+            self.thread.start()
+
+    def write_msg(self, msg):
+        """
+        Queue a decoded EDDN message to be captured, it will be encoded and compressed off the listener.
+
+        Args:
+            msg: An EDDN Message.
+
+        Returns: True iff the message was queued.
+        """
+        return self.put(msg)
+
+    def write_payload(self, payload):
+        """
+        Queue a raw EDDN payload to be captured, as received it is already compressed.
+
+        Args:
+            payload: The zlib compressed JSON payload.
+
+        Returns: True iff the payload was queued.
+        """
+        return self.put(payload)
+
+    def put(self, item):
+        """
+        Queue an item for the writer without ever blocking.
+
+        Returns: True iff the item was queued.
+        """
+        if self.disabled:
+            return False
+
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def writer(self):
+        """
+        Write all queued items until the sentinel None is received.
+        """
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+
+                self.write_record(item)
+                if self.queue.empty():
+                    self.fout.flush()
+        except OSError:
+            logging.getLogger(__name__).error("EDDNCapture: Failed writing to: %s", self.segment)
+        finally:
+            if self.fout:
+                self.fout.close()
+                self.fout = None
+
+    def write_record(self, item):
+        """
+        Append a single record to the current segment, rotating as needed.
+
+        Args:
+            item: Either the compressed payload bytes or a decoded message.
+        """
+        if not isinstance(item, bytes):
+            item = zlib.compress(json.dumps(item).encode())
+
+        if not self.fout or self.fout.tell() >= self.segment_size:
+            self.rotate()
+        self.fout.write(RECORD_HEADER.pack(len(item)))
+        self.fout.write(item)
+
+    def rotate(self):
+        """
+        Close the current segment, start the next and remove the oldest beyond keep_segments.
+        """
+        if self.fout:
+            self.fout.close()
+
+        self.segment = self.folder / CAPTURE_GLOB.replace('*', f'{self.segment_num:06}')
+        self.segment_num += 1
+        self.fout = open(self.segment, 'ab')  # pylint: disable=consider-using-with
+
+        for old in list_segments(self.folder)[:-self.keep_segments]:
+            try:
+                old.unlink()
+            except OSError:
+                logging.getLogger(__name__).error("EDDNCapture: Failed to remove: %s", old)
+
+    def close(self):
+        """
+        Write out everything queued and stop the writer.
+        """
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+def list_segments(folder):
+    """
+    List the capture segments in a folder, oldest first.
+
+    Args:
+        folder: The folder of an EDDNCapture.
+
+    Returns: A list of pathlib.Path objects.
+    """
+    return sorted(pathlib.Path(folder).glob(CAPTURE_GLOB))
+
+
+def read_segment(fname):
+    """
+    Read all records in a capture segment.
+    A truncated record at the end, from an interrupted write, is ignored.
+
+    Args:
+        fname: The segment to read.
+
+    Returns: A generator of the zlib compressed payloads.
+    """
+    with open(fname, 'rb') as fin:
+        while True:
+            header = fin.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+
+            length = RECORD_HEADER.unpack(header)[0]
+            payload = fin.read(length)
+            if len(payload) < length:
+                logging.getLogger(__name__).warning("EDDNCapture: Truncated record in: %s", fname)
+                break
+            yield payload
+
+
+def read_captures(path):
+    """
+    Read and decode all captured messages, oldest first.
+
+    Args:
+        path: A single segment or a folder of segments.
+
+    Returns: A generator of the decoded EDDN messages.
+    """
+    path = pathlib.Path(path)
+    segments = list_segments(path) if path.is_dir() else [path]
+    for segment in segments:
+        for payload in read_segment(segment):
+            yield json.loads(zlib.decompress(payload))
+
+
+def make_parser():
+    """
+    Make the parser for command line usage.
+
+    Returns: An instance of argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="Read EDDN Captures")
+    parser.add_argument('path',
+                        help='A capture folder or a single segment file.')
+    parser.add_argument('--schema', '-s',
+                        help='Only show messages whose $schemaRef contains this, i.e. journal')
+    parser.add_argument('--last', '-l', type=int,
+                        help='Only show the last N messages.')
+    parser.add_argument('--compact', '-c', action='store_true',
+                        help='Print one message per line rather than pretty printed.')
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Print captured messages for inspection.
+    """
+    args = make_parser().parse_args(argv)
+    msgs = read_captures(args.path)
+    if args.schema:
+        msgs = (x for x in msgs if args.schema in x.get('$schemaRef', ''))
+    if args.last:
+        msgs = collections.deque(msgs, maxlen=args.last)
+
+    for msg in msgs:
+        if args.compact:
+            print(json.dumps(msg))
+        else:
+            pprint.pprint(msg, stream=sys.stdout)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
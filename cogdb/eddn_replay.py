@@ -0,0 +1,365 @@
+"""
+Replay captured EDDN messages through a local ZMQ PUB socket standing in for the relay.
+Used to load test the listener in cogdb.eddn without the live relay.
+See documentation with -h.
+
+Captures can be any mix of:
+    - Folders or segment files written by cogdb.eddn_logger.EDDNCapture.
+    - Files written by extras/eddn_capture.py, either .json or .jsonl.
+    - Files written by cogdb.eddn_logger.EDDNLogger, one pretty printed message each.
+    - JSON arrays or line delimited JSON, like the fixtures in tests/eddn_data (the default).
+
+Replayed messages have the gatewayTimestamp set to the time sent, so the listener does not drop them as old.
+When the listener is started with --stats it reports every message handled back to this tool.
+Point the listener at a test database, replayed messages are written to it.
+
+To replay the fixtures at 10x the original rate in one terminal:
+    python -m cogdb.eddn_replay --rate 10 --duration 60
+Then in another:
+    python -m cogdb.eddn --addr tcp://127.0.0.1:9600 --stats tcp://127.0.0.1:9601
+"""
+import argparse
+import ast
+import collections
+import datetime
+import math
+import pathlib
+import threading
+import time
+import zlib
+
+import zmq
+try:
+    import rapidjson as json
+except ImportError:
+    import json
+
+import cog.tbl
+import cog.util
+import cogdb.eddn_logger
+from cogdb.eddn_stats import REPLAY_KEY
+
+REPLAY_ADDR = "tcp://127.0.0.1:9600"
+STATS_ADDR = "tcp://127.0.0.1:9601"
+SEED_CORPUS = cog.util.rel_to_abs('tests', 'eddn_data')
+MAX_GAP = 1.0  # Longest pause between messages at rate 1, captures can span days
+SUBSCRIBE_WAIT = 2  # Seconds for the listener to subscribe, PUB drops messages until then
+PERCENTILES = [50, 90, 99]
+
+
+def make_parser():
+    """
+    Make the parser for command line usage.
+
+    Returns: An instance of argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="EDDN Replay and Load Test")
+    parser.add_argument('captures', nargs='*', default=[SEED_CORPUS],
+                        help='Capture files or folders to replay. Default: tests/eddn_data')
+    parser.add_argument('--rate', '-r', type=float, default=1.0,
+                        help='Multiplier of the original message rate, 0 sends as fast as possible.')
+    parser.add_argument('--duration', '-d', type=float, default=60,
+                        help='Seconds to replay for, the captures loop as needed.')
+    parser.add_argument('--addr', '-a', default=REPLAY_ADDR,
+                        help='The address to publish messages on, give the listener this with --addr.')
+    parser.add_argument('--stats', '-s', default=STATS_ADDR,
+                        help='The address to receive stats on, give the listener this with --stats.')
+    parser.add_argument('--count', '-c', type=int,
+                        help='Stop after sending this many messages, even if duration has not passed.')
+    parser.add_argument('--drain', type=float, default=10,
+                        help='Seconds to wait after sending for the listener to finish.')
+
+    return parser
+
+
+def load_json_captures(fname):
+    """
+    Load messages from a JSON capture file.
+    Handles complete JSON arrays, the unterminated arrays with trailing commas
+    written by extras/eddn_capture.py and line delimited JSON.
+
+    Args:
+        fname: The file to load.
+
+    Returns: A list of EDDN messages.
+    """
+    with open(fname, 'r', encoding='utf-8') as fin:
+        text = fin.read().strip()
+
+    try:
+        array = text if text.startswith('[') else '[' + text
+        return json.loads(array.rstrip(']').rstrip().rstrip(',') + ']')
+    except ValueError:
+        pass
+
+    msgs = []
+    for line in text.splitlines():
+        line = line.strip().rstrip(',')
+        if line and line not in ('[', ']'):
+            msgs += [json.loads(line)]
+
+    return msgs
+
+
+def load_captures(path):
+    """
+    Load all messages from a capture file or a folder of them, see module documentation for formats.
+
+    Args:
+        path: A file or folder.
+
+    Returns: A list of EDDN messages, files of a folder are loaded in sorted order.
+    """
+    path = pathlib.Path(path)
+    if path.is_dir():
+        if cogdb.eddn_logger.list_segments(path):
+            return list(cogdb.eddn_logger.read_captures(path))
+        return [msg for fname in sorted(x for x in path.iterdir() if x.is_file()) for msg in load_captures(fname)]
+
+    if path.match(cogdb.eddn_logger.CAPTURE_GLOB):
+        return list(cogdb.eddn_logger.read_captures(path))
+
+    try:
+        return load_json_captures(path)
+    except ValueError:
+        with open(path, 'r', encoding='utf-8') as fin:
+            return [ast.literal_eval(fin.read())]
+
+
+def schedule(msgs, *, rate=1.0, max_gap=MAX_GAP):
+    """
+    Compute the delay before sending every message to reproduce the original spacing, scaled by rate.
+    The original spacing comes from the gatewayTimestamp of messages.
+
+    Args:
+        msgs: The list of EDDN messages in order.
+        rate: Multiplier of the original rate, 0 means no delays.
+        max_gap: The longest delay before scaling, prevents stalling on gaps between captures.
+
+    Returns: A list of delays in seconds, one per message.
+    """
+    if not rate:
+        return [0.0] * len(msgs)
+
+    delays, last = [], None
+    for msg in msgs:
+        try:
+            current = cog.util.parse_timestamp(msg['header']['gatewayTimestamp'])
+        except (KeyError, ValueError):
+            current = last
+        gap = (current - last).total_seconds() if current and last else 0.0
+        delays += [min(max(gap, 0.0), max_gap) / rate]
+        last = current or last
+
+    return delays
+
+
+def stamp_msg(msg, now=None):
+    """
+    Prepare a message to be replayed now, the header is copied so the original is unchanged.
+
+    Args:
+        msg: An EDDN message.
+        now: The UNIX time it is sent, defaults to current time.
+
+    Returns: The payload to publish, zlib compressed JSON as the relay sends.
+    """
+    now = now if now else time.time()
+    header = dict(msg['header'])
+    sent_at = datetime.datetime.fromtimestamp(now, datetime.timezone.utc)
+    header['gatewayTimestamp'] = sent_at.strftime(cog.util.TIME_STRP_MICRO)
+    header[REPLAY_KEY] = now
+
+    return zlib.compress(json.dumps(dict(msg, header=header)).encode())
+
+
+def percentile(values, pct):
+    """
+    The nearest rank percentile of values.
+
+    Args:
+        values: A sorted list of numbers.
+        pct: The percentile in [0, 100].
+
+    Returns: The value at the percentile, 0 when there are no values.
+    """
+    if not values:
+        return 0
+    return values[max(math.ceil(pct / 100 * len(values)) - 1, 0)]
+
+
+class StatsCollector():
+    """
+    Replay side, collect the reports of the listener in a background thread.
+
+    Attributes:
+        records: The reports received.
+        backlog: Samples of (seconds since start, messages sent but not yet handled).
+    """
+    def __init__(self, addr):
+        self.socket = zmq.Context.instance().socket(zmq.PULL)
+        self.socket.bind(addr)
+        self.socket.setsockopt(zmq.RCVTIMEO, 250)
+        self.records = []
+        self.backlog = []
+        self.sent = 0
+        self.start = time.time()
+        self.running = True
+        self.thread = threading.Thread(target=self.collect, name='EDDNStatsCollector', daemon=True)
+        self.thread.start()
+
+    def collect(self):
+        """ Receive reports until stopped, sample the backlog every second. """
+        last_sample = 0
+        while self.running:
+            try:
+                self.records += [json.loads(self.socket.recv())]
+            except zmq.Again:
+                pass
+
+            if time.time() - last_sample >= 1:
+                last_sample = time.time()
+                self.backlog += [(round(last_sample - self.start, 1), self.sent - len(self.records))]
+
+    def close(self):
+        """ Stop collecting and close the socket. """
+        self.running = False
+        self.thread.join()
+        self.socket.close(linger=0)
+
+
+def summarize(records, *, sent, elapsed, backlog):
+    """
+    Summarize the reports of a replay.
+
+    Args:
+        records: The reports received from the listener, see cogdb.eddn_stats.StatsReporter.report.
+        sent: The number of messages sent.
+        elapsed: The seconds spent sending.
+        backlog: The samples of backlog, see StatsCollector.
+
+    Returns: A dictionary summarizing the replay.
+    """
+    skipped = [x for x in records if x.get('skipped')]
+    records = [x for x in records if not x.get('skipped')]
+    by_schema = collections.defaultdict(list)
+    for record in records:
+        by_schema[record['schema']] += [record]
+
+    schemas = {}
+    for schema, group in sorted(by_schema.items()):
+        latencies = sorted((x['done'] - x['sent']) * 1000 for x in group if x['sent'])
+        schemas[schema] = {
+            'count': len(group),
+            'queries_per_msg': round(sum(x['queries'] for x in group) / len(group), 2),
+            **{f'p{pct}_ms': round(percentile(latencies, pct), 1) for pct in PERCENTILES},
+        }
+
+    done = [x['done'] for x in records]
+    handled_span = (max(done) - min(done)) if len(done) > 1 else 0
+    backlog_span = backlog[-1][0] - backlog[0][0] if len(backlog) > 1 else 0
+    return {
+        'sent': sent,
+        'handled': len(records),
+        'skipped': len(skipped),
+        'sent_per_second': round(sent / elapsed, 1) if elapsed else 0.0,
+        'handled_per_second': round(len(records) / handled_span, 1) if handled_span else 0.0,
+        'backlog_max': max([x[1] for x in backlog], default=0),
+        'backlog_end': backlog[-1][1] if backlog else 0,
+        'backlog_growth_per_second': round((backlog[-1][1] - backlog[0][1]) / backlog_span, 2) if backlog_span else 0.0,
+        'schemas': schemas,
+    }
+
+
+def format_summary(summary):
+    """
+    Format a summary into a report for the terminal.
+
+    Args:
+        summary: The summary returned by summarize.
+
+    Returns: The report as a string.
+    """
+    lines = [['Schema', 'Messages', 'Queries/msg'] + [f'p{pct} (ms)' for pct in PERCENTILES]]
+    lines += [
+        [schema, info['count'], info['queries_per_msg']] + [info[f'p{pct}_ms'] for pct in PERCENTILES]
+        for schema, info in summary['schemas'].items()
+    ]
+
+    return f"""Sent: {summary['sent']} ({summary['sent_per_second']}/s)
+Handled: {summary['handled']} ({summary['handled_per_second']}/s sustained)
+Skipped: {summary['skipped']} (not handled by any worker)
+Backlog: max {summary['backlog_max']}, at end {summary['backlog_end']}, growth {summary['backlog_growth_per_second']}/s
+
+""" + cog.tbl.format_table(lines, header=True, wrap_msgs=False, limit=10 ** 6)[0]
+
+
+def replay(msgs, *, addr, rate, duration, limit=None, collector=None):
+    """
+    Publish the messages on addr following their schedule, looping until duration passes or limit are sent.
+
+    Args:
+        msgs: The EDDN messages to replay.
+        addr: The address to bind the PUB socket to.
+        rate: The rate multiplier, see schedule.
+        duration: The seconds to replay for.
+        limit: If provided, the most messages to send.
+        collector: If provided, the StatsCollector to update the count sent on.
+
+    Returns: (sent, elapsed), the number of messages sent and seconds spent sending.
+    """
+    delays = schedule(msgs, rate=rate)
+    pub = zmq.Context.instance().socket(zmq.PUB)
+    pub.bind(addr)
+    time.sleep(SUBSCRIBE_WAIT)
+
+    sent, start = 0, time.time()
+    next_send = start
+    limit = limit if limit else float('inf')
+    try:
+        while time.time() - start < duration and sent < limit:
+            for msg, delay in zip(msgs, delays):
+                next_send += delay
+                pause = next_send - time.time()
+                if pause > 0:
+                    time.sleep(pause)
+                pub.send(stamp_msg(msg))
+                sent += 1
+                if collector:
+                    collector.sent = sent
+                if time.time() - start >= duration or sent >= limit:
+                    break
+    finally:
+        pub.close(linger=1000)
+
+    return sent, time.time() - start
+
+
+def main():  # pragma: no cover
+    """
+    Replay the captures and report on how the listener kept up.
+    """
+    args = make_parser().parse_args()
+    msgs = [msg for path in args.captures for msg in load_captures(path) if 'header' in msg]
+    if not msgs:
+        print("No messages found to replay.")
+        return
+    print(f"Loaded {len(msgs)} messages, replaying at rate {args.rate or 'max'} for {args.duration}s on {args.addr}")
+
+    collector = StatsCollector(args.stats)
+    try:
+        sent, elapsed = replay(msgs, addr=args.addr, rate=args.rate, duration=args.duration,
+                               limit=args.count, collector=collector)
+        drain_end = time.time() + args.drain
+        while len(collector.records) < sent and time.time() < drain_end:
+            time.sleep(0.25)
+    except KeyboardInterrupt:
+        sent, elapsed = collector.sent, time.time() - collector.start
+    finally:
+        collector.close()
+
+    print(format_summary(summarize(collector.records, sent=sent, elapsed=elapsed, backlog=collector.backlog)))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,68 @@
+"""
+cogdb.eddn_stats
+Shared by the listener in cogdb.eddn and the replay tool in cogdb.eddn_replay.
+
+When the listener is started with --stats it uses StatsReporter to report every
+message handled back to the replay tool, which collects and summarizes them.
+"""
+import time
+
+import sqlalchemy as sqla
+import zmq
+try:
+    import rapidjson as json
+except ImportError:
+    import json
+
+REPLAY_KEY = 'replaySentAt'
+
+
+def msg_schema(msg):
+    """
+    Returns: The short name of the schema of the message, i.e. journal/1
+    """
+    return '/'.join(msg.get('$schemaRef', 'unknown').split('/')[-2:])
+
+
+class StatsReporter():
+    """
+    Listener side of the replay, reports every message handled back to the replay tool.
+    Counts statements executed on the engines given between reports.
+    """
+    def __init__(self, addr, engines):
+        self.socket = zmq.Context.instance().socket(zmq.PUSH)
+        self.socket.connect(addr)
+        self.queries = 0
+        self.engines = engines
+        for engine in engines:
+            sqla.event.listen(engine, 'before_cursor_execute', self.increment)
+
+    def increment(self, *_):
+        """ Count a statement. """
+        self.queries += 1
+
+    def report(self, msg, *, skipped=False):
+        """
+        Report a message was handled, resets the statement count.
+
+        Args:
+            msg: The EDDN message handled.
+            skipped: True if the message was received but will never be processed.
+        """
+        try:
+            self.socket.send(json.dumps({
+                'schema': msg_schema(msg),
+                'sent': msg.get('header', {}).get(REPLAY_KEY),
+                'done': time.time(),
+                'queries': self.queries,
+                'skipped': skipped,
+            }).encode(), zmq.NOBLOCK)
+        except zmq.Again:  # Replay tool not listening, never block the listener
+            pass
+        self.queries = 0
+
+    def close(self):
+        """ Stop counting and close the socket. """
+        for engine in self.engines:
+            sqla.event.remove(engine, 'before_cursor_execute', self.increment)
+        self.socket.close(linger=1000)
@@ -5,6 +5,7 @@ import contextlib
 import logging
 import os
 import tempfile
+import time
 
 import sqlalchemy as sqla
 import sqlalchemy.exc as sqla_exc
@@ -17,7 +18,7 @@ import cogdb.eddb
 import cogdb.spy_squirrel as spy
 from cog.util import fuzzy_find
 from cogdb.schema import (DiscordUser, FortSystem, FortPrep, FortDrop, FortUser, FortOrder,
-                          EFortType, UMSystem, UMUser, UMHold, EUMSheet, EUMType, KOS,
+                          EFortType, UMSystem, UMUser, UMHold, EUMSheet, EUMType, KOS, InaraCache,
                           AdminPerm, ChannelPerm, RolePerm,
                           TrackSystem, TrackSystemCached, TrackByID,
                           Global, Vote, EVoteType, Consolidation,
@@ -931,6 +932,69 @@ def kos_add_cmdr(session, kos_info):
                            reason=kos_info['reason'], is_friendly=kos_info['is_friendly']))
 
 
+def inara_cache_get(session, kind, key, *, now=None):
+    """
+    Get a cached result of a lookup on inara.cz, see InaraCache.
+
+    Args:
+        session: A session onto the database.
+        kind: The kind of lookup, i.e. 'profile'.
+        key: The search term or id looked up, case insensitive.
+        now: The current timestamp, by default the time now.
+
+    Raises:
+        NoMatch - There is no fresh result cached.
+
+    Returns: The payload cached, None if the lookup found nothing.
+    """
+    entry = session.get(InaraCache, (kind, str(key).lower()))
+    if not entry or not entry.is_fresh(now):
+        raise cog.exc.NoMatch(key, 'InaraCache')
+
+    return entry.payload
+
+
+def inara_cache_get_many(session, kind, keys, *, now=None):
+    """
+    Get the cached results of many lookups on inara.cz of one kind in a single query, see InaraCache.
+
+    Args:
+        session: A session onto the database.
+        kind: The kind of lookup, i.e. 'profile'.
+        keys: The search terms or ids looked up, case insensitive.
+        now: The current timestamp, by default the time now.
+
+    Returns: A dictionary of key -> payload for every key with a fresh result, keys as given.
+    """
+    by_lower = {str(key).lower(): key for key in keys}
+    if not by_lower:
+        return {}
+
+    entries = session.query(InaraCache).\
+        filter(InaraCache.kind == kind, InaraCache.key.in_(list(by_lower))).\
+        all()
+
+    return {by_lower[x.key]: x.payload for x in entries if x.is_fresh(now)}
+
+
+def inara_cache_put(session, kind, key, payload):
+    """
+    Cache the result of a lookup on inara.cz, replacing any older result.
+
+    Args:
+        session: A session onto the database.
+        kind: The kind of lookup, i.e. 'profile'.
+        key: The search term or id looked up, case insensitive.
+        payload: The result to cache, must be JSON serializable. None records nothing was found.
+
+    Returns: The InaraCache entry.
+    """
+    entry = session.merge(InaraCache(kind=kind, key=str(key).lower(), payload=payload, updated_at=time.time()))
+    session.flush()
+
+    return entry
+
+
 def track_add_systems(session, systems, distance):
     """
     Add all systems specified to tracking with distance specified.
@@ -1341,6 +1405,19 @@ def get_consolidation_in_range(session, start, end=None):
     return query.order_by(Consolidation.updated_at.asc()).all()
 
 
+def get_consolidation_marker(session):
+    """
+    Identify the latest consolidation tracking data written.
+    The marker changes only when a new Consolidation is added, cheap to check before reusing results.
+
+    Args:
+        session: Session to the db.
+
+    Returns: The id of the latest Consolidation, 0 if there are none.
+    """
+    return session.query(sqla.func.max(Consolidation.id)).scalar() or 0
+
+
 def fort_response_normal(session, eddb_session, *, next_systems=3):
     """Create the normal fort message with current targets.
 
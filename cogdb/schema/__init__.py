@@ -12,6 +12,7 @@ from cogdb.schema.consolidation import Consolidation
 from cogdb.schema.discord_user import DiscordUser
 from cogdb.schema.fort import EFortType, FortOrder, FortDrop, FortUser, FortSystem, FortPrep
 from cogdb.schema.global_config import Global
+from cogdb.schema.inara_cache import InaraCache
 from cogdb.schema.kos import KOS
 from cogdb.schema.permissions import AdminPerm, ChannelPerm, RolePerm
 from cogdb.schema.sheet_record import ESheetType, SheetRecord
@@ -165,7 +166,7 @@ def empty_tables(session, *, perm=False):
     Drop all tables.
     """
     classes = [SheetRecord, FortDrop, UMHold, FortSystem, UMSystem, FortUser, UMUser, KOS,
-               KOS, TrackSystem, TrackSystemCached, TrackByID,
+               KOS, InaraCache, TrackSystem, TrackSystemCached, TrackByID,
                AdminPerm, ChannelPerm, RolePerm]
     if perm:
         classes += [DiscordUser]
@@ -9,6 +9,7 @@ LEN = {
     'carrier': 7,
     'action_name': 25,
     'command': 2000,
+    'inara_kind': 10,
     'name': 100,
     'reason': 400,
     'sheet_col': 5,
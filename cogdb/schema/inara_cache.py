@@ -0,0 +1,49 @@
+"""
+Cache of results fetched from inara.cz, shared across restarts.
+"""
+import time
+
+import sqlalchemy as sqla
+
+from cogdb.schema.common import Base, LEN
+from cog.util import ReprMixin
+
+INARA_CACHE_TTL = 24 * 3600  # Seconds a found result is kept
+INARA_CACHE_NEGATIVE_TTL = 3600  # Seconds a result of nothing found is kept
+
+
+class InaraCache(ReprMixin, Base):
+    """
+    A result from inara.cz stored under the kind of lookup and its key.
+    A payload of None records that nothing was found.
+    """
+    __tablename__ = 'inara_cache'
+    _repr_keys = ['kind', 'key', 'payload', 'updated_at']
+
+    kind = sqla.Column(sqla.String(LEN['inara_kind']), primary_key=True)  # i.e. 'profile', 'squad', 'page'
+    key = sqla.Column(sqla.String(LEN['name']), primary_key=True)  # Lower case search term or id
+    payload = sqla.Column(sqla.JSON, nullable=True)
+    updated_at = sqla.Column(sqla.Integer, default=time.time, onupdate=time.time)
+
+    def __eq__(self, other):
+        return isinstance(other, InaraCache) and (self.kind, self.key) == (other.kind, other.key)
+
+    def __hash__(self):
+        return hash(f"{self.kind}_{self.key}")
+
+    @property
+    def found(self):
+        """ True if the lookup found a result on inara. """
+        return self.payload is not None
+
+    def is_fresh(self, now=None):
+        """
+        Check if the entry is still within its TTL, negative entries expire sooner.
+
+        Args:
+            now: The current timestamp, by default the time now.
+
+        Returns: True if the entry can be used.
+        """
+        ttl = INARA_CACHE_TTL if self.found else INARA_CACHE_NEGATIVE_TTL
+        return (now or time.time()) - self.updated_at < ttl
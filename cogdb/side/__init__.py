@@ -4,8 +4,12 @@ Sidewinder's remote database.
 These classes map to remote tables.
 When querying from async code, await an executor to thread or process.
 """
+import concurrent.futures as cfut
+import datetime
+import functools
 import logging
 import math
+import threading
 import time
 
 import sqlalchemy as sqla
@@ -16,10 +20,12 @@ from sqlalchemy import func as sqlfunc
 from sqlalchemy.sql import expression as sqlexp
 
 import cogdb
+import cogdb.common
 import cogdb.eddb
 from cogdb.eddb import LEN, TIME_FMT, HUDSON_BGS
 from cogdb.side.allegiance import Allegiance
 from cogdb.side.bgs_tick import BGSTick
+from cogdb.side.common import Base
 from cogdb.side.faction import Faction, FactionState, FactionHistory
 from cogdb.side.government import Government
 from cogdb.side.influence import Influence, InfluenceHistory
@@ -27,6 +33,7 @@ from cogdb.side.power import Power, PowerState
 from cogdb.side.security import Security, SettlementSecurity, SettlementSize
 from cogdb.side.station import Station, StationType
 from cogdb.side.system import System, SystemAge
+import cogdb.side.mirror
 import cog.exc
 import cog.tbl
 import cog.util
@@ -57,6 +64,9 @@ WATCH_FACTIONS = [
 ]
 PILOTS_FED_FACTION_ID = 76748  # N.B. 76748 is Useless pilots federation faction ID
 # They are not useful for any faction related predictions/interactions.
+TICK_CACHE_MAX_AGE = 3600  # Seconds a result is fresh at most, data trickles in after a tick
+TICK_CACHE_STALE = 24 * 3600  # Seconds after expiry a result is still served while refreshed
+INF_HISTORY_WINDOW = 5 * 24 * 3600  # Seconds of history the dashboard compares influence against
 
 
 # TODO: Determine why explicit joins now required? Change in library? For now fix.
@@ -65,6 +75,7 @@ def wrap_exceptions(func):
     Wrap all top level queries that get used externally.
     Translate SQLAlchemy exceptions to internal ones.
     """
+    @functools.wraps(func)
     def inner(*args, **kwargs):
         """ Simple inner function wrapper. """
         try:
@@ -75,6 +86,161 @@ def wrap_exceptions(func):
     return inner
 
 
+def detach_results(session, value):
+    """
+    Expunge every mapped object in a result from the session, so it can be used after the session closes.
+    Only columns already loaded may be accessed on the objects afterwards.
+
+    Args:
+        session: The session the result was queried with.
+        value: The result, may be any nesting of lists, tuples, rows and dicts.
+    """
+    if isinstance(value, Base):
+        if sqla_orm.object_session(value) is session:
+            session.expunge(value)
+    elif isinstance(value, dict):
+        for val in value.values():
+            detach_results(session, val)
+    elif isinstance(value, (list, tuple, set, sqla.engine.Row)):
+        for val in value:
+            detach_results(session, val)
+
+
+class TickCache():
+    """
+    Cache results of queries on side's db, the data changes mostly after a BGS tick.
+
+    - A result is fresh until the next BGS tick, at most TICK_CACHE_MAX_AGE seconds.
+    - For stale seconds after expiry the result is served while refreshed in the background.
+    - A result older than that is queried again, if the remote is down the old result is served.
+    Results are shared between callers and must not be modified.
+    """
+    def __init__(self, *, max_age=TICK_CACHE_MAX_AGE, stale=TICK_CACHE_STALE):
+        self.max_age = max_age
+        self.stale = stale
+        self.entries = {}  # key -> (value, expires)
+        self.refreshing = set()
+        self.next_tick = None
+        self.lock = threading.Lock()
+        self.pool = None
+
+    def __repr__(self):
+        return f"TickCache(max_age={self.max_age!r}, stale={self.stale!r}, next_tick={self.next_tick!r})"
+
+    def clear(self):
+        """
+        Forget all results.
+        """
+        with self.lock:
+            self.entries = {}
+            self.next_tick = None
+
+    def expires(self, session, now):
+        """
+        The time new results expire, the next BGS tick is queried once per tick.
+
+        Args:
+            session: A session onto side's db.
+            now: The current timestamp.
+
+        Returns: The timestamp the result expires.
+        """
+        if not self.next_tick or self.next_tick <= now:
+            self.next_tick = None
+            try:
+                found = session.query(BGSTick.tick).\
+                    filter(BGSTick.tick > datetime.datetime.utcfromtimestamp(now)).\
+                    order_by(BGSTick.tick).\
+                    first()
+                if found:
+                    self.next_tick = found[0].replace(tzinfo=datetime.timezone.utc).timestamp()
+            except sqla_exe.OperationalError:
+                pass
+
+        return min(self.next_tick or math.inf, now + self.max_age)
+
+    def compute(self, key, func, session, args, kwargs):
+        """
+        Query for a result and store it.
+
+        Returns: The result of func.
+
+        Raises:
+            RemoteError - Cannot communicate with remote.
+        """
+        value = func(session, *args, **kwargs)
+        detach_results(session, value)
+        expires = self.expires(session, time.time())
+        with self.lock:
+            self.entries[key] = (value, expires)
+
+        return value
+
+    def refresh(self, key, func, args, kwargs):
+        """
+        Query for a result in a new session and store it, failures keep the old result.
+        """
+        try:
+            with cogdb.session_scope(cogdb.side.mirror.session_maker()) as session:
+                self.compute(key, func, session, args, kwargs)
+        except cog.exc.RemoteError as exc:
+            logging.getLogger(__name__).warning("TICK_CACHE - Refresh of %s failed: %s", key[0], str(exc))
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def get(self, key, func, session, args, kwargs):
+        """
+        Get the result of func for the arguments, see class for when it is queried.
+
+        Args:
+            key: The key of the result.
+            func: The query function, called as func(session, *args, **kwargs).
+            session: A session onto side's db.
+            args: The positional arguments after session.
+            kwargs: The keyword arguments.
+
+        Returns: The result of func.
+
+        Raises:
+            RemoteError - Cannot communicate with remote and no result to fall back on.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now < entry[1]:
+                return entry[0]
+
+            if entry and now < entry[1] + self.stale:
+                if key not in self.refreshing:
+                    self.refreshing.add(key)
+                    if not self.pool:
+                        self.pool = cfut.ThreadPoolExecutor(max_workers=2, thread_name_prefix='tick_cache')
+                    self.pool.submit(self.refresh, key, func, args, kwargs)
+                return entry[0]
+
+        try:
+            return self.compute(key, func, session, args, kwargs)
+        except cog.exc.RemoteError:
+            if not entry:
+                raise
+            logging.getLogger(__name__).warning("TICK_CACHE - Remote down, serving stale %s", key[0])
+            return entry[0]
+
+
+def tick_cached(func):
+    """
+    Cache the results of a query function in TICK_CACHE, keyed by the function and arguments after session.
+    """
+    @functools.wraps(func)
+    def inner(session, *args, **kwargs):
+        """ Simple inner function wrapper. """
+        key = (func.__name__, repr(args), repr(sorted(kwargs.items())))
+        return TICK_CACHE.get(key, func, session, args, kwargs)
+
+    return inner
+
+
 @wrap_exceptions
 def next_bgs_tick(session, now):
     """
@@ -101,6 +267,7 @@ def next_bgs_tick(session, now):
     return f"BGS Tick in **{result.tick - now}**    (Expected {result.tick})"
 
 
+@tick_cached
 @wrap_exceptions
 def exploited_systems_by_age(session, control):
     """
@@ -121,6 +288,7 @@ def exploited_systems_by_age(session, control):
     return result
 
 
+@tick_cached
 @wrap_exceptions
 def influence_in_system(session, system):
     """
@@ -307,29 +475,27 @@ def count_factions_in_systems(session, system_ids):
     return dict(systems)
 
 
-def inf_history_for_pairs(session, data_pairs):
+def inf_history_for_pairs(session, data_pairs, *, window=None):
     """
     Find the influence history for all pairs of systems and factions provided in data pairs.
     That is data_pairs is: [[system_id, faction_id], [system_id, faction_id], ...]
 
+    Args:
+        session: A session onto side's db.
+        data_pairs: The pairs of system_id and faction_id to look up.
+        window: If set, only consider history from the last window seconds.
+
     Returns:
         Oldest historical influence data for each system_id/faction_id pair. Of form:
+            {'system_id_faction_id': influence, ...}
     """
-    look_for = [sqla.and_(InfluenceHistory.system_id == pair[0],
-                          InfluenceHistory.faction_id == pair[1])
-                for pair in data_pairs]
+    since = time.time() - window if window else None
+    found = cogdb.common.oldest_for_pairs(session, cls=InfluenceHistory, pairs=data_pairs, since=since)
 
-    #  time_window = time.time() - (60 * 60 * 24 * 5)
-    inf_history = session.query(sqlfunc.concat(sqlexp.cast(InfluenceHistory.system_id, sqla.types.Unicode), "_", sqlexp.cast(InfluenceHistory.faction_id, sqla.types.Unicode)), InfluenceHistory.influence).\
-        filter(sqla.or_(*look_for)).\
-        group_by(InfluenceHistory.system_id, InfluenceHistory.faction_id).\
-        order_by(InfluenceHistory.updated_at.asc()).\
-        limit(100).\
-        all()
-
-    return dict(inf_history)
+    return {f"{system_id}_{faction_id}": influence for (system_id, faction_id), influence in found.items()}
 
 
+@tick_cached
 @wrap_exceptions
 def dash_overview(session, control_system):
     """
@@ -353,7 +519,7 @@ def dash_overview(session, control_system):
     facts_in_system = count_factions_in_systems(session,
                                                 [faction[0].id for faction in factions])
     data_pairs = [[faction[0].id, faction[1].id] for faction in factions]
-    hist_for_pairs = inf_history_for_pairs(session, data_pairs)
+    hist_for_pairs = inf_history_for_pairs(session, data_pairs, window=INF_HISTORY_WINDOW)
 
     net_change = {}
     for system, faction, inf in [[faction[0], faction[1], faction[3]] for faction in factions]:
@@ -541,6 +707,7 @@ def get_monitor_systems(session, controls):
     return sorted(list({x[0] for x in eg_systems + uncontesteds}))
 
 
+@tick_cached
 @wrap_exceptions
 def monitor_events(session, system_ids):
     """
@@ -650,16 +817,14 @@ def control_dictators(session, system_ids):
         all()
 
     # Get influence history for last 7 days of requested pairs
-    look_for = [sqla.and_(InfluenceHistory.system_id == pair[0].system_id,
-                          InfluenceHistory.faction_id == pair[0].faction_id)
-                for pair in dics]
+    look_for = {(pair[0].system_id, pair[0].faction_id) for pair in dics}
     time_window = time.time() - (60 * 60 * 24 * 7)
     inf_history = session.query(sqlfunc.concat(sqlexp.cast(InfluenceHistory.system_id, sqla.types.Unicode),
                                                "_",
                                                sqlexp.cast(InfluenceHistory.faction_id, sqla.types.Unicode)),
                                 InfluenceHistory.is_controlling_faction).\
         filter(InfluenceHistory.updated_at >= time_window,
-               sqla.or_(*look_for)).\
+               sqla.tuple_(InfluenceHistory.system_id, InfluenceHistory.faction_id).in_(look_for)).\
         order_by(InfluenceHistory.system_id, InfluenceHistory.faction_id).\
         all()
 
@@ -809,6 +974,7 @@ def monitor_factions(session, faction_names=None):
     return cog.tbl.format_table(lines, header=True, prefix="\n\n**Monitored Factions**\n")
 
 
+@tick_cached
 @wrap_exceptions
 def get_system_ages(session, controls, cutoff=1):
     """
@@ -854,6 +1020,9 @@ def service_status(side_session):
     return cells
 
 
+TICK_CACHE = TickCache()
+
+
 def main():  # pragma: no cover
     """ Main function to test against side. """
     #  with cogdb.session_scope(cogdb.SideSession) as side_session:
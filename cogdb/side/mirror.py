@@ -0,0 +1,302 @@
+"""
+Incremental local mirror of the tables of Sidewinder's remote database used by cogdb.side.
+
+The mirror is the SIDE_MIRROR_DB database of the local EDDB server, the side models are
+used unchanged so every query function of cogdb.side works on a session of either source.
+Use session_maker() to get the mirror when it is up to date, otherwise the remote.
+
+Tables with an increasing timestamp only pull the rows changed since the last sync,
+the remaining tables are small or lack a timestamp and are replaced whole on an interval.
+
+To sync once from the command line:
+    python -m cogdb.side.mirror
+
+To replace every table, for instance after the remote was rebuilt:
+    python -m cogdb.side.mirror --full
+"""
+import argparse
+import logging
+import time
+
+import sqlalchemy as sqla
+import sqlalchemy.ext.declarative
+
+import cogdb
+import cogdb.common
+from cogdb.side.allegiance import Allegiance
+from cogdb.side.bgs_tick import BGSTick
+from cogdb.side.faction import Faction, FactionState
+from cogdb.side.government import Government
+from cogdb.side.influence import Influence, InfluenceHistory
+from cogdb.side.power import Power, PowerState
+from cogdb.side.security import Security, SettlementSecurity, SettlementSize
+from cogdb.side.station import Station, StationType
+from cogdb.side.system import System, SystemAge
+from cog.util import ReprMixin
+
+
+SIDE_MIRROR_BATCH = 5000  # Rows read and written at once
+SIDE_MIRROR_OVERLAP = 600  # Seconds before the watermark rows are pulled again, catches late writes
+SIDE_MIRROR_MAX_LAG = 2 * 3600  # Seconds after the last complete sync the mirror is still used
+DAY_SECONDS = 24 * 3600
+# Tables pulled incrementally, the column is the timestamp updated on every write
+INCREMENTAL_TABLES = [
+    (BGSTick, 'unix_from'),
+    (Faction, 'updated_at'),
+    (Influence, 'updated_at'),
+    (InfluenceHistory, 'updated_at'),
+    (Station, 'updated_at'),
+]
+# Tables replaced whole, the seconds between replacements
+FULL_TABLES = [
+    (SystemAge, 0),  # A view on remote, ages are relative to when it is read
+    (System, DAY_SECONDS),
+    (Allegiance, DAY_SECONDS),
+    (FactionState, DAY_SECONDS),
+    (Government, DAY_SECONDS),
+    (Power, DAY_SECONDS),
+    (PowerState, DAY_SECONDS),
+    (Security, DAY_SECONDS),
+    (SettlementSecurity, DAY_SECONDS),
+    (SettlementSize, DAY_SECONDS),
+    (StationType, DAY_SECONDS),
+]
+# Incremental tables that remote deletes rows from, the seconds between comparing keys
+PRUNE_TABLES = [
+    (Influence, DAY_SECONDS),
+]
+# Columns indexed in the mirror, the remote indexes them but the models do not declare it
+INDEXED_COLUMNS = ['name', 'updated_at', 'unix_from', 'tick', 'control', 'system']
+# The time of the last complete sync in this process, see session_maker
+MIRROR_STATE = {'synced_at': 0}
+MirrorBase = sqlalchemy.ext.declarative.declarative_base()
+
+
+class SideMirrorSync(ReprMixin, MirrorBase):
+    """ The progress of syncing one table into the mirror. """
+    __tablename__ = 'side_mirror_sync'
+    _repr_keys = ['name', 'watermark', 'synced_at']
+
+    name = sqla.Column(sqla.String(64), primary_key=True)
+    watermark = sqla.Column(sqla.BigInteger, default=0)  # Largest timestamp pulled, incremental tables only
+    synced_at = sqla.Column(sqla.Integer, default=0)
+
+    def __eq__(self, other):
+        return isinstance(self, SideMirrorSync) and isinstance(other, SideMirrorSync) and self.name == other.name
+
+
+def make_parser():
+    """
+    Make the parser for command line usage.
+
+    Returns: An instance of argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="Sync the local mirror of Sidewinder's DB")
+    parser.add_argument('--full', '-f', action='store_true',
+                        help='Replace every table and pull incremental tables from the start.')
+
+    return parser
+
+
+def mirror_metadata():
+    """
+    The metadata to create the mirror tables with. The tables copy the side models without
+    foreign keys, tables are replaced out of order, and index the INDEXED_COLUMNS present.
+
+    Returns: A sqlalchemy.MetaData.
+    """
+    metadata = sqla.MetaData()
+    tables = [cls.__table__ for cls, _ in INCREMENTAL_TABLES + FULL_TABLES] + [SideMirrorSync.__table__]
+    for table in tables:
+        sqla.Table(table.name, metadata, *[
+            sqla.Column(col.name, col.type, primary_key=col.primary_key,
+                        index=col.name in INDEXED_COLUMNS and not col.primary_key)
+            for col in table.columns
+        ])
+
+    return metadata
+
+
+def create_mirror():
+    """
+    Create the mirror database and any tables missing in it.
+    """
+    with cogdb.eddb_engine.connect() as conn:
+        if cogdb.SIDE_MIRROR_DB not in sqla.inspect(conn).get_schema_names():
+            conn.execute(sqla.schema.CreateSchema(cogdb.SIDE_MIRROR_DB))
+    mirror_metadata().create_all(cogdb.side_mirror_engine)
+
+
+def session_maker():
+    """
+    Select the source for queries of cogdb.side.
+
+    Returns: The mirror session maker if this process completed a sync within SIDE_MIRROR_MAX_LAG, else the remote.
+    """
+    if time.time() - MIRROR_STATE['synced_at'] < SIDE_MIRROR_MAX_LAG:
+        return cogdb.SideMirrorSession
+
+    return cogdb.SideSession
+
+
+def sync_incremental(side_session, mirror_session, cls, column, *, watermark=0):
+    """
+    Pull all rows of a table changed since the watermark into the mirror.
+    Rows are streamed from remote and upserted in batches of SIDE_MIRROR_BATCH.
+
+    Args:
+        side_session: A session onto the remote side db.
+        mirror_session: A session onto the mirror.
+        cls: The side model of the table.
+        column: The name of the timestamp column updated on every write.
+        watermark: The largest timestamp pulled before, rows from SIDE_MIRROR_OVERLAP seconds before are pulled.
+
+    Returns: (count, watermark), the number of rows pulled and the new watermark.
+    """
+    table = cls.__table__
+    since = max(watermark - SIDE_MIRROR_OVERLAP, 0)
+    result = side_session.execute(
+        sqla.select(table).where(table.c[column] >= since).order_by(table.c[column]).
+        execution_options(stream_results=True)
+    )
+
+    count = 0
+    for part in result.mappings().partitions(SIDE_MIRROR_BATCH):
+        rows = [dict(x) for x in part]
+        cogdb.common.bulk_upsert(mirror_session, cls=cls, rows=rows)
+        watermark = max(watermark, rows[-1][column] or 0)
+        count += len(rows)
+
+    return count, watermark
+
+
+def replace_table(side_session, mirror_session, cls):
+    """
+    Replace all rows of a table in the mirror with those on remote.
+
+    Args:
+        side_session: A session onto the remote side db.
+        mirror_session: A session onto the mirror.
+        cls: The side model of the table.
+
+    Returns: The number of rows in the table.
+    """
+    table = cls.__table__
+    rows = [dict(x) for x in side_session.execute(sqla.select(table)).mappings()]
+    mirror_session.execute(table.delete())
+    for ind in range(0, len(rows), SIDE_MIRROR_BATCH):
+        mirror_session.execute(table.insert(), rows[ind:ind + SIDE_MIRROR_BATCH])
+
+    return len(rows)
+
+
+def prune_table(side_session, mirror_session, cls):
+    """
+    Delete the rows in the mirror that no longer exist on remote, only the keys are compared.
+
+    Args:
+        side_session: A session onto the remote side db.
+        mirror_session: A session onto the mirror.
+        cls: The side model of the table.
+
+    Returns: The number of rows deleted.
+    """
+    keys = list(cls.__table__.primary_key)
+    remote = {tuple(x) for x in side_session.execute(sqla.select(*keys))}
+    stale = [tuple(x) for x in mirror_session.execute(sqla.select(*keys)) if tuple(x) not in remote]
+    for ind in range(0, len(stale), SIDE_MIRROR_BATCH):
+        mirror_session.execute(
+            cls.__table__.delete().where(sqla.tuple_(*keys).in_(stale[ind:ind + SIDE_MIRROR_BATCH]))
+        )
+
+    return len(stale)
+
+
+def sync_table(side_session, mirror_session, state, *, full=False):
+    """
+    Sync the table a state tracks if it is due, see INCREMENTAL_TABLES, FULL_TABLES and PRUNE_TABLES.
+    The state is updated with the progress.
+
+    Args:
+        side_session: A session onto the remote side db.
+        mirror_session: A session onto the mirror.
+        state: The SideMirrorSync of the table, names are the table name or prune_ and the table name.
+        full: When True, replace full tables and pull incremental tables from the start regardless of state.
+
+    Returns: The number of rows changed, None if the table was not due.
+    """
+    now = int(time.time())
+    incremental = {cls.__tablename__: (cls, column) for cls, column in INCREMENTAL_TABLES}
+    replaced = {cls.__tablename__: (cls, interval) for cls, interval in FULL_TABLES}
+    pruned = {f'prune_{cls.__tablename__}': (cls, interval) for cls, interval in PRUNE_TABLES}
+
+    if state.name in incremental:
+        cls, column = incremental[state.name]
+        count, state.watermark = sync_incremental(side_session, mirror_session, cls, column,
+                                                  watermark=0 if full else state.watermark)
+    elif not full and now - state.synced_at < {**replaced, **pruned}[state.name][1]:
+        return None
+    elif state.name in replaced:
+        count = replace_table(side_session, mirror_session, replaced[state.name][0])
+    else:
+        count = prune_table(side_session, mirror_session, pruned[state.name][0])
+    state.synced_at = now
+
+    return count
+
+
+def sync_mirror(*, full=False):
+    """
+    Bring the mirror up to date with remote, creating it if needed.
+    Every table is committed once synced, an interrupted sync resumes from the last table committed.
+
+    Args:
+        full: When True, replace full tables and pull incremental tables from the start.
+
+    Returns: A dictionary of the number of rows changed per table synced.
+
+    Raises:
+        sqlalchemy.exc.OperationalError: Either database could not be reached.
+    """
+    log = logging.getLogger(__name__)
+    create_mirror()
+    names = [cls.__tablename__ for cls, _ in INCREMENTAL_TABLES + FULL_TABLES]
+    names += [f'prune_{cls.__tablename__}' for cls, _ in PRUNE_TABLES]
+
+    counts = {}
+    with cogdb.session_scope(cogdb.SideSession) as side_session, \
+         cogdb.session_scope(cogdb.SideMirrorSession) as mirror_session:
+        states = {x.name: x for x in mirror_session.query(SideMirrorSync)}
+        for name in names:
+            state = states.get(name)
+            if not state:
+                state = SideMirrorSync(name=name, watermark=0, synced_at=0)
+                mirror_session.add(state)
+
+            start = time.time()
+            count = sync_table(side_session, mirror_session, state, full=full)
+            mirror_session.commit()
+            if count is not None:
+                counts[name] = count
+                log.info("SIDE_MIRROR - Synced %s, %d rows in %.1fs", name, count, time.time() - start)
+
+    MIRROR_STATE['synced_at'] = time.time()
+    log.warning("SIDE_MIRROR - Sync complete: %s", counts)
+
+    return counts
+
+
+def main():  # pragma: no cover
+    """
+    Sync the mirror once and report.
+    """
+    args = make_parser().parse_args()
+    start = time.time()
+    counts = sync_mirror(full=args.full)
+    for name, count in counts.items():
+        print(f"{name:24} {count:>10} rows")
+    print(f"Sync took {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -15,11 +15,14 @@ https://towardsdatascience.com/how-to-perform-bulk-inserts-with-sqlalchemy-effic
 """
 import asyncio
 import concurrent.futures as cfut
+import contextlib
 import datetime
+import fcntl
 import glob
 import json
 import logging
 import os
+import uuid
 from pathlib import Path
 
 import psutil
@@ -46,6 +49,10 @@ SYSTEM_MAPF = os.path.join(IDS_ROOT, 'systemMap.json')
 STATION_MAPF = os.path.join(IDS_ROOT, 'stationMap.json')
 STATION_ONLY_MAPF = os.path.join(IDS_ROOT, 'onlyStationMap.json')
 CARRIER_MAPF = os.path.join(IDS_ROOT, 'carrierMap.json')
+# New id assignments are appended to a journal beside the map, see allocate_name_ids
+JOURNAL_SUFFIX = '.journal'
+LOCK_SUFFIX = '.lock'
+JOURNAL_COMPACT_SIZE = 2 ** 20  # Fold the journal into the map once it exceeds this many bytes
 # Mapping of spansh naming of station services, bit unsure of some
 SPANSH_STATION_SERVICES = {
     'Fleet Carrier Administration': 'carriermanagement',
@@ -268,12 +275,10 @@ def eddb_maps(eddb_session):
 
     with open(SYSTEM_MAPF, 'r', encoding='utf-8') as fin:
         mapped['systems'] = json.load(fin)
-    with open(STATION_MAPF, 'r', encoding='utf-8') as fin:
-        mapped['stations'] = json.load(fin)
-    with open(FACTION_MAPF, 'r', encoding='utf-8') as fin:
-        mapped['factions'] = json.load(fin)
-        mapped['factions'][None] = None
-        mapped['factions']["None"] = None
+    mapped['stations'], _ = load_name_map(STATION_MAPF)
+    mapped['factions'], _ = load_name_map(FACTION_MAPF)
+    mapped['factions'][None] = None
+    mapped['factions']["None"] = None
 
     return mapped
 
@@ -785,8 +790,227 @@ def update_faction_map(missing, *, cache=None):
             fout.write('{}')
 
     cache = cache if cache else create_faction_cache()
-    added = update_name_map(missing, name_map=cache)
-    write_faction_cache(cache)
+    return allocate_name_ids(missing, map_fname=FACTION_MAPF, cache=cache)
+
+
+@contextlib.contextmanager
+def map_lock(map_fname, *, shared=False):
+    """
+    Hold an advisory lock on a name map and its journal, works across unrelated processes.
+    Take it shared to read, exclusive to allocate or compact.
+
+    Args:
+        map_fname: The filename of the name map.
+        shared: When True, take a shared lock.
+    """
+    with open(map_fname + LOCK_SUFFIX, 'a', encoding='utf-8') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def create_map_journal(map_fname):
+    """
+    Atomically replace the journal of a name map with an empty one.
+    Every journal begins with a unique token, readers use it to notice when the journal was replaced.
+    Requires the exclusive map_lock.
+
+    Args:
+        map_fname: The filename of the name map.
+    """
+    fname = map_fname + JOURNAL_SUFFIX
+    with open(fname + '.tmp', 'w', encoding='utf-8') as fout:
+        fout.write(json.dumps(uuid.uuid4().hex) + '\n')
+    os.replace(fname + '.tmp', fname)
+
+
+def read_map_journal(map_fname, position=None):
+    """
+    Read the assignments appended to the journal of a name map.
+    When position is still valid for the journal, only assignments appended since are read.
+    A trailing partial line left by an interrupted writer is ignored.
+
+    Args:
+        map_fname: The filename of the name map.
+        position: The position returned by the last read, None reads from the start.
+
+    Returns: (entries, position)
+        entries: A dictionary of the names read onto their ids.
+        position: A tuple of (token, offset) to resume reading from, token is None when there is no journal.
+    """
+    entries = {}
+    try:
+        fin = open(map_fname + JOURNAL_SUFFIX, 'rb')  # pylint: disable=consider-using-with
+    except FileNotFoundError:
+        return entries, (None, 0)
+
+    with fin:
+        header = fin.readline()
+        token = json.loads(header)
+        offset = len(header)
+        if position and position[0] == token:
+            offset = position[1]
+            fin.seek(offset)
+
+        for line in fin:
+            if not line.endswith(b'\n'):
+                break
+            name, new_id = json.loads(line)
+            entries[name] = new_id
+            offset += len(line)
+
+    return entries, (token, offset)
+
+
+def load_name_map(map_fname):
+    """
+    Load a name map with every assignment in its journal applied.
+
+    Args:
+        map_fname: The filename of the name map.
+
+    Returns: (known, position)
+        known: A dictionary of the names onto their ids.
+        position: The position to resume reading the journal from, see read_map_journal.
+    """
+    with map_lock(map_fname, shared=True):
+        with open(map_fname, 'r', encoding='utf-8') as fin:
+            known = json.load(fin)
+        entries, position = read_map_journal(map_fname)
+
+    known.update(entries)
+    return known, position
+
+
+def sync_name_cache(cache, map_fname):
+    """
+    Bring a cache up to date with assignments made by other processes since it last synced.
+    Only the new tail of the journal is read unless the journal was compacted since.
+    Requires the exclusive map_lock.
+
+    Args:
+        cache: The cache of the name map, see create_faction_cache.
+        map_fname: The filename of the name map.
+    """
+    position = cache.get('journal', (None, 0))
+    entries, new_position = read_map_journal(map_fname, position)
+    if new_position[0] != position[0]:
+        # Journal replaced, any assignments it held before are now in the map
+        with open(map_fname, 'r', encoding='utf-8') as fin:
+            known = json.load(fin)
+        known.update(read_map_journal(map_fname)[0])
+        entries = known
+    if new_position[0] is None:
+        create_map_journal(map_fname)
+        new_position = read_map_journal(map_fname)[1]
+
+    cache['known'].update(entries)
+    if entries:
+        cache['next_id'] = max(cache['next_id'], max(entries.values()) + 1)
+    cache['journal'] = new_position
+
+
+def allocate_name_ids(missing, *, map_fname, cache, carrier_fname=None):
+    """
+    Allocate ids to names missing from a name map and append the assignments to its journal.
+    Safe to run concurrently from many processes, the cache is synced under the lock before allocating.
+    The cost depends on the number of assignments made since the last sync, not the size of the map.
+
+    Args:
+        missing: The names that may be missing from the map.
+        map_fname: The filename of the name map.
+        cache: The cache of the name map, see create_faction_cache.
+        carrier_fname: When set, carriers are written into this carrier map when the journal is compacted.
+
+    Returns: A dictionary of newly added names from the missing list onto their new ids.
+    """
+    with map_lock(map_fname):
+        sync_name_cache(cache, map_fname)
+        added = update_name_map([x for x in missing if x is not None], name_map=cache)
+        if not added:
+            return added
+
+        token, offset = cache['journal']
+        lines = ''.join(json.dumps([name, new_id]) + '\n' for name, new_id in added.items()).encode()
+        with open(map_fname + JOURNAL_SUFFIX, 'r+b') as fout:
+            fout.truncate(offset)  # Drop any partial line of an interrupted writer
+            fout.seek(offset)
+            fout.write(lines)
+            fout.flush()
+            os.fsync(fout.fileno())
+        cache['journal'] = (token, offset + len(lines))
+
+        if cache['journal'][1] > JOURNAL_COMPACT_SIZE:
+            fold_map_journal(map_fname, carrier_fname=carrier_fname)
+            cache['journal'] = read_map_journal(map_fname)[1]
+
+    return added
+
+
+def fold_map_journal(map_fname, *, carrier_fname=None):
+    """
+    Write every assignment in the journal into the name map and start an empty journal.
+    Requires the exclusive map_lock.
+
+    Args:
+        map_fname: The filename of the name map.
+        carrier_fname: When set, also write any carriers assigned into this carrier map.
+
+    Returns: The complete name map.
+    """
+    with open(map_fname, 'r', encoding='utf-8') as fin:
+        known = json.load(fin)
+    entries, _ = read_map_journal(map_fname)
+    known.update(entries)
+
+    with open(map_fname + '.tmp', 'w', encoding='utf-8') as fout:
+        json.dump(known, fout, indent=JSON_INDENT, sort_keys=True)
+    os.replace(map_fname + '.tmp', map_fname)
+
+    if carrier_fname:
+        with open(carrier_fname, 'r', encoding='utf-8') as fin:
+            carriers = json.load(fin)
+        carriers.update({x: y for x, y in entries.items() if cog.util.is_a_carrier(x)})
+        with open(carrier_fname + '.tmp', 'w', encoding='utf-8') as fout:
+            json.dump(carriers, fout, indent=JSON_INDENT, sort_keys=True)
+        os.replace(carrier_fname + '.tmp', carrier_fname)
+
+    create_map_journal(map_fname)
+    return known
+
+
+def compact_name_map(map_fname, *, carrier_fname=None):
+    """
+    Compact the journal of a name map into the map, see fold_map_journal.
+
+    Args:
+        map_fname: The filename of the name map.
+        carrier_fname: When set, also write any carriers assigned into this carrier map.
+
+    Returns: The complete name map.
+    """
+    with map_lock(map_fname):
+        return fold_map_journal(map_fname, carrier_fname=carrier_fname)
+
+
+def allocate_station_ids(missing, *, cache):
+    """
+    Allocate ids to stations missing from the station map and append the assignments to its journal.
+    Carriers are added to the carrier map on compaction.
+
+    Args:
+        missing: The keys of stations that may be missing.
+        cache: A cache generated by create_station_cache.
+
+    Returns: A dictionary containing new stations onto their ids.
+    """
+    added = allocate_name_ids(missing, map_fname=STATION_MAPF, cache=cache, carrier_fname=CARRIER_MAPF)
+    for name, new_id in added.items():
+        cache['stations'][name] = new_id
+        if cog.util.is_a_carrier(name):
+            cache['carriers'][name] = new_id
 
     return added
 
@@ -795,16 +1019,17 @@ def create_faction_cache():
     """
     Create the cache of maps used for updating the factions.
     """
-    with open(FACTION_MAPF, 'r', encoding='utf-8') as known_fin:
-        cache = {
-            'known': json.load(known_fin),
-        }
-        known_ids = list(sorted(cache['known'].values()))
-        cache['next_id'] = (known_ids[-1] if known_ids else 0) + 1
-        cache['known'][None] = None
-        cache['known']['None'] = None
+    known, position = load_name_map(FACTION_MAPF)
+    known_ids = list(sorted(known.values()))
+    cache = {
+        'known': known,
+        'next_id': (known_ids[-1] if known_ids else 0) + 1,
+        'journal': position,
+    }
+    cache['known'][None] = None
+    cache['known']['None'] = None
 
-        return cache
+    return cache
 
 
 def create_station_cache():
@@ -816,10 +1041,10 @@ def create_station_cache():
         'stations': {},
     }
 
-    with open(STATION_MAPF, 'r', encoding='utf-8') as fin:
-        cache['known'] = json.load(fin)
+    cache['known'], cache['journal'] = load_name_map(STATION_MAPF)
     with open(CARRIER_MAPF, 'r', encoding='utf-8') as fin:
         cache['carriers'] = json.load(fin)
+    cache['carriers'].update({x: y for x, y in cache['known'].items() if cog.util.is_a_carrier(x)})
 
     known_ids = list(sorted(cache['known'].values()))
     cache['next_id'] = known_ids[-1] + 1
@@ -893,12 +1118,12 @@ def update_all_name_maps(factions, systems, stations):  # pragma: no cover
     """
     if factions:
         update_faction_map(factions)
+        compact_name_map(FACTION_MAPF)
     if systems:
         update_system_map(systems)
     if stations:
-        cache = create_station_cache()
-        update_station_map(stations, cache=cache)
-        write_station_cache(cache)
+        allocate_station_ids(stations, cache=create_station_cache())
+        compact_name_map(STATION_MAPF, carrier_fname=CARRIER_MAPF)
 
 
 def collect_unique_names(galaxy_json):
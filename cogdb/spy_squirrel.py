@@ -2,8 +2,8 @@
 Module to parse and import data from spying squirrel.
 """
 import asyncio
-import concurrent.futures as cfut
 import datetime
+import hashlib
 import json
 import logging
 import os
@@ -14,6 +14,7 @@ import subprocess as sub
 import tempfile
 import time
 
+import aiohttp
 import sqlalchemy as sqla
 import sqlalchemy.orm as sqla_orm
 import sqlalchemy.exc as sqla_e
@@ -60,6 +61,21 @@ JSON_DOPPLER_MAP = {
     'response': 1,
 }
 ELITE_YEAR_OFFSET = 1286
+# Scrapes of post_systems, every setting may be overridden under scrape in the config
+SCRAPE_QUEUE = cog.util.rel_to_abs('data', 'spy_scrape_queue.json')
+SCRAPE_CONCURRENCY = 2
+SCRAPE_TIMEOUT = 180
+SCRAPE_RETRY_DELAY = 30  # Linear backoff, seconds added per retry
+SCRAPE_RETRIES = 5
+# The tables parsed from powerplay snapshots, the model and the columns that identify a row
+SNAPSHOT_TABLES = {
+    'base': (SpySystem, ('ed_system_id', 'power_id')),
+    'votes': (SpyVote, ('power_id',)),
+    'preps': (SpyPrep, ('ed_system_id', 'power_id')),
+    'systems': (SpySystem, ('ed_system_id', 'power_id')),
+}
+SNAPSHOT_IGNORED = ('updated_at',)  # Columns that change every snapshot, not compared, see touch_snapshot
+SNAPSHOT_TOUCH_BATCH = 500  # Rows bumped per UPDATE in touch_snapshot
 
 
 def convert_json_date(date_text):
@@ -121,66 +137,81 @@ def load_json_secret(fname):
         return json.load(fin)
 
 
-def load_base_json(base):
+def add_system_names(eddb_session, rows):
     """
-    Load the base json and parse all information from it.
+    Set the system_name of every row from its ed_system_id, all systems are resolved in one query.
+    Rows for systems not in the database are dropped.
 
     Args:
-        base: The base json to load.
+        eddb_session: A session onto the EDDB.
+        rows: A list of dictionaries, each has an ed_system_id key.
 
-    Returns:
-        A dictionary mapping powers by name onto the systems they control and their status.
+    Returns: The rows with a known system.
+    """
+    ed_system_ids = {x['ed_system_id'] for x in rows}
+    names = dict(
+        eddb_session.query(System.ed_system_id, System.name).
+        filter(System.ed_system_id.in_(ed_system_ids))
+    )
+
+    missing = ed_system_ids - set(names)
+    if missing:
+        logging.getLogger(__name__).error("Spy systems not found in EDDB, skipped: %s", sorted(missing))
+
+    named = []
+    for row in rows:
+        if row['ed_system_id'] in names:
+            row['system_name'] = names[row['ed_system_id']]
+            named += [row]
+
+    return named
+
+
+def parse_base_json(base):
+    """
+    Parse all information from the base json.
+
+    Args:
+        base: The base json to parse.
+
+    Returns: A dictionary of table name to rows, see SNAPSHOT_TABLES.
     """
     if isinstance(base, type("")):
         base = json.loads(base)
 
     json_powers_to_eddb_id = json_powers_to_eddb_map()
-    with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
-        for bundle in base['powers']:
-            power_id = json_powers_to_eddb_id[bundle['powerId']]
-
-            for sys_addr, data in bundle['systemAddr'].items():
-                eddb_system = eddb_session.query(System).\
-                    filter(System.ed_system_id == sys_addr).\
-                    one()
-                kwargs = {
-                    'ed_system_id': sys_addr,
-                    'system_name': eddb_system.name,
-                    'power_id': power_id,
-                    'power_state_id': 0,
-                    'fort_trigger': data['thrFor'],
-                    'um_trigger': data['thrAgainst'],
-                    'income': data['income'],
-                    'upkeep_current': data['upkeepCurrent'],
-                    'upkeep_default': data['upkeepDefault'],
-                }
-                # Protect against missing power state possibilities
-                try:
-                    kwargs['power_state_id'] = JSON_POWER_STATE_TO_EDDB[bundle['state']]
-                except KeyError:
-                    logging.getLogger(__name__).error("Failed to find power_state_id for %s", bundle['state'])
-
-                try:
-                    system = eddb_session.query(SpySystem).\
-                        filter(
-                            SpySystem.ed_system_id == sys_addr,
-                            SpySystem.power_id == power_id).\
-                        one()
-                    system.update(**kwargs)
-                except sqla.orm.exc.NoResultFound:
-                    system = SpySystem(**kwargs)
-                    eddb_session.add(system)
-
-
-def load_refined_json(refined):
+    rows = []
+    for bundle in base['powers']:
+        power_id = json_powers_to_eddb_id[bundle['powerId']]
+        # Protect against missing power state possibilities
+        try:
+            power_state_id = JSON_POWER_STATE_TO_EDDB[bundle['state']]
+        except KeyError:
+            logging.getLogger(__name__).error("Failed to find power_state_id for %s", bundle['state'])
+            power_state_id = 0
+
+        rows += [{
+            'ed_system_id': int(sys_addr),
+            'power_id': power_id,
+            'power_state_id': power_state_id,
+            'fort_trigger': data['thrFor'],
+            'um_trigger': data['thrAgainst'],
+            'income': data['income'],
+            'upkeep_current': data['upkeepCurrent'],
+            'upkeep_default': data['upkeepDefault'],
+        } for sys_addr, data in bundle['systemAddr'].items()]
+
+    return {'base': rows}
+
+
+def parse_refined_json(refined):
     """
-    Load the refined json and parse all information from it.
+    Parse all information from the refined json.
 
     Args:
-        refined: The refined json to load.
+        refined: The refined json to parse.
 
-    Returns:
-        A dictionary mapping powers by name onto the systems they control and their status.
+    Returns: A dictionary of table name to rows, see SNAPSHOT_TABLES.
     """
     if isinstance(refined, type("")):
         refined = json.loads(refined)
@@ -188,74 +219,100 @@ def load_refined_json(refined):
     updated_at = int(refined["lastModified"])
     json_powers_to_eddb_id = json_powers_to_eddb_map()
 
+    votes, preps, systems = [], [], []
+    for bundle in refined["preparation"]:
+        power_id = json_powers_to_eddb_id[bundle['powerid']]
+        if 'consolidation' in bundle:
+            votes += [{
+                'power_id': power_id,
+                'vote': bundle['consolidation']['rank'],
+                'updated_at': updated_at,
+            }]
+
+        preps += [{
+            'power_id': power_id,
+            'ed_system_id': int(ed_system_id),
+            'merits': merits,
+            'updated_at': updated_at,
+        } for ed_system_id, merits in bundle['rankedSystems']]
+
+    for bundles, pstate_id in [[refined["gainControl"], 64], [refined["fortifyUndermine"], 16]]:
+        systems += [{
+            'power_id': json_powers_to_eddb_id[bundle['powerid']],
+            'ed_system_id': int(bundle['systemAddr']),
+            'power_state_id': pstate_id,
+            'fort': bundle['qtyFor'],
+            'um': bundle['qtyAgainst'],
+            'updated_at': updated_at,
+        } for bundle in bundles]
+
+    return {'votes': votes, 'preps': preps, 'systems': systems}
+
+
+def write_snapshot(tables):
+    """
+    Write the rows parsed from a snapshot to the database, each table in one statement.
+    Rows of systems not in the database are dropped.
+
+    Args:
+        tables: A dictionary of table name to rows, see SNAPSHOT_TABLES.
+
+    Returns: The set of ed_system_ids of rows dropped.
+    """
+    with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
+        with_system = [row for name, rows in tables.items() if name != 'votes' for row in rows]
+        named = add_system_names(eddb_session, with_system)
+        for name, rows in tables.items():
+            if name != 'votes':
+                rows = [x for x in rows if 'system_name' in x]
+            cogdb.common.bulk_upsert(eddb_session, cls=SNAPSHOT_TABLES[name][0], rows=rows)
+
+    return {x['ed_system_id'] for x in with_system} - {x['ed_system_id'] for x in named}
+
+
+def touch_snapshot(tables):
+    """
+    Bump updated_at of rows present in a snapshot that did not change and so were not written.
+    Rows are grouped by their updated_at, each group is bumped with one UPDATE per SNAPSHOT_TOUCH_BATCH rows.
+    Rows without an updated_at are ignored.
+
+    Args:
+        tables: A dictionary of table name to rows, see SNAPSHOT_TABLES.
+    """
     with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
-        for bundle in refined["preparation"]:
-            power_id = json_powers_to_eddb_id[bundle['powerid']]
-            if 'consolidation' in bundle:
-                try:
-                    spyvote = eddb_session.query(SpyVote).\
-                        filter(SpyVote.power_id == power_id).\
-                        one()
-                    spyvote.vote = bundle['consolidation']['rank']
-                    spyvote.updated_at = updated_at
-                except sqla.orm.exc.NoResultFound:
-                    spyvote = SpyVote(
-                        power_id=power_id,
-                        vote=bundle['consolidation']['rank'],
-                        updated_at=updated_at
-                    )
-                    eddb_session.add(spyvote)
-
-            for ed_system_id, merits in bundle['rankedSystems']:
-                eddb_system = eddb_session.query(System).\
-                    filter(System.ed_system_id == ed_system_id).\
-                    one()
-                try:
-                    spyprep = eddb_session.query(SpyPrep).\
-                        filter(
-                            SpyPrep.ed_system_id == ed_system_id,
-                            SpyPrep.power_id == power_id).\
-                        one()
-                    spyprep.merits = merits
-                    spyprep.updated_at = updated_at
-                    spyprep.system_name = eddb_system.name
-                except sqla.orm.exc.NoResultFound:
-                    spyprep = SpyPrep(
-                        power_id=power_id,
-                        ed_system_id=ed_system_id,
-                        system_name=eddb_system.name,
-                        merits=merits,
-                        updated_at=updated_at
-                    )
-                    eddb_session.add(spyprep)
-        eddb_session.commit()
-
-        for bundles, pstate_id in [[refined["gainControl"], 64], [refined["fortifyUndermine"], 16]]:
-            for bundle in bundles:
-                power_id = json_powers_to_eddb_id[bundle['powerid']]
-                ed_system_id = bundle['systemAddr']
-                eddb_system = eddb_session.query(System).\
-                    filter(System.ed_system_id == ed_system_id).\
-                    one()
-                kwargs = {
-                    'power_id': power_id,
-                    'ed_system_id': ed_system_id,
-                    'system_name': eddb_system.name,
-                    'power_state_id': pstate_id,
-                    'fort': bundle['qtyFor'],
-                    'um': bundle['qtyAgainst'],
-                    'updated_at': updated_at,
-                }
-                try:
-                    system = eddb_session.query(SpySystem).\
-                        filter(
-                            SpySystem.ed_system_id == ed_system_id,
-                            SpySystem.power_id == power_id).\
-                        one()
-                    system.update(**kwargs)
-                except sqla.orm.exc.NoResultFound:
-                    system = SpySystem(**kwargs)
-                    eddb_session.add(system)
+        for name, rows in tables.items():
+            cls, keys = SNAPSHOT_TABLES[name]
+            groups = {}
+            for row in rows:
+                if 'updated_at' in row:
+                    groups.setdefault(row['updated_at'], []).append(tuple(row[x] for x in keys))
+
+            columns = sqla.tuple_(*[getattr(cls, x) for x in keys])
+            for updated_at, values in groups.items():
+                for ind in range(0, len(values), SNAPSHOT_TOUCH_BATCH):
+                    eddb_session.query(cls).\
+                        filter(columns.in_(values[ind:ind + SNAPSHOT_TOUCH_BATCH])).\
+                        update({'updated_at': updated_at}, synchronize_session=False)
+
+
+def load_base_json(base):
+    """
+    Load the base json and parse all information from it.
+
+    Args:
+        base: The base json to load.
+    """
+    write_snapshot(parse_base_json(base))
+
+
+def load_refined_json(refined):
+    """
+    Load the refined json and parse all information from it.
+
+    Args:
+        refined: The refined json to load.
+    """
+    write_snapshot(parse_refined_json(refined))
 
 
 def parse_params(data):
@@ -459,57 +516,152 @@ def load_response_json(response):
 
 def response_json_update_influences(eddb_session, info):
     """
-    Update the eddb.Influence objects for the system in question.
+    Update the eddb.Influence objects for all systems in the response.
 
-    If any system doesn't contain the faction, add it to database.
-    In addition, add the influence to history.
+    All names are resolved up front, then existing influences are updated and
+    missing ones inserted with one statement each. If any system doesn't contain
+    the faction, add it to database. In addition, add the influences to history.
 
     Args:
         eddb_session: The session onto the db.
         info: The object with information parsed from response.json.
+
+    Returns: A list of Influence.ids that were updated or added.
     """
     log = logging.getLogger(__name__)
-
-    influence_ids = []
-    for sys_name, sys_info in info.items():
-        if 'factions' not in sys_info:
+    pairs = [
+        (sys_name, faction) for sys_name, sys_info in info.items()
+        for faction in sys_info.get('factions', [])
+    ]
+    if not pairs:
+        return []
+
+    system_ids = dict(
+        eddb_session.query(System.name, System.id).
+        filter(System.name.in_({x[0] for x in pairs}))
+    )
+    faction_ids = dict(
+        eddb_session.query(Faction.name, Faction.id).
+        filter(Faction.name.in_({x[1]['name'] for x in pairs}))
+    )
+
+    now = time.time()
+    latest = {}
+    for sys_name, faction in pairs:
+        try:
+            key = (system_ids[sys_name], faction_ids[faction['name']])
+        except KeyError:
+            log.error("IMP Failed to find combination of: %s | %s", sys_name, faction['name'])
             continue
 
-        # Handle updating data for influence of factions
-        for faction in sys_info['factions']:
-            try:
-                found = eddb_session.query(Influence).\
-                    join(System, Influence.system_id == System.id).\
-                    join(Faction, Influence.faction_id == Faction.id).\
-                    filter(
-                        System.name == sys_name,
-                        Faction.name == faction['name']).\
-                    one()
-                log.info("Updating faction %s in %s", faction['name'], sys_name)
-            except sqla.orm.exc.NoResultFound:
-                # Somehow influence not there, faction must be new to system
-                try:
-                    system_id = eddb_session.query(System.id).\
-                        filter(System.name == sys_name).\
-                        one()[0]
-                    faction_id = eddb_session.query(Faction.id).\
-                        filter(Faction.name == faction['name']).\
-                        one()[0]
-                    found = Influence(system_id=system_id, faction_id=faction_id)
-                    eddb_session.add(found)
-                    eddb_session.flush()
-                    log.info("Adding faction %s in %s", faction['name'], sys_name)
-                except sqla_orm.exc.NoResultFound as exc:
-                    log.error('IMP Exception on query: %s', str(exc))
-                    log.error("IMP Failed to find combination of: %s | %s", sys_name, faction['name'])
-                    continue
-
-            found.happiness_id = faction['happiness']
-            found.influence = faction['influence']
-            influence_ids += [found.id]
-            cogdb.eddb.add_history_influence(eddb_session, found)
+        latest[key] = {
+            'system_id': key[0],
+            'faction_id': key[1],
+            'happiness_id': faction['happiness'],
+            'influence': faction['influence'],
+            'updated_at': now,
+        }
+    if not latest:
+        return []
 
-    return influence_ids
+    existing = {
+        (system_id, faction_id): (inf_id, is_controlling) for system_id, faction_id, inf_id, is_controlling
+        in eddb_session.query(Influence.system_id, Influence.faction_id, Influence.id, Influence.is_controlling_faction).
+        filter(Influence.system_id.in_({x[0] for x in latest}))
+    }
+    updates = [
+        {'b_id': existing[key][0], 'b_happiness_id': inf['happiness_id'],
+         'b_influence': inf['influence'], 'b_updated_at': inf['updated_at']}
+        for key, inf in latest.items() if key in existing
+    ]
+    if updates:
+        eddb_session.execute(
+            Influence.__table__.update().
+            where(Influence.id == sqla.bindparam('b_id')).
+            values(happiness_id=sqla.bindparam('b_happiness_id'),
+                   influence=sqla.bindparam('b_influence'),
+                   updated_at=sqla.bindparam('b_updated_at')),
+            updates
+        )
+        log.info("Updated %d influences", len(updates))
+
+    inserts = [inf for key, inf in latest.items() if key not in existing]
+    if inserts:
+        eddb_session.execute(Influence.__table__.insert(), inserts)
+        log.info("Added %d influences", len(inserts))
+        existing.update({
+            (system_id, faction_id): (inf_id, False) for system_id, faction_id, inf_id
+            in eddb_session.query(Influence.system_id, Influence.faction_id, Influence.id).
+            filter(Influence.system_id.in_({x['system_id'] for x in inserts}),
+                   Influence.faction_id.in_({x['faction_id'] for x in inserts}))
+        })
+
+    # Each response is its own batch, history written by the EDDN listener is not cached here
+    cogdb.eddb.HistoryInfluenceCache().add_points(eddb_session, [
+        {**inf, 'is_controlling_faction': existing[key][1]} for key, inf in latest.items()
+    ])
+
+    return [existing[key][0] for key in latest]
+
+
+def response_json_update_held(eddb_session, info):
+    """
+    Update the held merits and stolen forts of all systems in the response.
+    SpySystems missing are added from the System, all are written in one statement each.
+
+    Args:
+        eddb_session: The session onto the db.
+        info: The object with information parsed from response.json.
+
+    Returns: A dictionary mapping system names to their power_id.
+    """
+    log = logging.getLogger(__name__)
+    now_time = time.time()
+    power_ids = dict(
+        eddb_session.query(SpySystem.system_name, SpySystem.power_id).
+        filter(SpySystem.system_name.in_(list(info.keys())))
+    )
+    found = list(power_ids.keys())
+
+    new_systems = []
+    missing = [x for x in info if x not in power_ids]
+    for eddb_system in eddb_session.query(System).filter(System.name.in_(missing)):
+        sys_info = info[eddb_system.name]
+        new_systems += [{
+            'ed_system_id': eddb_system.ed_system_id,
+            'system_name': eddb_system.name,
+            'power_id': eddb_system.power_id,
+            'power_state_id': eddb_system.power_state_id,
+            'held_merits': sys_info['power']['held_merits'],
+            'stolen_forts': sys_info['power']['stolen_forts'],
+            'held_updated_at': now_time,
+        }]
+        power_ids[eddb_system.name] = eddb_system.power_id
+        log.warning("Adding SpySystem for held merits: %s", eddb_system.name)
+    if new_systems:
+        eddb_session.execute(SpySystem.__table__.insert(), new_systems)
+
+    # Always update held time based on response
+    if found:
+        eddb_session.query(SpySystem).\
+            filter(SpySystem.system_name.in_(found)).\
+            update({'held_updated_at': now_time}, synchronize_session=False)
+    held = [
+        {'b_system_name': sys_name, 'b_held_merits': info[sys_name]['power']['held_merits'],
+         'b_stolen_forts': info[sys_name]['power']['stolen_forts']}
+        for sys_name in found if 'power' in info[sys_name]
+    ]
+    if held:
+        eddb_session.execute(
+            SpySystem.__table__.update().
+            where(SpySystem.system_name == sqla.bindparam('b_system_name')).
+            values(held_merits=sqla.bindparam('b_held_merits'),
+                   stolen_forts=sqla.bindparam('b_stolen_forts')),
+            held
+        )
+        log.info("Updating held merits in %d systems", len(held))
+
+    return power_ids
 
 
 def response_json_update_system_info(eddb_session, info):
@@ -521,67 +673,60 @@ def response_json_update_system_info(eddb_session, info):
         - the bounties in system
         - the traffic in system
 
+    Every table is written with a single statement for all systems in the response.
+
     Args:
         eddb_session: The session onto the db.
         info: The object with information parsed from response.json.
     """
     ship_map = ship_type_to_id_map(traffic_text=False)
-    ship_map_traffic = ship_type_to_id_map(traffic_text=True)
     log = logging.getLogger(__name__)
+    if not info:
+        return
 
-    now_time = time.time()
+    power_ids = response_json_update_held(eddb_session, info)
+
+    bounties = []
     for sys_name, sys_info in info.items():
-        try:
-            system = eddb_session.query(SpySystem).\
-                filter(SpySystem.system_name == sys_name).\
-                one()
-            log.info("Updating SpySystem %s", sys_name)
-        except sqla.orm.exc.NoResultFound:
-            eddb_system = eddb_session.query(System).\
-                filter(System.name == sys_name).\
-                one()
-            kwargs = {
-                'ed_system_id': eddb_system.ed_system_id,
-                'system_name': eddb_system.name,
-                'power_id': eddb_system.power_id,
-                'power_state_id': eddb_system.power_state_id,
-                'held_merits': sys_info['power']['held_merits'],
-                'stolen_forts': sys_info['power']['stolen_forts'],
-            }
-            system = SpySystem(**kwargs)
-            eddb_session.add(system)
-            log.warning("Adding SpySystem for held merits: %s", sys_name)
-
-        # Always update held time based on response
-        system.held_updated_at = now_time
-        if 'power' in sys_info:
-            system.held_merits = sys_info['power']['held_merits']
-            system.stolen_forts = sys_info['power']['stolen_forts']
-            log.info("Updating held merits in %s", sys_name)
-
-        if 'top5_power' in sys_info:
+        if 'top5_power' in sys_info and sys_name in power_ids:
             log.warning("Parsing top 5 bounties for: %s", sys_name)
             for b_info in sys_info['top5_power'].values():
                 b_info['system'] = sys_name
-                bounty = SpyBounty.from_bounty_post(b_info, power_id=system.power_id, ship_map=ship_map)
-                eddb_session.add(bounty)
+                bounties += [SpyBounty.from_bounty_post(b_info, power_id=power_ids[sys_name], ship_map=ship_map)]
+    if bounties:
+        eddb_session.bulk_save_objects(bounties)
+
+    response_json_update_traffic(eddb_session, info)
+
+
+def response_json_update_traffic(eddb_session, info):
+    """
+    Replace the traffic of all systems in the response with the current values.
+
+    Args:
+        eddb_session: The session onto the db.
+        info: The object with information parsed from response.json.
+    """
+    ship_map_traffic = ship_type_to_id_map(traffic_text=True)
+    log = logging.getLogger(__name__)
+
+    # Only keep current traffic values for now
+    eddb_session.query(SpyTraffic).\
+        filter(SpyTraffic.system.in_(list(info.keys()))).\
+        delete(synchronize_session=False)
+    traffic = []
+    for sys_name, sys_info in info.items():
+        if 'traffic' not in sys_info:
+            continue
 
-        # Only keep current traffic values for now
-        eddb_session.query(SpyTraffic).\
-            filter(SpyTraffic.system == sys_name).\
-            delete()
         log.warning("Parsing ship traffic for: %s", sys_name)
-        if 'traffic' in sys_info:
-            for ship_name, cnt in sys_info['traffic']['by_ship'].items():
-                try:
-                    traffic = SpyTraffic(
-                        cnt=cnt,
-                        ship_id=ship_map_traffic[ship_name],
-                        system=sys_name,
-                    )
-                    eddb_session.add(traffic)
-                except KeyError:
-                    log.error("Not found %s", ship_name)
+        for ship_name, cnt in sys_info['traffic']['by_ship'].items():
+            try:
+                traffic += [{'cnt': cnt, 'ship_id': ship_map_traffic[ship_name], 'system': sys_name}]
+            except KeyError:
+                log.error("Not found %s", ship_name)
+    if traffic:
+        eddb_session.execute(SpyTraffic.__table__.insert(), traffic)
 
 
 def compare_sheet_fort_systems_to_spy(session, eddb_session):
@@ -795,9 +940,418 @@ async def execute_power_scrape(eddb_session, power_name, *, callback=None, hours
     return influence_ids
 
 
+def scrape_entries(eddb_session, systems):
+    """
+    Create the entries to queue in the ScrapeScheduler for systems.
+    Systems never scraped for held merits are given held_updated_at 0, so they are the stalest.
+
+    Args:
+        eddb_session: A session onto the EDDB db.
+        systems: The list of cogdb.eddb.Systems to scrape.
+
+    Returns: A list of entries, one per system.
+    """
+    held = dict(
+        eddb_session.query(SpySystem.system_name, sqla.func.min(SpySystem.held_updated_at)).
+        filter(SpySystem.system_name.in_([x.name for x in systems])).
+        group_by(SpySystem.system_name)
+    )
+
+    return [{
+        'name': system.name,
+        'ed_system_id': system.ed_system_id,
+        'held_updated_at': held.get(system.name) or 0,
+    } for system in systems]
+
+
+class ScrapeScheduler():
+    """
+    Scrape systems from the spy API with a bounded number of requests in flight.
+
+    - Requests share the spy API rate limit, see cog.util.rate_limit, unless a rate is given.
+    - The system with the stalest held_updated_at is always scraped next.
+    - Responses are parsed in a long lived worker pool.
+    - The queue is persisted to a file on every change, resume() continues it after a restart.
+    """
+    def __init__(self, fname=SCRAPE_QUEUE, *, rate=None, burst=None, concurrency=None, pool=None):
+        conf = cog.util.CONF.scrape.unwrap if cog.util.CONF.scrape else {}
+        self.fname = pathlib.Path(fname)
+        self.bucket = cog.util.TokenBucket(rate=rate, capacity=burst or 1) if rate else cog.util.rate_limit('spy')
+        self.concurrency = concurrency or conf.get('concurrency', SCRAPE_CONCURRENCY)
+        self.pool = pool
+        self.pending = {}  # ed_system_id -> entry
+        self.in_flight = set()
+        self.waiters = {}  # ed_system_id -> [asyncio.Future]
+        self.workers = []
+        self.halted = None
+        self.load()
+
+    def __str__(self):
+        return f"Scrapes pending: {len(self.pending)}, in flight: {len(self.in_flight)}, workers: {len(self.workers)}"
+
+    def load(self):
+        """
+        Load the queue persisted by a previous run.
+        """
+        try:
+            with self.fname.open('r', encoding='utf-8') as fin:
+                self.pending = {x['ed_system_id']: x for x in json.load(fin)}
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.pending = {}
+
+    def save(self):
+        """
+        Atomically persist the queue.
+        """
+        temp = self.fname.with_suffix('.tmp')
+        with temp.open('w', encoding='utf-8') as fout:
+            json.dump(list(self.pending.values()), fout)
+        temp.replace(self.fname)
+
+    def next_entry(self):
+        """
+        Returns: The stalest entry not in flight, None if there are none.
+        """
+        waiting = [x for key, x in self.pending.items() if key not in self.in_flight]
+        return min(waiting, key=lambda x: (x['held_updated_at'], x['name'])) if waiting else None
+
+    def add(self, entries):
+        """
+        Queue entries to scrape and make sure workers are running.
+        Entries already queued are not duplicated, the caller will wait on the queued scrape.
+
+        Args:
+            entries: The entries to scrape, see scrape_entries.
+
+        Returns: A list of asyncio.Futures, each resolves to (name, influence_ids) of an entry.
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for entry in entries:
+            self.pending.setdefault(entry['ed_system_id'], entry)
+            fut = loop.create_future()
+            self.waiters.setdefault(entry['ed_system_id'], []).append(fut)
+            futures += [fut]
+
+        self.save()
+        self.start()
+        return futures
+
+    def start(self):
+        """
+        Start workers up to the concurrency limit while there are entries to scrape.
+        """
+        self.halted = None
+        self.workers = [x for x in self.workers if not x.done()]
+        while len(self.workers) < min(self.concurrency, len(self.pending)):
+            self.workers += [asyncio.create_task(self.worker())]
+
+    async def resume(self):
+        """
+        Resume scraping any entries persisted by a previous run.
+        """
+        if self.pending:
+            logging.getLogger(__name__).warning("POSTAPI Resuming %d queued scrapes.", len(self.pending))
+            self.start()
+
+    def resolve(self, key, *, result=None, exc=None):
+        """
+        Resolve every waiter on an entry with a result or exception.
+        """
+        for fut in self.waiters.pop(key, []):
+            if fut.done():
+                continue
+            if exc:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(result)
+
+    async def worker(self):
+        """
+        Scrape entries until the queue is empty or the remote is down.
+        When the remote is down every waiter fails, entries stay queued for resume.
+        Any other failure only fails the waiters of that entry, it is dropped from the queue.
+        """
+        log = logging.getLogger(__name__)
+        while not self.halted:
+            entry = self.next_entry()
+            if not entry:
+                break
+
+            key = entry['ed_system_id']
+            self.in_flight.add(key)
+            try:
+                await self.bucket.acquire()
+                influence_ids = await self.scrape(entry)
+            except cog.exc.RemoteError as exc:
+                log.error("POSTAPI Remote down, %d scrapes remain queued: %s", len(self.pending), exc)
+                self.halted = exc
+                for waiting in list(self.waiters):
+                    self.resolve(waiting, exc=exc)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.exception("POSTAPI Dropping scrape of %s: %s", entry['name'], exc)
+                del self.pending[key]
+                self.save()
+                self.resolve(key, exc=exc)
+            else:
+                del self.pending[key]
+                self.save()
+                self.resolve(key, result=(entry['name'], influence_ids))
+            finally:
+                self.in_flight.discard(key)
+
+    async def post(self, entry):
+        """
+        POST the request for an entry, retrying on timeouts with linear backoff.
+
+        Returns: The JSON response.
+
+        Raises:
+            cog.exc.RemoteError: The remote is down or never responded.
+        """
+        log = logging.getLogger(__name__)
+        timeout = cog.util.HTTP.timeout(read=SCRAPE_TIMEOUT)
+        api_url = f'{cog.util.CONF.scrape.api}?token={cog.util.CONF.scrape.token}'
+        headers = {
+            'Accept': '*/*',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Content-Type': 'application/json',
+        }
+
+        for retry in range(1, SCRAPE_RETRIES + 1):
+            try:
+                async with cog.util.HTTP.session().post(api_url, data=json.dumps({entry['name']: entry['ed_system_id']}),
+                                                        headers=headers, timeout=timeout) as resp:
+                    if resp.status != 200:
+                        raise cog.exc.RemoteError(f"Failed to POST from remote site [{api_url}]: {resp.status}")
+                    return json.loads(await resp.text())
+            except asyncio.TimeoutError:
+                log.error("POSTAPI Timeout: %s. Retry in %d seconds.", entry['name'], retry * SCRAPE_RETRY_DELAY)
+                await asyncio.sleep(retry * SCRAPE_RETRY_DELAY)
+            except aiohttp.ClientError as exc:
+                raise cog.exc.RemoteError("Some unexpected failure on POST.") from exc
+
+        raise cog.exc.RemoteError(f"POSTAPI never responded for {entry['name']}.")
+
+    async def scrape(self, entry):
+        """
+        Scrape a single entry and parse the response into the database.
+
+        Returns: A list of cogdb.eddb.Influence ids updated.
+        """
+        log = logging.getLogger(__name__)
+        log.warning("POSTAPI Request: %s.", entry['name'])
+        response_json = await self.post(entry)
+        log.warning("POSTAPI Received: %s.", entry['name'])
+
+        if not self.pool:
+            self.pool = cog.util.WorkerPool(max_workers=1)
+        influence_ids = await asyncio.get_running_loop().run_in_executor(self.pool, load_response_json, response_json)
+        log.warning("POSTAPI Finished Parsing: %s.", entry['name'])
+
+        return influence_ids
+
+    async def close(self):
+        """
+        Stop the workers and release the pool, the queue remains persisted.
+        """
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.pool:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+
+
+class SpySnapshots():
+    """
+    Track the powerplay snapshots, base.json and refined.json, across fetches.
+
+    - Snapshots are fetched conditionally on the ETag and Last-Modified of the last one loaded.
+    - A snapshot with the same content hash as the last one loaded is skipped.
+    - Of a changed snapshot only the rows that differ from the last loaded are written,
+      the rest only have their updated_at bumped, see touch_snapshot.
+    State is kept in memory, the first fetch after a restart loads everything.
+    """
+    def __init__(self, *, pool=None):
+        self.pool = pool
+        self.validators = {}  # snapshot name -> validators of the last loaded
+        self.digests = {}  # snapshot name -> sha256 of the last loaded
+        self.rows = {}  # table name -> {row key: row compared}
+
+    def __repr__(self):
+        return f"SpySnapshots(digests={self.digests!r}, validators={self.validators!r})"
+
+    async def fetch(self, name, *, params=None):
+        """
+        Fetch a snapshot from the spy API unless unchanged since last loaded.
+
+        Args:
+            name: The name of the snapshot, i.e. 'base.json'.
+            params: The params to append to the url.
+
+        Returns: (text, meta), text is None if unchanged. Pass meta to commit once loaded.
+
+        Raises:
+            cog.exc.RemoteError: The remote is down.
+        """
+        url = os.path.join(cog.util.CONF.scrape.api, 'getraw', name)
+        await cog.util.rate_limit('spy').acquire()
+        text, validators = await cog.util.get_url_conditional(url, params=params, validators=self.validators.get(name))
+        if text is None:
+            return None, None
+
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        if digest == self.digests.get(name):
+            self.validators[name] = validators
+            return None, None
+
+        return text, {'validators': validators, 'digest': digest}
+
+    def diff(self, tables):
+        """
+        Find the rows that changed since the last snapshot loaded.
+
+        Args:
+            tables: A dictionary of table name to rows, see SNAPSHOT_TABLES.
+
+        Returns: A dictionary of table name to the rows that are new or changed.
+        """
+        changed = {}
+        for name, rows in tables.items():
+            keys = SNAPSHOT_TABLES[name][1]
+            last = self.rows.get(name, {})
+            changed[name] = [
+                row for row in rows if last.get(tuple(row[x] for x in keys)) != snapshot_row(row)
+            ]
+
+        return changed
+
+    @staticmethod
+    def unchanged(tables, changed):
+        """
+        Find the rows of a snapshot that were not changed, see diff.
+
+        Args:
+            tables: A dictionary of table name to rows, see SNAPSHOT_TABLES.
+            changed: The changed rows of the tables returned by diff.
+
+        Returns: A dictionary of table name to the rows that are unchanged.
+        """
+        unchanged = {}
+        for name, rows in tables.items():
+            changed_ids = {id(row) for row in changed.get(name, [])}
+            unchanged[name] = [row for row in rows if id(row) not in changed_ids]
+
+        return unchanged
+
+    def commit(self, name, meta, tables, *, skipped=None):
+        """
+        Remember a snapshot once it is loaded, later ones are compared against it.
+        Rows skipped are not remembered, they are written again with the next changed snapshot.
+
+        Args:
+            name: The name of the snapshot.
+            meta: The meta returned by fetch.
+            tables: A dictionary of table name to rows parsed from the snapshot.
+            skipped: The ed_system_ids of rows that were not written.
+        """
+        skipped = skipped if skipped else set()
+        self.validators[name] = meta['validators']
+        self.digests[name] = meta['digest']
+        for table, rows in tables.items():
+            keys = SNAPSHOT_TABLES[table][1]
+            self.rows[table] = {
+                tuple(row[x] for x in keys): snapshot_row(row) for row in rows
+                if row.get('ed_system_id') not in skipped
+            }
+
+    async def load(self, name, *, parse, params=None):
+        """
+        Fetch a snapshot and write only the rows that changed to the database.
+        Parsing and writing are done in the pool.
+
+        Args:
+            name: The name of the snapshot, i.e. 'base.json'.
+            parse: The function that parses the snapshot into tables, i.e. parse_base_json.
+            params: The params to append to the url.
+
+        Returns: A dictionary of table name to the rows written, empty if the snapshot is unchanged.
+
+        Raises:
+            cog.exc.RemoteError: The remote is down.
+        """
+        log = logging.getLogger(__name__)
+        text, meta = await self.fetch(name, params=params)
+        if text is None:
+            log.warning("Snapshot %s unchanged, skipped.", name)
+            return {}
+
+        if not self.pool:
+            self.pool = cog.util.WorkerPool(max_workers=1)
+        loop = asyncio.get_running_loop()
+        tables = await loop.run_in_executor(self.pool, parse, text)
+        changed = self.diff(tables)
+        skipped = set()
+        if any(changed.values()):
+            skipped = await loop.run_in_executor(self.pool, write_snapshot, changed)
+        unchanged = self.unchanged(tables, changed)
+        if any(unchanged.values()):
+            await loop.run_in_executor(self.pool, touch_snapshot, unchanged)
+        self.commit(name, meta, tables, skipped=skipped)
+        log.warning("Snapshot %s loaded, rows changed: %s", name, {x: len(y) for x, y in changed.items()})
+
+        return changed
+
+    def close(self):
+        """
+        Release the pool.
+        """
+        if self.pool:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+
+
+def snapshot_row(row):
+    """
+    The values of a snapshot row that are compared between snapshots.
+
+    Args:
+        row: A row parsed from a snapshot.
+
+    Returns: A tuple of the sorted items of row, without SNAPSHOT_IGNORED columns.
+    """
+    return tuple(sorted((key, val) for key, val in row.items() if key not in SNAPSHOT_IGNORED))
+
+
+def snapshot_power_ids(tables):
+    """
+    Args:
+        tables: A dictionary of table name to rows, see SNAPSHOT_TABLES.
+
+    Returns: The set of power ids that have rows in tables.
+    """
+    return {row['power_id'] for rows in tables.values() for row in rows}
+
+
+def get_scraper():
+    """
+    Get the ScrapeScheduler of the bot, it is created on first use rather than at import.
+
+    Returns: The ScrapeScheduler.
+    """
+    global SCRAPER
+    if not SCRAPER:
+        SCRAPER = ScrapeScheduler()
+
+    return SCRAPER
+
+
 async def post_systems(systems, callback=None):  # pragma: no cover, would ping API point needlessly
     """
     Helper function, take a list of systems and query their information.
+    Systems are queued onto the scraper, see get_scraper.
 
     Args:
         systems: The list of cogdb.eddb.Systems that are found.
@@ -807,40 +1361,21 @@ async def post_systems(systems, callback=None):  # pragma: no cover, would ping
     Raises:
         RemoteError: The remote site is down.
     """
-    log = logging.getLogger(__name__)
+    with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
+        entries = scrape_entries(eddb_session, systems)
 
     influence_ids = []
-    delay_values = [random.randint(x - 4, x + 8) for x in HELD_DELAY]  # Randomly choose bounds too
-    api_url = f'{cog.util.CONF.scrape.api}?token={cog.util.CONF.scrape.token}'
-    for sys in systems:
-        log.warning("POSTAPI Request: %s.", sys.name)
-
-        retry = 0
-        while retry < 180:
-            try:
-                response_text = await cog.util.post_json_url(
-                    api_url, {sys.name: sys.ed_system_id}, timeout=180
-                )
-                break
-            except asyncio.TimeoutError:
-                retry += 30
-                log.error("POSTAPI Timeout: %s. Retry in %d seconds.", sys.name, retry)
-                await asyncio.sleep(retry)  # Linear retry backoff
-
-        response_json = json.loads(str(response_text))
-        log.warning("POSTAPI Received: %s.", sys.name)
-        with cfut.ProcessPoolExecutor(max_workers=1) as pool:
-            influence_ids += await asyncio.get_event_loop().run_in_executor(
-                pool, load_response_json, response_json
-            )
-        log.warning("POSTAPI Finished Parsing: %s.", sys.name)
-        if callback:
-            await callback(f'{sys.name} has been updated.')
-        log.warning("POSTAPI Finished Parsing: %s.", sys.name)
-        delay = random.randint(*delay_values)
-        log.warning("POSTAPI Waiting %d seconds. Will resume at: %s",
-                    delay, datetime.datetime.utcnow() + datetime.timedelta(seconds=delay))
-        await asyncio.sleep(delay)  # Randomly delay chosen post calls
+    futures = get_scraper().add(entries)
+    try:
+        for fut in asyncio.as_completed(futures):
+            sys_name, updated_ids = await fut
+            influence_ids += updated_ids
+            if callback:
+                await callback(f'{sys_name} has been updated.')
+    finally:
+        for fut in futures:  # Retrieve any exceptions of the futures not awaited
+            if fut.done() and not fut.cancelled():
+                fut.exception()
 
     if callback:
         sys_names = ", ".join([x.name for x in systems])[:1800]
@@ -972,6 +1507,8 @@ def main():  # pragma: no cover | destructive to test
 
 
 SPY_TABLES = [SpyPrep, SpyVote, SpySystem, SpyTraffic, SpyBounty]
+SCRAPER = None  # The ScrapeScheduler of the bot, see get_scraper
+SNAPSHOTS = SpySnapshots()
 PARSER_MAP = {
     "NewsSummaryFactionStateTitle": {
         'func': parse_response_news_summary,
@@ -31,11 +31,11 @@ async def send_post(scanner):
     """
     Simple stub to fake POSTs into the scheduler for testing purposes.
     """
-    pub = await aiozmq.rpc.connect_pubsub(bind=ADDR)
+    pub = await aiozmq.rpc.connect_rpc(bind=ADDR)
     atexit.register(functools.partial(pub_close, pub))
 
     while input():
-        await pub.publish('POSTs').remote_func(scanner, datetime.datetime.utcnow())
+        print('Acknowledged:', await pub.call.remote_func(scanner, str(datetime.datetime.utcnow())))
 
 
 def main():
@@ -39,6 +39,9 @@ with your discord id.
 
 Do you wish to delete all your information? yes/no
 """
+MAX_CONCURRENT_DOWNLOADS = 8
+# Stores the hashes of PVPLogs processed during regeneration, one per line
+REGENERATE_CHECKPOINT = ('data', 'pvp_regenerate.checkpoint')
 
 
 class PVPAction(Action):
@@ -242,14 +245,20 @@ class Admin(PVPAction):
         """
         Regenerate the PVP database by reparsing logs.
         This will:
-            - Drop and recreate all tables that aren't pvp_cmdrs.
-            - Process all logs in order of upload to archive channel on server.
-            - Import and parse selected events.
-            - Once done, regenerate all stats for each CMDR at the end.
+            - Drop and recreate all tables that aren't pvp_cmdrs, unless resuming.
+            - Download filtered archives concurrently and process them in order of upload per CMDR.
+            - Import and parse selected events, different CMDRs are parsed in parallel.
+            - Checkpoint every processed archive so an interrupted run can be resumed.
         """
         await self.bot.send_message(self.msg.channel, "All uploads will be denied while regeneration underway. Please wait while downloading filtered logs.")
         response = "Regenerating PVP database has completed."
-        pvp.schema.recreate_tables(keep_cmdrs=True)
+        checkpoint = cog.util.rel_to_abs(*REGENERATE_CHECKPOINT)
+        done_hashes = load_regenerate_checkpoint(checkpoint) if self.args.resume else set()
+        if done_hashes:
+            await self.msg.channel.send(f"Resuming regeneration, {len(done_hashes)} logs already processed.")
+        else:
+            pvp.schema.recreate_tables(keep_cmdrs=True)
+            pathlib.Path(checkpoint).unlink(missing_ok=True)
 
         down_dir = pathlib.Path(tempfile.mkdtemp(suffix='downs'))
         print(f"Regeneration down dir: {down_dir}")
@@ -262,28 +271,29 @@ class Admin(PVPAction):
         loop = asyncio.get_event_loop()
         filter_chan = self.bot.get_channel(cog.util.CONF.channels.pvp_filter)
 
-        cmdr_logs = await loop.run_in_executor(
+        cmdr_archives = await loop.run_in_executor(
             None,
-            pvp.schema.get_filtered_archives_by_cmdr, self.eddb_session
+            pvp.schema.get_filtered_hashes_by_cmdr, self.eddb_session
         )
+        cmdr_archives = prune_processed_archives(cmdr_archives, done_hashes=done_hashes)
         try:
+            sem = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
             with cfut.ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
-                coros, to_handle, log_fnames = await fetch_filtered_archives(
-                    filter_chan=filter_chan, cmdr_logs=cmdr_logs, down_dir=down_dir, pool=pool, loop=loop
-                )
-
-                await self.msg.channel.send("Waiting while logs are parsed.")
-
-                # Allow max one job per cmdr_id concurrently
-                while coros:
-                    await asyncio.wait(coros, return_when=asyncio.FIRST_COMPLETED)
-                    func = functools.partial(update_regenerate_coros,
-                                             coros=coros, to_handle=to_handle, pool=pool, loop=loop)
-                    coros = await loop.run_in_executor(None, func)
+                await self.msg.channel.send("Waiting while logs are downloaded and parsed.")
+                results = await asyncio.gather(*[
+                    regenerate_cmdr_archives(
+                        filter_chan=filter_chan, cmdr_id=cmdr_id, archives=archives,
+                        down_dir=down_dir, sem=sem, pool=pool, checkpoint=checkpoint
+                    )
+                    for cmdr_id, archives in cmdr_archives.items()
+                ])
+                log_fnames = [fname for fnames in results for fname in fnames]
+                pvp.schema.clear_leaderboard_cache()
 
                 for num, fname in enumerate(log_fnames, start=1):
                     await self.msg.channel.send(f'All logs parsed. Part {num} of {len(log_fnames)} parsed events log.',
                                                 file=discord.File(fp=fname))
+            pathlib.Path(checkpoint).unlink(missing_ok=True)
 
         except discord.Forbidden as exc:
             logging.getLogger(__name__).error('Discord error: %s', exc)
@@ -291,6 +301,7 @@ class Admin(PVPAction):
         except discord.HTTPException as exc:
             logging.getLogger(__name__).error('Discord error: %s', exc)
             response = "Received HTTP Error, may be intermittent issue. Investigate."
+            response += f"\nTo continue later use: `{self.bot.prefix}admin regenerate --resume`"
         finally:
             try:
                 shutil.rmtree(down_dir)
@@ -305,16 +316,21 @@ class Admin(PVPAction):
         """
         scanner = cogdb.scanners.get_scanner('hudson_kos')
         await scanner.update_cells()
-        with cfut.ProcessPoolExecutor(max_workers=1) as pool:
-            await self.bot.loop.run_in_executor(
-                pool, scanner.scheduler_run
-            )
+        await self.bot.loop.run_in_executor(
+            self.bot.pool, scanner.scheduler_run
+        )
 
         pvp.schema.update_kos_kills(self.eddb_session,
                                     kos_list=cogdb.query.kos_kill_list(self.session))
 
         return 'KOS list refreshed from sheet and KOS PVPKills updated.'
 
+    async def workers(self):  # pragma: no cover, depends on bot pool
+        """
+        Show the load and metrics of the shared worker pool.
+        """
+        return f"__Worker Pool__\n```{self.bot.pool}```"
+
     async def execute(self):
         try:
             admin = cogdb.query.get_admin(self.session, self.duser)
@@ -348,6 +364,7 @@ class FileUpload(PVPAction):  # pragma: no cover
         """
         Handle the file upload. Parts that are long will offload to the pool.
         This involves several steps now for each attachment:
+        - Download while hashing, reject duplicates before doing further work.
         - Upload to archive if new.
         - Filter the file to just the lines needed
         - Process all events in the file and return a message to user with processed information.
@@ -355,7 +372,7 @@ class FileUpload(PVPAction):  # pragma: no cover
         N.B. We will not upload filtered to filter channel, rerun the filtering command manually to resolve.
 
         Args:
-            pool: An instance of ProcessPoolExecutor.
+            pool: An instance of ProcessPoolExecutor, normally the bot's shared WorkerPool.
             filter_dir: The directory to put all filtered files.
 
         Returns: A list of events parsed from the log uploaded.
@@ -366,22 +383,33 @@ class FileUpload(PVPAction):  # pragma: no cover
                 continue
 
             with tempfile.NamedTemporaryFile(dir=filter_dir, delete=False) as tfile:
-                await attach.save(tfile.name)
                 tfile.close()
+                try:
+                    file_hash = await cog.util.download_and_hash(attach.url, tfile.name, alg='sha512')
+                except cog.exc.RemoteError:
+                    await self.bot.send_message(self.msg.channel, f'Failed to download {attach.filename}, try again.')
+                    continue
+
+                # Duplicates are rejected before any archiving or parsing is done.
+                existing = pvp.schema.get_pvp_log_by_hash(self.eddb_session, file_hash)
+                if existing and existing.msg_id:
+                    os.remove(tfile.name)
+                    await self.bot.send_message(self.msg.channel,
+                                                f'Log {attach.filename}, has already been uploaded. Ignoring.')
+                    continue
 
-                cmdr = await ensure_cmdr_exists(self.eddb_session, client=self.bot, msg=self.msg, fname=tfile.name)
-                pvp_log = await archive_log(self.eddb_session, msg=self.msg, cmdr=cmdr, fname=tfile.name)
+                cmdr = await ensure_cmdr_exists(self.eddb_session, client=self.bot, msg=self.msg,
+                                                fname=tfile.name, pool=pool)
+                pvp_log = await archive_log(self.eddb_session, msg=self.msg, cmdr=cmdr,
+                                            fname=tfile.name, file_hash=file_hash)
                 if not pvp_log:
                     await self.bot.send_message(self.msg.channel, f'Log {attach.filename}, has already been uploaded. Ignoring.')
                     continue
 
                 try:
-                    logs = await asyncio.get_event_loop().run_in_executor(
-                        pool, functools.partial(
-                            process_cmdr_tempfiles,
-                            cmdr_id=self.msg.author.id,
-                            info=[{'fname': tfile.name, 'attach_fname': attach.filename}]
-                        )
+                    logs = await process_cmdr_tempfiles_async(
+                        pool=pool, cmdr_id=self.msg.author.id,
+                        info=[{'fname': tfile.name, 'attach_fname': attach.filename}]
                     )
 
                     pvp.schema.update_kos_kills(self.eddb_session,
@@ -395,15 +423,14 @@ class FileUpload(PVPAction):  # pragma: no cover
     async def execute(self):
         filter_dir = pathlib.Path(tempfile.mkdtemp(suffix='filter'))
         try:
-            with cfut.ProcessPoolExecutor(max_workers=1) as pool:
-                events = await self.file_upload(pool=pool, filter_dir=filter_dir)
-
-                with tempfile.NamedTemporaryFile(mode='w') as tfile:
-                    async with aiofiles.open(tfile.name, 'w', encoding='utf-8') as aout:
-                        await aout.write("__Parsed Events__\n" + '\n'.join(events))
-                        await aout.flush()
-                    await self.msg.channel.send('Logs parsed. Summary attached.',
-                                                file=discord.File(fp=tfile.name, filename='parsed.log'))
+            events = await self.file_upload(pool=self.bot.pool, filter_dir=filter_dir)
+
+            with tempfile.NamedTemporaryFile(mode='w') as tfile:
+                async with aiofiles.open(tfile.name, 'w', encoding='utf-8') as aout:
+                    await aout.write("__Parsed Events__\n" + '\n'.join(events))
+                    await aout.flush()
+                await self.msg.channel.send('Logs parsed. Summary attached.',
+                                            file=discord.File(fp=tfile.name, filename='parsed.log'))
         finally:
             shutil.rmtree(filter_dir)
 
@@ -428,6 +455,7 @@ class Help(PVPAction):
             [f'{prefix}donate', 'Information on supporting the dev.'],
             [f'{prefix}feedback', 'Give feedback or report a bug'],
             [f'{prefix}help', 'This help command.'],
+            [f'{prefix}leaderboard', 'Rank CMDRs by kills, K/D, KOS kills or interdictions'],
             [f'{prefix}log', 'Show recent PVP events parsed'],
             [f'{prefix}match', 'Create and manage pvp matches.'],
             [f'{prefix}near', 'Find things near you.'],
@@ -505,6 +533,44 @@ class Log(PVPAction):
             await self.bot.send_message(self.msg.channel, 'Invalid after format. Write dates like: 2023-04-30T20:10:44')
 
 
+class Leaderboard(PVPAction):
+    """
+    Rank all CMDRs by their PVP events.
+    """
+    async def execute(self):
+        system_id, system_name = None, None
+        if self.args.system:
+            system = cogdb.eddb.get_systems(self.eddb_session, [' '.join(self.args.system)])[0]
+            system_id, system_name = system.id, system.name
+
+        rows = await asyncio.get_event_loop().run_in_executor(
+            None,
+            functools.partial(
+                pvp.schema.get_leaderboard,
+                self.eddb_session, sort_by=self.args.sort, days=self.args.days,
+                system_id=system_id, limit=self.args.limit
+            )
+        )
+
+        header = f"__PVP Leaderboard__\n\nRanked by {self.args.sort}"
+        if self.args.days:
+            header += f" over the last {self.args.days} days"
+        if system_name:
+            header += f" in {system_name}"
+        if not rows:
+            await self.bot.send_message(self.msg.channel, header + "\n\nNo recorded events.")
+            return
+
+        lines = [['Rank', 'CMDR', 'Kills', 'Deaths', 'K/D', 'KOS Kills', 'Interdictions']]
+        lines += [
+            [row['rank'], row['name'], row['kills'], row['deaths'], row['kill_ratio'], row['kos_kills'],
+             f"{row['interdiction_successes']}/{row['interdictions']}"]
+            for row in rows
+        ]
+        for msg in cog.tbl.format_table(lines, header=True, prefix=header + "\n\n"):
+            await self.bot.send_message(self.msg.channel, msg)
+
+
 class Recent(PVPAction):
     """
     Display the recent events of particular events requested.
@@ -1100,7 +1166,7 @@ async def cmdr_setup(eddb_session, client, msg, *, cmdr_name=None):  # pragma: n
         return False
 
     if str(modal.inara):
-        inara_info = await cog.inara.fetch_inara_info(str(modal.inara))
+        inara_info = await cog.inara.fetch_inara_info(str(modal.inara), use_cache=False)
         inara_info['discord_id'] = msg.author.id
         pvp.schema.update_pvp_inara(eddb_session, inara_info)
     else:
@@ -1135,7 +1201,7 @@ def filename_for_upload(cmdr_name, *, id_num=1, archive=False):
     return cog.util.clean_fname(fname, replacement='', extras=['-'])
 
 
-async def archive_log(eddb_session, *, msg, cmdr, fname):
+async def archive_log(eddb_session, *, msg, cmdr, fname, file_hash=None):
     """
     Upload a copy of the log file or zip to the archiving channel set for server.
 
@@ -1145,12 +1211,16 @@ async def archive_log(eddb_session, *, msg, cmdr, fname):
         log_chan: The disocrd.TextChannel that contains all log backups.
         cmdr: The PVPCmdr object.
         fname: The filename of the log OR zip file.
+        file_hash: The sha512 of the file if already computed, otherwise the file will be hashed.
 
     Returns: The PVPLog if it is new and was uploaded. Otherwise None
     """
     logging.getLogger(__name__).error("Archive FNAME: %s", fname)
     # Files are hashed to check for dupes on add.
-    pvp_log = await pvp.schema.add_pvp_log(eddb_session, fname=fname, cmdr_id=cmdr.id)
+    if file_hash:
+        pvp_log = pvp.schema.add_pvp_log_hash(eddb_session, file_hash, cmdr_id=cmdr.id)
+    else:
+        pvp_log = await pvp.schema.add_pvp_log(eddb_session, fname=fname, cmdr_id=cmdr.id)
     if pvp_log.msg_id:
         await msg.channel.send(f'Log already uploaded at {pvp_log.updated_date}.',)
         return None
@@ -1240,6 +1310,26 @@ def process_cmdr_tempfiles(*, cmdr_id, info):
     return logs
 
 
+async def process_cmdr_tempfiles_async(*, pool, cmdr_id, info):
+    """
+    Run process_cmdr_tempfiles on the pool, then clear leaderboards cached in this process.
+    The workers commit the new events, their own caches are not the one the bot reads.
+
+    Args:
+        pool: An instance of ProcessPoolExecutor, normally the bot's shared WorkerPool.
+        cmdr_id: The id of the cmdr who is associated with all provided logs.
+        info: See process_cmdr_tempfiles.
+
+    Returns: The events found in the tempfile, a list of strings.
+    """
+    logs = await asyncio.get_event_loop().run_in_executor(
+        pool, functools.partial(process_cmdr_tempfiles, cmdr_id=cmdr_id, info=info)
+    )
+    pvp.schema.clear_leaderboard_cache()
+
+    return logs
+
+
 def process_filtered_archive(*, fname, cmdr_id, attach_fname, log_fname):
     """
     Process a downloaded filtered archive.
@@ -1272,28 +1362,58 @@ def process_filtered_archive(*, fname, cmdr_id, attach_fname, log_fname):
     return cmdr_id
 
 
-def update_regenerate_coros(*, coros, to_handle, pool, loop):  # pragma: no cover
+def load_regenerate_checkpoint(fname):
+    """
+    Load the hashes of all PVPLogs already processed by an interrupted regeneration.
+
+    Args:
+        fname: The checkpoint file, one PVPLog.file_hash per line.
+
+    Returns: A set of the PVPLog.file_hash already processed. Empty if no checkpoint exists.
+    """
+    try:
+        with open(fname, 'r', encoding='utf-8') as fin:
+            return {line.strip() for line in fin if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def append_regenerate_checkpoint(fname, hashes):
     """
-    Manage running coros during the regeneration operation.
+    Record the hashes of PVPLogs that have been completely processed.
+    Appending keeps the cost of a checkpoint independent of prior progress.
 
     Args:
-        coros: The list of coroutines running, they are Future objects.
-        to_handle: A dictionary of jobs to start indexed by cmdr, see Admin.regenerate
-        pool: A ProcessPoolExecutor instance.
-        loop: The active running loop.
+        fname: The checkpoint file, one PVPLog.file_hash per line.
+        hashes: An iterable of PVPLog.file_hash that were processed.
+    """
+    with open(fname, 'a', encoding='utf-8') as fout:
+        fout.writelines([f'{file_hash}\n' for file_hash in hashes])
+        fout.flush()
+        os.fsync(fout.fileno())
 
-    Returns: Coros that still need to finish. If done, it will be empty list.
+
+def prune_processed_archives(cmdr_archives, *, done_hashes):
     """
-    not_finished = [x for x in coros if not x.done()]
+    Remove any filtered archive whose PVPLogs have all been processed already.
+    CMDRs left without archives are removed.
+
+    Args:
+        cmdr_archives: The mapping returned by pvp.schema.get_filtered_hashes_by_cmdr.
+        done_hashes: A set of PVPLog.file_hash already processed.
 
-    for finished in [x for x in coros if x.done()]:
-        cmdr_id = finished.result()
-        if to_handle[cmdr_id]:
-            next_job = to_handle[cmdr_id].pop()
-            func = functools.partial(process_filtered_archive, **next_job)
-            not_finished += [loop.run_in_executor(pool, func)]
+    Returns: A new mapping of same form as cmdr_archives with only archives left to process.
+    """
+    pruned = {}
+    for cmdr_id, archives in cmdr_archives.items():
+        remaining = {
+            msg_id: hashes for msg_id, hashes in archives.items()
+            if not hashes.issubset(done_hashes)
+        }
+        if remaining:
+            pruned[cmdr_id] = remaining
 
-    return not_finished
+    return pruned
 
 
 def get_privacy_versions(privacy_dir):
@@ -1336,7 +1456,7 @@ async def get_privacy_stmt(privacy_dir, *, version=None):
         return await fin.read()
 
 
-async def ensure_cmdr_exists(eddb_session, *, client, msg, fname):  # pragma: no cover, relies on underlying interactive cmdr_setup
+async def ensure_cmdr_exists(eddb_session, *, client, msg, fname, pool=None):  # pragma: no cover, relies on interactive cmdr_setup
     """
     Ensure a PVPCmdr exists for the author of the msg.
     In the case it doesn't, peek in the log file or archive and find cmdr name.
@@ -1347,18 +1467,19 @@ async def ensure_cmdr_exists(eddb_session, *, client, msg, fname):  # pragma: no
         client: A instance of the bot.
         msg: The originating message.
         fname: The filename where the attachment was saved.
+        pool: A ProcessPoolExecutor to check and extract files on, optional.
 
     Returns: The PVPCmdr that has the discord id of the msg.
     """
     cmdr = pvp.schema.get_pvp_cmdr(eddb_session, cmdr_id=msg.author.id)
     if not cmdr:
-        if await cog.util.is_log_file_async(fname):
+        if await cog.util.is_log_file_async(fname, pool=pool):
             cmdr_name = await pvp.journal.find_cmdr_name(fname)
 
-        elif await cog.util.is_zipfile_async(fname):
-            async with cog.util.extracted_archive_async(fname) as logs:
+        elif await cog.util.is_zipfile_async(fname, pool=pool):
+            async with cog.util.extracted_archive_async(fname, pool=pool) as logs:
                 for log in logs:
-                    if await cog.util.is_log_file_async(log):
+                    if await cog.util.is_log_file_async(log, pool=pool):
                         cmdr_name = await pvp.journal.find_cmdr_name(log)
                         break
         cmdr = await cmdr_setup(eddb_session, client, msg, cmdr_name=cmdr_name)
@@ -1380,15 +1501,52 @@ async def delete_existing_filtered_msgs(*, filter_chan, eddb_session):  # pragma
             log.error("Failed to delete: %s, %s", str(msg_id), str(exc))
 
 
-# FIXME:Small issue, need to deal with duplicate uploads being downloaded and assigned same PVPLog in grouping state of filtering.
+async def filter_attachment(*, pool, sem, attach, down_dir, filter_dir):  # pragma: no cover
+    """
+    Download a single attachment, hashing it while streaming, then filter it on the pool.
+    The semaphore bounds how many downloads are in flight at once.
+    No database work is done here, the PVPLog is recorded by the caller in upload order.
+
+    Args:
+        pool: An instance of ProcessPoolExecutor, to offload filtering.
+        sem: An asyncio.Semaphore shared by all downloads.
+        attach: The discord.Attachment to download.
+        down_dir: The directory to download logs to.
+        filter_dir: The directory to place filtered logs.
+
+    Raises:
+        pvp.journal.ParserError - The attachment is not supported.
+
+    Returns: A record of form: {'file_hash': sha512 of the attachment, 'fname': path to filtered file}
+    """
+    with tempfile.NamedTemporaryFile(dir=down_dir, delete=False) as tfile:
+        pass
+
+    async with sem:
+        file_hash = await cog.util.download_and_hash(attach.url, tfile.name)
+    print(f'Saved: {attach.filename}')
+
+    fut = await pvp.journal.filter_tempfile(
+        pool=pool, dest_dir=filter_dir,
+        fname=tfile.name, output_fname=pvp.schema.filtered_filename(attach.filename),
+        attach_fname=attach.filename
+    )
+
+    return {
+        'file_hash': file_hash,
+        'fname': await fut,
+    }
+
+
 async def retrieve_filter_logs(*, eddb_session, pool, log_chan, down_dir, filter_dir, callback_errors):  # pragma: no cover
     """
     Retrieve and filter logs at a high level. This is a multi step process.
         0) Validate the message was an upload, and if needed make a PVPCmdr and PVPLog record for it.
            This step allows the reconstruction of the database from blank.
-        1) Download all log files uploaded on log_chan to down_dir to a temporary file.
-        2) While downloading, every file (log or archive) should be filtered while downloads occurring.
+        1) Download all log files uploaded on log_chan to down_dir concurrently, hashing while streaming.
+        2) As each download finishes, the file (log or archive) is filtered on the pool.
         3) Await all downloads and filter operations complete.
+        4) In upload order, find or create the PVPLog of each file. Later uploads of the same file are skipped.
 
     Args:
         eddb_session: A session onto the EDDB db.
@@ -1414,7 +1572,8 @@ async def retrieve_filter_logs(*, eddb_session, pool, log_chan, down_dir, filter
             ...
         }
     """
-    coros, cmdr_to_filters = [], {}
+    sem = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    jobs, cmdr_to_filters = [], {}
 
     async for msg in log_chan.history(limit=10000000, oldest_first=True):
         if not msg.content.startswith('Discord ID'):  # Sanity guard against non upload messages
@@ -1430,89 +1589,113 @@ async def retrieve_filter_logs(*, eddb_session, pool, log_chan, down_dir, filter
             eddb_session.commit()
 
         for attach in msg.attachments:
-            with tempfile.NamedTemporaryFile(dir=down_dir, delete=False) as tfile:
-                await attach.save(tfile.name)
-                print(f'Saved: {attach.filename}')
-
-                # Ensure log exists for each attachment
-                pvp_log = await pvp.schema.add_pvp_log(eddb_session, tfile.name, cmdr_id=discord_id)
-                pvp_log.filename = attach.filename
-                pvp_log.msg_id = msg.id
+            jobs += [(cmdr, msg, attach, asyncio.ensure_future(filter_attachment(
+                pool=pool, sem=sem, attach=attach, down_dir=down_dir, filter_dir=filter_dir
+            )))]
+
+    # Wait for all download and filter operations, PVPLogs recorded in upload order
+    results = await asyncio.gather(*[job for *_, job in jobs], return_exceptions=True)
+    seen_hashes = set()
+    for (cmdr, msg, attach, _), result in zip(jobs, results):
+        if isinstance(result, pvp.journal.ParserError):
+            await callback_errors(str(result))
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        if result['file_hash'] in seen_hashes:
+            logging.getLogger(__name__).warning("Skipping duplicate upload: %s", attach.filename)
+            continue
+        seen_hashes.add(result['file_hash'])
 
-                try:
-                    coro = await pvp.journal.filter_tempfile(
-                        pool=pool, dest_dir=filter_dir,
-                        fname=tfile.name, output_fname=pvp_log.filtered_filename,
-                        attach_fname=attach.filename
-                    )
-                    coros += [coro]
-
-                    record = {
-                        'pvplog': pvp_log,
-                        'fname': coro,  # coro.result() is the fname of filtered file when done
-                    }
-                    try:
-                        cmdr_to_filters[discord_id]['records'] += [record]
-                    except KeyError:
-                        cmdr_to_filters[discord_id] = {
-                            'cmdr': cmdr,
-                            'records': [record]
-                        }
-                except pvp.journal.ParserError as exc:
-                    await callback_errors(str(exc))
-
-    # On resuming, all download and filter operations done
-    await asyncio.wait(coros)
-
-    for _, info in cmdr_to_filters.items():  # Replace coros with their result filenames
-        for record in info['records']:
-            record['fname'] = record['fname'].result()
+        pvp_log = pvp.schema.add_pvp_log_hash(eddb_session, result['file_hash'], cmdr_id=cmdr.id)
+        pvp_log.filename = attach.filename
+        pvp_log.msg_id = msg.id
+        cmdr_to_filters.setdefault(cmdr.id, {'cmdr': cmdr, 'records': []})['records'] += [{
+            'pvplog': pvp_log,
+            'fname': result['fname'],
+        }]
 
     return cmdr_to_filters
 
 
-async def fetch_filtered_archives(*, filter_chan, cmdr_logs, down_dir, loop, pool):  # pragma: no cover
+async def download_filtered_archive(*, filter_chan, msg_id, cmdr_id, down_dir, sem):  # pragma: no cover
     """
-    Fetch all filtered archives and start processing jobs on the pool provided.
+    Download all attachments of a single filtered archive message.
 
     Args:
         filter_chan: The discord.TextChannel object that stores the msgs to retrieve.
-        cmdr_logs: The map of cmdr_ids onto the msg_ids needed to download.
+        msg_id: The ID of the message with the filtered archive.
+        cmdr_id: The ID of the CMDR whose logs are in the archive.
         down_dir: The pathlib.Path to a directory to store all downloaded attachments.
-        loop: The active loop running.
-        pool: An instance of ProcessPoolExecutor to start jobs on.
+        sem: An asyncio.Semaphore shared by all downloads.
 
-    Returns: (coros, to_handle, log_fnames)
-        coros: The coroutines that have started to process downloaded archives.
-        to_handle: The stored information for following jobs once the coros have completed.
-        log_fnames: The filenames of logs that will have the processed information.
+    Returns: A list of kwargs for process_filtered_archive, one per attachment.
     """
-    coros, log_fnames = [], []
-    to_handle = {}
+    jobs = []
+    async with sem:
+        msg = await filter_chan.fetch_message(msg_id)
+        for attach in msg.attachments:
+            fname = down_dir / f'{msg_id}_{attach.filename}'
+            await attach.save(fname)
+            print(f'Downloaded: {attach.filename}')
 
-    for cmdr_id, msg_ids in cmdr_logs.items():
-        for msg_id in msg_ids:
-            msg = await filter_chan.fetch_message(msg_id)
-            for attach in msg.attachments:
-                with tempfile.NamedTemporaryFile(dir=str(down_dir), delete=False) as tfile:
-                    await attach.save(tfile.name)
-
-                print(f'Downloaded: {attach.filename}')
-                kwargs = {
-                    'cmdr_id': cmdr_id,
-                    'attach_fname': attach.filename,
-                    'fname': tfile.name,
-                    'log_fname': down_dir / f'{attach.filename}.log',
-                }
+            jobs += [{
+                'cmdr_id': cmdr_id,
+                'attach_fname': attach.filename,
+                'fname': fname,
+                'log_fname': down_dir / f'{msg_id}_{attach.filename}.log',
+            }]
+
+    return jobs
+
+
+async def regenerate_cmdr_archives(*, filter_chan, cmdr_id, archives, down_dir, sem, pool, checkpoint):  # pragma: no cover
+    """
+    Download and process in order all filtered archives of a single CMDR.
+    Only one archive per CMDR is parsed at a time while the next one is downloaded.
+    Different CMDRs are expected to run concurrently, sharing the pool and download semaphore.
+    Once an archive has been processed, the hashes of the PVPLogs inside are checkpointed.
+
+    Args:
+        filter_chan: The discord.TextChannel object that stores the msgs to retrieve.
+        cmdr_id: The ID of the CMDR whose archives are processed.
+        archives: A mapping of filtered_msg_id onto the PVPLog.file_hash within. See pvp.schema.get_filtered_hashes_by_cmdr
+        down_dir: The pathlib.Path to a directory to store all downloaded attachments.
+        sem: An asyncio.Semaphore shared by all downloads.
+        pool: An instance of ProcessPoolExecutor to parse archives on.
+        checkpoint: The filename of the regeneration checkpoint.
+
+    Returns: The filenames of logs that have the processed information.
+    """
+    loop = asyncio.get_event_loop()
+    log_fnames = []
+    pending = list(archives.items())
+
+    msg_id, hashes = pending.pop(0)
+    download = asyncio.ensure_future(download_filtered_archive(
+        filter_chan=filter_chan, msg_id=msg_id, cmdr_id=cmdr_id, down_dir=down_dir, sem=sem
+    ))
+    try:
+        while download:
+            jobs, done_hashes = await download, hashes
+
+            download = None
+            if pending:  # Prefetch next archive while parsing this one
+                msg_id, hashes = pending.pop(0)
+                download = asyncio.ensure_future(download_filtered_archive(
+                    filter_chan=filter_chan, msg_id=msg_id, cmdr_id=cmdr_id, down_dir=down_dir, sem=sem
+                ))
+
+            for kwargs in jobs:
+                await loop.run_in_executor(pool, functools.partial(process_filtered_archive, **kwargs))
                 log_fnames += [kwargs['log_fname']]
-                try:
-                    to_handle[cmdr_id] += [kwargs]
-                except KeyError:
-                    to_handle[cmdr_id] = []
-                    # Start first job while downloading
-                    coros += [loop.run_in_executor(pool, functools.partial(process_filtered_archive, **kwargs))]
+            append_regenerate_checkpoint(checkpoint, done_hashes)
+    finally:
+        if download:  # Processing failed, do not leave the prefetch running
+            download.cancel()
+            await asyncio.gather(download, return_exceptions=True)
 
-    return coros, to_handle, log_fnames
+    return log_fnames
 
 
 async def kos_kills_monitor(*, repeat=True, delay=1800):  # pragma: no cover, tested elsewhere
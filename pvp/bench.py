@@ -0,0 +1,310 @@
+"""
+Benchmarks for the pvp journal pipeline, covers the stages every upload goes through.
+See documentation with -h.
+
+Synthetic journals are generated by repeating tests/pvp/player_journal.jsonl with shifted
+timestamps, each stage is then run in a fresh process and measured for:
+    events per second, peak RSS and number of queries issued.
+
+Stages that touch the database run against the configured EDDB database and use a
+reserved benchmark CMDR that is purged afterwards. Never point this at production.
+
+To run the default sizes and save results to compare against later:
+    python -m pvp.bench --output bench.json
+
+To run only filtering on a 1M line journal:
+    python -m pvp.bench --lines 1000000 --stages filter_log filter_archive
+"""
+import argparse
+import concurrent.futures as cfut
+import contextlib
+import datetime
+import json
+import pathlib
+import resource
+import shutil
+import tempfile
+import time
+import zipfile
+
+import sqlalchemy as sqla
+
+import cog.tbl
+import cog.util
+import cogdb
+import pvp.journal
+import pvp.schema
+
+BENCH_CMDR_ID = 2 ** 62  # Far beyond any discord id issued for decades
+BENCH_CMDR_NAME = 'PvPBenchmark'
+DEFAULT_LINES = [1000, 10000, 100000]
+TEMPLATE_JOURNAL = cog.util.rel_to_abs('tests', 'pvp', 'player_journal.jsonl')
+STAGES = ['filter_log', 'filter_archive', 'parse', 'stats']
+PARSE_LOG = 'bench.parse.log'
+
+
+def make_parser():
+    """
+    Make the parser for command line usage.
+
+    Returns: An instance of argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="PVP Journal Pipeline Benchmarks")
+    parser.add_argument('--lines', '-l', nargs='+', type=int, default=DEFAULT_LINES,
+                        help='The sizes of synthetic journals to benchmark, in lines.')
+    parser.add_argument('--stages', '-s', nargs='+', choices=STAGES, default=STAGES,
+                        help='The stages to benchmark.')
+    parser.add_argument('--template', '-t', default=TEMPLATE_JOURNAL,
+                        help='The journal to scale up into synthetic journals.')
+    parser.add_argument('--cmdr-id', type=int, default=BENCH_CMDR_ID,
+                        help='The id of the CMDR to parse events for, all events of this CMDR are purged after.')
+    parser.add_argument('--output', '-o',
+                        help='Write the results as JSON to this file.')
+
+    return parser
+
+
+def scale_journal(template, fname, *, num_lines):
+    """
+    Write a synthetic journal by repeating the body of a template journal.
+    The first line of the template is the header and is written only once.
+    Every repetition is shifted forward in time past the previous, so the events stay unique.
+
+    Args:
+        template: The journal to scale up.
+        fname: The filename to write the synthetic journal to.
+        num_lines: The number of lines to write.
+
+    Returns: The number of lines written.
+    """
+    with open(template, 'r', encoding='utf-8') as fin:
+        header, *body = [line.strip() for line in fin if line.strip()]
+
+    events = [json.loads(line) for line in body]
+    tstamps = [pvp.journal.datetime_to_tstamp(x['timestamp']) for x in events]
+    span = max(tstamps) - min(tstamps) + 1
+
+    written = 0
+    with open(fname, 'w', encoding='utf-8') as fout:
+        fout.write(header + '\n')
+        written += 1
+        repeat = 0
+        while written < num_lines:
+            for event, tstamp in zip(events, tstamps):
+                if written == num_lines:
+                    break
+                shifted = tstamp + repeat * span
+                event['timestamp'] = datetime.datetime.utcfromtimestamp(shifted).strftime(cog.util.TIME_STRP)
+                # Match the journal format of no space between key and value
+                fout.write(json.dumps(event, separators=(', ', ':')) + '\n')
+                written += 1
+            repeat += 1
+
+    return written
+
+
+def count_lines(fname):
+    """
+    Count the lines in a file.
+
+    Args:
+        fname: The filename.
+
+    Returns: The number of lines.
+    """
+    with open(fname, 'r', encoding='utf-8') as fin:
+        return sum(1 for _ in fin)
+
+
+@contextlib.contextmanager
+def count_queries(engine):
+    """
+    Count every statement executed on an engine while in the context.
+
+    Args:
+        engine: The sqlalchemy engine to listen on.
+
+    Returns: A list, the only element is the running count of queries.
+    """
+    counter = [0]
+
+    def increment(*_):
+        counter[0] += 1
+
+    sqla.event.listen(engine, 'before_cursor_execute', increment)
+    try:
+        yield counter
+    finally:
+        sqla.event.remove(engine, 'before_cursor_execute', increment)
+
+
+def bench_filter_log(*, journal, work_dir, **_):
+    """
+    Filter a journal.
+
+    Returns: The number of lines read.
+    """
+    pvp.journal.filter_log(journal, work_dir / 'bench.filter.log')
+    return count_lines(journal)
+
+
+def bench_filter_archive(*, journal, work_dir, **_):
+    """
+    Filter the archive of the journal prepared by run_benchmarks.
+
+    Returns: The number of lines read.
+    """
+    pvp.journal.filter_archive(work_dir / 'bench.zip', output_d=work_dir, filtered_archive='bench.filter.zip')
+    return count_lines(journal)
+
+
+def bench_parse(*, work_dir, cmdr_id, **_):
+    """
+    Parse the filtered version of a journal prepared by run_benchmarks, this is what an upload parses.
+
+    Returns: The number of lines parsed.
+    """
+    with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
+        parser = pvp.journal.Parser(fname=work_dir / PARSE_LOG, cmdr_id=cmdr_id, eddb_session=eddb_session)
+        parser.load()
+        parser.parse()
+
+    return len(parser.lines)
+
+
+def bench_stats(*, cmdr_id, **_):
+    """
+    Compute the statistics of the CMDR that was parsed.
+
+    Returns: The number of kill, death and interdiction events the stats covered.
+    """
+    with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
+        stats = pvp.schema.compute_pvp_stats(eddb_session, cmdr_ids=[cmdr_id])
+
+    return stats['kills'] + stats['deaths'] + stats['interdictions'] + stats['interdicteds']
+
+
+BENCH_FUNCS = {
+    'filter_log': bench_filter_log,
+    'filter_archive': bench_filter_archive,
+    'parse': bench_parse,
+    'stats': bench_stats,
+}
+
+
+def measure(stage, **kwargs):
+    """
+    Run a single stage and measure it. Run this in a fresh process so peak RSS is for the stage.
+
+    Args:
+        stage: The name of the stage in BENCH_FUNCS.
+        kwargs: Passed through to the stage.
+
+    Returns: A dictionary of the measurements.
+    """
+    with count_queries(cogdb.eddb_engine) as queries:
+        start = time.perf_counter()
+        events = BENCH_FUNCS[stage](**kwargs)
+        seconds = time.perf_counter() - start
+
+    return {
+        'stage': stage,
+        'events': events,
+        'seconds': round(seconds, 4),
+        'events_per_second': round(events / seconds, 1) if seconds else 0.0,
+        'queries': queries[0],
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def reset_cmdr(cmdr_id):
+    """
+    Purge all events of the benchmark CMDR and ensure the CMDR exists.
+
+    Args:
+        cmdr_id: The id of the benchmark CMDR.
+    """
+    with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
+        pvp.schema.purge_cmdr(eddb_session, cmdr_id=cmdr_id)
+        pvp.schema.update_pvp_cmdr(eddb_session, cmdr_id, name=BENCH_CMDR_NAME)
+
+
+def run_benchmarks(*, template, lines, stages, cmdr_id):
+    """
+    Run all requested stages against synthetic journals of every size requested.
+
+    Args:
+        template: The journal to scale up.
+        lines: A list of journal sizes in lines.
+        stages: The stages to run, see STAGES.
+        cmdr_id: The id of the benchmark CMDR.
+
+    Returns: A list of the measurements of every stage, each has a lines key with the journal size.
+    """
+    results = []
+    work_dir = pathlib.Path(tempfile.mkdtemp(suffix='bench'))
+    try:
+        for num_lines in lines:
+            journal = work_dir / 'Journal.bench.01.log'
+            scale_journal(template, journal, num_lines=num_lines)
+            with zipfile.ZipFile(work_dir / 'bench.zip', 'w', compression=zipfile.ZIP_DEFLATED) as zipf:
+                zipf.write(journal, journal.name)
+
+            if 'parse' in stages:
+                pvp.journal.filter_log(journal, work_dir / PARSE_LOG)
+                reset_cmdr(cmdr_id)
+            for stage in [x for x in STAGES if x in stages]:
+                with cfut.ProcessPoolExecutor(max_workers=1) as pool:
+                    result = pool.submit(measure, stage, journal=journal, work_dir=work_dir, cmdr_id=cmdr_id).result()
+                result['lines'] = num_lines
+                results += [result]
+                print(f"{num_lines:>8} lines | {stage:14} | {result['events_per_second']:>12} events/s")
+
+            for path in work_dir.glob('bench.filter*'):
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+    finally:
+        shutil.rmtree(work_dir)
+        if 'parse' in stages:
+            with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
+                pvp.schema.purge_cmdr(eddb_session, cmdr_id=cmdr_id)
+
+    return results
+
+
+def format_results(results):
+    """
+    Format the results of benchmarks into a table.
+
+    Args:
+        results: The list of measurements returned by run_benchmarks.
+
+    Returns: The table as a string.
+    """
+    lines = [['Lines', 'Stage', 'Events', 'Seconds', 'Events/s', 'Queries', 'Peak RSS (MB)']]
+    lines += [
+        [x['lines'], x['stage'], x['events'], x['seconds'], x['events_per_second'], x['queries'], x['peak_rss_mb']]
+        for x in results
+    ]
+
+    return cog.tbl.format_table(lines, header=True, wrap_msgs=False, limit=10 ** 6)[0]
+
+
+def main():  # pragma: no cover
+    """
+    Run the benchmarks and report.
+    """
+    args = make_parser().parse_args()
+    results = run_benchmarks(template=args.template, lines=args.lines, stages=args.stages, cmdr_id=args.cmdr_id)
+    print('\n' + format_results(results))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fout:
+            json.dump(results, fout, indent=2)
+        print(f"Results written to: {args.output}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
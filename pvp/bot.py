@@ -51,6 +51,18 @@ class PVPBot(CogBot):  # pragma: no cover
         self.parser = pvp.parse.make_parser(prefix)
         self.deny_commands = True
         self.once = False
+        # Shared by uploads and other parsing, workers started in on_ready
+        self.pool = cog.util.WorkerPool(max_workers=os.cpu_count())
+
+    async def close(self):
+        """
+        Shutdown the shared worker pool on close, queued jobs are cancelled where supported.
+        """
+        if sys.version_info >= (3, 9):
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        else:  # cancel_futures added in python 3.9
+            self.pool.shutdown(wait=False)
+        await super().close()
 
     async def on_ready(self):
         """
@@ -75,6 +87,7 @@ class PVPBot(CogBot):  # pragma: no cover
         # This block is effectively a one time setup.
         if not self.once:
             self.once = True
+            log.info('Worker pool started with pids: %s', await self.pool.warm())
             asyncio.ensure_future(asyncio.gather(
                 presence_task(self),
                 simple_heartbeat(),
@@ -647,13 +647,13 @@ async def filter_tempfile(*, pool, dest_dir, fname, output_fname, attach_fname):
     Returns: A coro if one was started to process an archive. Otherwise None.
     """
     func = None
-    if await cog.util.is_log_file_async(fname):
+    if await cog.util.is_log_file_async(fname, pool=pool):
         func = functools.partial(
             filter_log,
             fname, dest_dir / output_fname
         )
 
-    elif await cog.util.is_zipfile_async(fname):
+    elif await cog.util.is_zipfile_async(fname, pool=pool):
         func = functools.partial(
             filter_archive,
             fname, output_d=dest_dir, filtered_archive=output_fname
@@ -59,6 +59,10 @@ def subs_admin(subs, prefix):
 **{prefix}admin regenerate**
         Use only when log corruption expected or change in log parsing.
         Reparses all uploaded logs to regenerate database.
+**{prefix}admin regenerate --resume**
+        Resume an interrupted regeneration, skipping logs already processed.
+**{prefix}admin workers**
+        Show the shared worker pool load and per job metrics.
 **{prefix}admin prune #mention_channel_1 #mention_channel_2**
         Delete all messages in mentioned channels.
 **{prefix}admin prune_bulk #mention_channel_1 #mention_channel_2**
@@ -78,7 +82,9 @@ def subs_admin(subs, prefix):
 
     subcmds.add_parser('filter', help='Filter all existing log uploads for events of interest.')
     subcmds.add_parser('kos', help='Update KOS list and PVPKills for KOS.')
-    subcmds.add_parser('regenerate', help='Regenerate the PVP database.')
+    subcmd = subcmds.add_parser('regenerate', help='Regenerate the PVP database.')
+    subcmd.add_argument('--resume', action='store_true', help='Resume an interrupted regeneration.')
+    subcmds.add_parser('workers', help='Show the shared worker pool metrics.')
     subcmds.add_parser('prune', help='Delete messages in one or more mentioned channels.')
     subcmds.add_parser('prune_bulk', help='Delete messages in bulk for one or more mentioned channels.')
 
@@ -133,6 +139,31 @@ Order is based on earliest first.
     sub.add_argument('-l', '--limit', nargs='?', type=int, help='Limit to the most recent num events.')
 
 
+@register_parser
+def subs_leaderboard(subs, prefix):
+    """ Subcommand parsing for leaderboard """
+    desc = f"""To rank all CMDRs by their PVP events.
+
+**{prefix}leaderboard**
+        Show the top 10 CMDRs by kills.
+**{prefix}leaderboard --sort kd**
+        Show the top 10 CMDRs by kill to death ratio. Choose from: kills, kd, kos, interdictions
+**{prefix}leaderboard -d 7 -l 20**
+**{prefix}leaderboard --days 7 --limit 20**
+        Show the top 20 CMDRs by kills in the last 7 days.
+**{prefix}leaderboard Rhea**
+        Show the top 10 CMDRs by kills counting only events in Rhea.
+    """
+    sub = subs.add_parser(prefix + 'leaderboard', description=desc, formatter_class=RawHelp)
+    sub.set_defaults(cmd='Leaderboard')
+    CMD_MAP['Leaderboard'] = 'leaderboard'
+    sub.add_argument('system', nargs='*', default=[], help='Only count events in this system.')
+    sub.add_argument('-s', '--sort', default='kills', choices=['kills', 'kd', 'kos', 'interdictions'],
+                     help='The statistic to rank CMDRs by.')
+    sub.add_argument('-d', '--days', type=int, help='Only count events in the last number of days.')
+    sub.add_argument('-l', '--limit', default=10, type=int, help='Show this many CMDRs.')
+
+
 @register_parser
 def subs_recent(subs, prefix):
     """ Subcommand parsing for recent """
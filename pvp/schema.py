@@ -30,6 +30,16 @@ MATCH_STATES = {
     2: "Finished",
 }
 EMPTY = 'N/A'
+LEADERBOARD_COUNTS = ['kills', 'deaths', 'kos_kills', 'interdictions', 'interdiction_successes']
+LEADERBOARD_SORTS = {
+    'kills': 'kills',
+    'kd': 'kill_ratio',
+    'kos': 'kos_kills',
+    'interdictions': 'interdiction_successes',
+}
+# Leaderboards computed since the last ingest of events, see clear_leaderboard_cache
+LEADERBOARD_CACHE = {}
+LEADERBOARD_WINDOW_BUCKET = 3600  # Seconds a board over the last days is kept before its window moves
 
 
 class EventTimeMixin():
@@ -610,12 +620,7 @@ class PVPLog(ReprMixin, TimestampMixin, Base):
     @property
     def filtered_filename(self):
         """ The filtered filename for zips and logs. """
-        fname = self.filename
-
-        if fname.endswith('.zip') or fname.endswith('.log'):
-            fname = fname[:-4] + '.filter' + fname[-4:]
-
-        return fname
+        return filtered_filename(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, PVPLog) and hash(self) == hash(other)
@@ -1262,6 +1267,120 @@ def get_pvp_stats(eddb_session, *, cmdr_ids):
     return presentable_stats(compute_pvp_stats(eddb_session, cmdr_ids=cmdr_ids), discord_embed=True)
 
 
+def leaderboard_select(cls, *, after=None, system_id=None, **counts):
+    """
+    Select one row per event of cls with a column for each of LEADERBOARD_COUNTS.
+    Counts not provided in counts are 0, the rows are meant to be UNION ALL together then summed.
+
+    Args:
+        cls: The event class to select from, must have cmdr_id, system_id and event_at.
+        after: If set, only select events at or after this timestamp.
+        system_id: If set, only select events in this system.
+        counts: Mapping of count names to an expression that is 1 when the event counts.
+
+    Returns: The select statement.
+    """
+    stmt = sqla.select(
+        cls.cmdr_id.label('cmdr_id'),
+        *[counts.get(name, sqla.literal_column('0')).label(name) for name in LEADERBOARD_COUNTS]
+    )
+    if after:
+        stmt = stmt.where(cls.event_at >= after)
+    if system_id:
+        stmt = stmt.where(cls.system_id == system_id)
+
+    return stmt
+
+
+def compute_leaderboard(eddb_session, *, sort_by='kills', after=None, system_id=None, limit=10):
+    """
+    Rank all CMDRs with events, the entire ranking is computed in one query.
+    Events are unioned, summed per CMDR and then ranked with a window function.
+
+    Args:
+        eddb_session: A session onto the EDDB db.
+        sort_by: A key of LEADERBOARD_SORTS to rank by.
+        after: If set, only count events at or after this timestamp.
+        system_id: If set, only count events in this system.
+        limit: Return only this many top ranked CMDRs. When 0 or None, return all.
+
+    Returns: A list of dicts with keys: rank, cmdr_id, name, kill_ratio and all LEADERBOARD_COUNTS.
+    """
+    one = sqla.literal_column('1')
+    kwargs = {'after': after, 'system_id': system_id}
+    events = sqla.union_all(
+        leaderboard_select(PVPKill, kills=one, kos_kills=sqla.case((PVPKill.kos, 1), else_=0), **kwargs),
+        leaderboard_select(PVPDeath, deaths=one, **kwargs),
+        leaderboard_select(PVPInterdiction, interdictions=one,
+                           interdiction_successes=sqla.case((PVPInterdiction.is_success, 1), else_=0), **kwargs),
+    ).subquery()
+
+    sums = {name: sqla.func.sum(events.c[name]) for name in LEADERBOARD_COUNTS}
+    kills = sums['kills'] * 1.0  # Avoid integer division
+    sums['kill_ratio'] = sqla.case((sums['deaths'] > 0, kills / sums['deaths']), else_=kills)
+    sort_col = sums[LEADERBOARD_SORTS[sort_by]]
+    query = eddb_session.query(
+        sqla.func.rank().over(order_by=sort_col.desc()).label('rank'),
+        events.c.cmdr_id, PVPCmdr.name,
+        *[col.label(name) for name, col in sums.items()]
+    ).\
+        select_from(events).\
+        join(PVPCmdr, PVPCmdr.id == events.c.cmdr_id).\
+        group_by(events.c.cmdr_id, PVPCmdr.name).\
+        order_by(sort_col.desc(), PVPCmdr.name)
+    if limit:
+        query = query.limit(limit)
+
+    results = []
+    for row in query:
+        result = {name: int(getattr(row, name) or 0) for name in ['rank', 'cmdr_id'] + LEADERBOARD_COUNTS}
+        result['name'] = row.name
+        result['kill_ratio'] = round(float(row.kill_ratio or 0), 2)
+        results += [result]
+
+    return results
+
+
+def get_leaderboard(eddb_session, *, sort_by='kills', days=None, system_id=None, limit=10):
+    """
+    Get the leaderboard, cached until events are added or removed, see clear_leaderboard_cache.
+    Boards over the last days are also keyed by the current LEADERBOARD_WINDOW_BUCKET,
+    so their window moves forward and boards of past buckets are dropped.
+
+    Args:
+        eddb_session: A session onto the EDDB db.
+        sort_by: A key of LEADERBOARD_SORTS to rank by.
+        days: If set, only count events in the last number of days.
+        system_id: If set, only count events in this system.
+        limit: Return only this many top ranked CMDRs.
+
+    Returns: See compute_leaderboard.
+    """
+    bucket, after = None, None
+    if days:
+        bucket = int(time.time() // LEADERBOARD_WINDOW_BUCKET)
+        after = bucket * LEADERBOARD_WINDOW_BUCKET - days * 24 * 3600
+
+    key = (sort_by, days, system_id, limit, bucket)
+    try:
+        return LEADERBOARD_CACHE[key]
+    except KeyError:
+        if bucket:
+            for old_key in [x for x in LEADERBOARD_CACHE if x[-1] and x[-1] != bucket]:
+                del LEADERBOARD_CACHE[old_key]
+        LEADERBOARD_CACHE[key] = compute_leaderboard(eddb_session, sort_by=sort_by, after=after,
+                                                     system_id=system_id, limit=limit)
+
+    return LEADERBOARD_CACHE[key]
+
+
+def clear_leaderboard_cache():
+    """
+    Clear all cached leaderboards, call whenever pvp events are added or removed.
+    """
+    LEADERBOARD_CACHE.clear()
+
+
 async def add_pvp_log(eddb_session, fname, *, cmdr_id):
     """
     Add a PVP log to the database and optionally update the client archive with it.
@@ -1275,14 +1394,57 @@ async def add_pvp_log(eddb_session, fname, *, cmdr_id):
     Returns: The PVPLog that was created or already existed.
     """
     sha512 = await cog.util.hash_file(fname, alg='sha512')
-    try:
-        pvp_log = eddb_session.query(PVPLog).\
-            filter(PVPLog.file_hash == sha512).\
-            one()
-    except sqla.exc.NoResultFound:
+
+    return add_pvp_log_hash(eddb_session, sha512, cmdr_id=cmdr_id)
+
+
+def get_pvp_log_by_hash(eddb_session, file_hash):
+    """
+    Get the PVPLog matching a file hash, use to detect duplicate uploads cheaply.
+
+    Args:
+        eddb_session: A session onto the EDDB db.
+        file_hash: The sha512 hexdigest of the log or archive.
+
+    Returns: The PVPLog if it exists, otherwise None.
+    """
+    return eddb_session.query(PVPLog).\
+        filter(PVPLog.file_hash == file_hash).\
+        one_or_none()
+
+
+def filtered_filename(fname):
+    """
+    The filename a log or archive is filtered to.
+
+    Args:
+        fname: The filename of the attachment uploaded.
+
+    Returns: The filename with .filter inserted before the extension of zips and logs.
+    """
+    if fname.endswith('.zip') or fname.endswith('.log'):
+        fname = fname[:-4] + '.filter' + fname[-4:]
+
+    return fname
+
+
+def add_pvp_log_hash(eddb_session, file_hash, *, cmdr_id):
+    """
+    Add a PVP log to the database when the hash of the file is already known.
+    When a PVPLog is new, the msg_id and filename will be None.
+
+    Args:
+        eddb_session: A session onto the EDDB db.
+        file_hash: The sha512 hexdigest of the log or archive.
+        cmdr_id: The cmdr's id.
+
+    Returns: The PVPLog that was created or already existed.
+    """
+    pvp_log = get_pvp_log_by_hash(eddb_session, file_hash)
+    if not pvp_log:
         pvp_log = PVPLog(
             cmdr_id=cmdr_id,
-            file_hash=sha512,
+            file_hash=file_hash,
         )
         eddb_session.add(pvp_log)
         eddb_session.flush()
@@ -1331,6 +1493,27 @@ def get_filtered_archives_by_cmdr(eddb_session):
     return mapped_logs
 
 
+def get_filtered_hashes_by_cmdr(eddb_session):
+    """
+    Map every cmdr onto the filtered archives holding their logs.
+    Each filtered archive is mapped onto the hashes of the PVPLogs inside it, this allows
+    determining when an archive has been completely processed.
+
+    Args:
+        eddb_session: A session onto the EDDB db.
+
+    Returns: A dictionary of form: {cmdr_id: {filtered_msg_id: {file_hash, ...}, ...}, ...}
+    """
+    mapped_hashes = {}
+    rows = eddb_session.query(PVPLog.cmdr_id, PVPLog.filtered_msg_id, PVPLog.file_hash).\
+        filter(PVPLog.filtered_msg_id).\
+        order_by(PVPLog.id)
+    for cmdr_id, filtered_msg_id, file_hash in rows:
+        mapped_hashes.setdefault(cmdr_id, {}).setdefault(filtered_msg_id, set()).add(file_hash)
+
+    return mapped_hashes
+
+
 def get_filtered_pvp_logs(eddb_session):
     """
     Get all PVPLogs that have been filtered and have useful information to process.
@@ -1517,6 +1700,7 @@ def purge_cmdr(eddb_session, *, cmdr_id):
     eddb_session.query(PVPInara).filter(PVPInara.discord_id == cmdr_id).delete()
     eddb_session.query(PVPCmdr).filter(PVPCmdr.id == cmdr_id).delete()
     eddb_session.commit()
+    clear_leaderboard_cache()
 
 
 def update_kos_kills(eddb_session, *, kos_list):
@@ -1530,6 +1714,7 @@ def update_kos_kills(eddb_session, *, kos_list):
     eddb_session.query(PVPKill).\
         filter(PVPKill.victim_name.in_(kos_list)).\
         update({'kos': True})
+    clear_leaderboard_cache()
 
 
 def drop_tables(keep_cmdrs=False):  # pragma: no cover | destructive to test
@@ -1566,6 +1751,7 @@ def empty_tables(keep_cmdrs=False):
     with cogdb.session_scope(cogdb.EDDBSession) as eddb_session:
         for table in tables:
             eddb_session.query(table).delete()
+    clear_leaderboard_cache()
 
 
 def is_safe_to_drop(tbl_name):
@@ -1583,6 +1769,7 @@ def recreate_tables(keep_cmdrs=False):  # pragma: no cover | destructive to test
     sqlalchemy.orm.session.close_all_sessions()
     drop_tables(keep_cmdrs)
     Base.metadata.create_all(cogdb.eddb_engine)
+    clear_leaderboard_cache()
 
 
 def main():  # pragma: no cover
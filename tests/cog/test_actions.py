@@ -15,6 +15,7 @@ import sqlalchemy as sqla
 
 import cog.actions
 import cog.bot
+import cog.inara
 import cog.parse
 import cogdb
 import cogdb.eddb
@@ -1760,6 +1761,22 @@ async def test_cmd_kos_search(f_bot, f_kos):
 
     expect = "bad_guy   | Hudson  | KILL         | Pretty bad guy"
     assert expect in str(f_bot.send_message.call_args).replace("\\n", "\n")
+    assert 'Searching for "bad" against known CMDRs' in str(f_bot.send_message.call_args)
+
+
+@pytest.mark.asyncio
+async def test_cmd_kos_search_inara(f_bot, f_kos, monkeypatch):
+    async def fake_fetch_profiles(cmdr_names, channel):
+        return {name: {'commanderSquadron': {'squadronName': 'Bad Squad'}} for name in cmdr_names}
+
+    monkeypatch.setattr(cog.inara, 'HEADER_PROTO', {'appName': 'test'})
+    monkeypatch.setattr(cog.inara.api, 'fetch_profiles', fake_fetch_profiles)
+    msg = fake_msg_gears("!kos search bad --inara")
+
+    await action_map(msg, f_bot).execute()
+
+    expect = "bad_guy   | Hudson  | KILL         | Pretty bad guy    | Bad Squad"
+    assert expect in str(f_bot.send_message.call_args).replace("\\n", "\n")
 
 
 @pytest.mark.asyncio
@@ -5,13 +5,16 @@ Tests for cog.inara
 import asyncio
 import os
 
+import aiohttp.web
 import discord
 try:
     import rapidjson as json
 except ImportError:
     import json
 import pytest
+import pytest_asyncio
 
+import cog.exc
 import cog.inara
 import cog.util
 from tests.conftest import GITHUB_FAIL
@@ -38,52 +41,80 @@ def test_inara_api_input():
     assert actual["header"]["APIkey"].startswith("3")
 
 
-@pytest.mark.asyncio
-async def test_rate_limiter_increment(f_bot):
-    msg = fake_msg_gears("!fort")
-    rate_limit = cog.inara.RateLimiter(max_rate=12, resume_rate=9)
-
-    await rate_limit.increment(f_bot, msg.channel)
-    assert rate_limit.rate == 1
+@pytest_asyncio.fixture()
+async def f_inara_server(monkeypatch):
+    """
+    A local stand in for the Inara API, yields the number of events in every POST received.
+    """
+    posts = []
+
+    async def handler(request):
+        events = (await request.json())['events']
+        posts.append(len(events))
+        return aiohttp.web.json_response({
+            'header': {'eventStatus': 200},
+            'events': [{
+                'eventCustomID': event['eventCustomID'],
+                'eventStatus': 204 if event['eventData']['searchName'] == 'nobody' else 200,
+                'eventData': {'userName': event['eventData']['searchName']},
+            } for event in reversed(events)],
+        })
+
+    app = aiohttp.web.Application()
+    app.router.add_post('/', handler)
+    runner = aiohttp.web.AppRunner(app)
+    await runner.setup()
+    await aiohttp.web.TCPSite(runner, '127.0.0.1', 18781).start()
+    monkeypatch.setattr(cog.inara, 'API_ENDPOINT', 'http://127.0.0.1:18781/')
+    try:
+        yield posts
+    finally:
+        await cog.util.HTTP.close()
+        await runner.cleanup()
 
 
 @pytest.mark.asyncio
-async def test_rate_limiter_increment_wait(f_bot):
-    msg = fake_msg_gears("!fort")
-    rate_limit = cog.inara.RateLimiter(max_rate=2, resume_rate=1)
-
-    await rate_limit.increment(f_bot, msg.channel)
-    assert rate_limit.rate == 1
-    asyncio.ensure_future(rate_limit.increment(f_bot, msg.channel))
-    await asyncio.sleep(1)
-    assert rate_limit.rate == 2
-
+async def test_inara_batcher(f_bot, f_inara_server, db_cleanup):
+    posts = f_inara_server
+    cog.util.BOT = f_bot
+    rate_limit = cog.util.TokenBucket(rate=1, capacity=2)
+    batcher = cog.inara.InaraBatcher(rate_limit=rate_limit, window=0.1, max_events=3)
+    names = ['gears', 'cogs', 'nobody', 'gears2', 'cogs2']
+    events = await asyncio.gather(*[
+        batcher.lookup('getCommanderProfile', {'searchName': name}, 'channel') for name in names
+    ])
 
-@pytest.mark.asyncio
-async def test_rate_limiter_decrement(f_bot):
-    msg = fake_msg_gears("!fort")
-    rate_limit = cog.inara.RateLimiter(max_rate=12, resume_rate=9)
-    await rate_limit.increment(f_bot, msg.channel)
-    assert rate_limit.rate == 1
+    assert [x['eventData']['userName'] for x in events] == names
+    assert events[2]['eventStatus'] == 204
+    assert posts == [3, 2]
+    assert rate_limit.acquired == 2
 
-    await rate_limit.decrement(delay=1)
-    assert rate_limit.rate == 0
+    api = cog.inara.InaraApi()
+    api.batcher.window = 0.1
+    profiles = await api.fetch_profiles(['gears', 'nobody', 'gears'], 'channel')
+    assert profiles == {'gears': {'userName': 'gears'}, 'nobody': None}
+    assert posts[-1] == 2
 
 
 @pytest.mark.asyncio
-async def test_rate_limiter_decrement_wait(f_bot):
-    rate_limit = cog.inara.RateLimiter(max_rate=2, resume_rate=1)
-    msg = fake_msg_gears("!fort")
+async def test_inara_lookup_profile_cached(f_bot, f_inara_server, db_cleanup):
+    posts = f_inara_server
+    cog.util.BOT = f_bot
+    api = cog.inara.InaraApi()
+    api.batcher.window = 0.1
 
-    async def run_test():
-        await rate_limit.increment(f_bot, msg.channel)
-        await rate_limit.decrement(delay=2)
+    assert await api.lookup_profile('gears', 'channel') == {'userName': 'gears'}
+    assert posts == [1]
 
-    await asyncio.gather(
-        run_test(),
-        run_test(),
-    )
-    assert rate_limit.rate == 0
+    # Second lookups are served from the cache, only the new name is sent
+    assert await api.lookup_profile('Gears', 'channel') == {'userName': 'gears'}
+    profiles = await api.fetch_profiles(['gears', 'cogs'], 'channel')
+    assert profiles == {'gears': {'userName': 'gears'}, 'cogs': {'userName': 'cogs'}}
+    assert posts == [1, 1]
+
+    # Skipping the cache always asks Inara
+    await api.lookup_profile('gears', 'channel', use_cache=False)
+    assert posts == [1, 1, 1]
 
 
 @pytest.mark.asyncio
@@ -341,6 +372,14 @@ def test_wrap_json_loads():
 
 
 @pytest.mark.asyncio
-async def test_fetch_inara_info():
+async def test_fetch_inara_info(db_cleanup, monkeypatch):
     info = await cog.inara.fetch_inara_info(88153)
     assert 'Shorts McFadden' == info['name']
+
+    async def no_fetch(*_):
+        raise cog.exc.RemoteError('Should be cached.')
+
+    monkeypatch.setattr(cog.util, 'get_url', no_fetch)
+    assert info == await cog.inara.fetch_inara_info(88153)
+    with pytest.raises(cog.exc.RemoteError):
+        await cog.inara.fetch_inara_info(88153, use_cache=False)
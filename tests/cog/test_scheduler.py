@@ -107,6 +107,30 @@ def test_scheduler_disabled(f_asheet_fortscanner):
     assert scd.disabled('Fort')
 
 
+@pytest.mark.asyncio
+async def test_scheduler_remote_func(f_asheet_fortscanner):
+    fscan = cogdb.scanners.FortScanner(f_asheet_fortscanner)
+    scd = Scheduler()
+    scd.register('fort', fscan, ['Fort'])
+    wrap = scd.wrap_map['fort']
+
+    assert scd.remote_func('fort', 1)
+    assert wrap.future
+    assert scd.count == 0
+    wrap.future.cancel()
+    wrap.future = None
+
+    # Redelivery of the same POST is acknowledged but not rescheduled
+    assert scd.remote_func('fort', 1)
+    assert not wrap.future
+    assert scd.count == 0
+
+    assert scd.remote_func('fort', 2)
+    assert wrap.future
+    assert scd.last_posts == {'fort': 2}
+    wrap.future.cancel()
+
+
 # Tests schedule too implicitly.
 @pytest.mark.asyncio
 async def test_scheduler_schedule_all(f_asheet_fortscanner, f_asheet_umscanner):
@@ -2,15 +2,19 @@
 """
 Test util the grab all module.
 """
+import asyncio
 import datetime
 import os
 import pathlib
 import tempfile
 import shutil
+import time
 
+import aiohttp.web
 import mock
 import pytest
 
+import cog.exc
 import cog.util
 from tests.data import SYSTEMS, USERS
 from tests.cogdb.test_spansh import f_json
@@ -385,6 +389,49 @@ async def test_get_url():
     assert "google" in await cog.util.get_url('http://www.google.com')
 
 
+@pytest.mark.asyncio
+async def test_get_url_conditional():
+    async def handler(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return aiohttp.web.Response(status=304)
+        return aiohttp.web.Response(text='snapshot', headers={'ETag': '"v1"'})
+
+    app = aiohttp.web.Application()
+    app.router.add_get('/snapshot.json', handler)
+    runner = aiohttp.web.AppRunner(app)
+    await runner.setup()
+    await aiohttp.web.TCPSite(runner, '127.0.0.1', 18780).start()
+    url = 'http://127.0.0.1:18780/snapshot.json'
+    try:
+        text, validators = await cog.util.get_url_conditional(url)
+        assert text == 'snapshot'
+        assert validators == {'ETag': '"v1"'}
+        assert await cog.util.get_url_conditional(url, validators=validators) == (None, validators)
+
+        with pytest.raises(cog.exc.RemoteError):
+            await cog.util.get_url_conditional('http://127.0.0.1:18780/missing.json')
+    finally:
+        await cog.util.HTTP.close()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_http_client():
+    client = cog.util.HTTPClient()
+    http = client.session()
+    try:
+        assert http is client.session()
+        assert http.connector.limit_per_host == client.settings['limit_per_host']
+        assert client.timeout(read=5).sock_read == 5
+        assert client.timeout().sock_read == client.settings['read_timeout']
+    finally:
+        await client.close()
+
+    assert http.closed
+    assert client.session() is not http
+    await client.close()
+
+
 @pytest.mark.asyncio
 async def test_hash_file():
     with tempfile.NamedTemporaryFile() as fout:
@@ -398,6 +445,126 @@ async def test_hash_file():
         assert expect1 == await cog.util.hash_file(fout.name, alg='sha1')
 
 
+def test_parse_timestamp():
+    expect = datetime.datetime(2020, 8, 3, 11, 4, 11, tzinfo=datetime.timezone.utc)
+    assert cog.util.parse_timestamp("2020-08-03T11:04:11Z") == expect
+    assert cog.util.parse_timestamp("2020-08-03T11:04:11.661784Z") == expect.replace(microsecond=661784)
+    assert cog.util.parse_timestamp("2020-08-03T13:04:11+02:00") == expect
+    # Gateway timestamps as sent by EDDN, fractions vary in length
+    assert cog.util.parse_timestamp("2023-07-14T02:51:26.438Z") == \
+        datetime.datetime(2023, 7, 14, 2, 51, 26, 438000, tzinfo=datetime.timezone.utc)
+    assert cog.util.parse_timestamp("2023-07-14T02:51:26.4381Z") == \
+        datetime.datetime(2023, 7, 14, 2, 51, 26, 438100, tzinfo=datetime.timezone.utc)
+    assert cog.util.parse_timestamp("2023-07-14T02:51:26.43812345Z") == \
+        datetime.datetime(2023, 7, 14, 2, 51, 26, 438123, tzinfo=datetime.timezone.utc)
+
+    with pytest.raises(ValueError):
+        cog.util.parse_timestamp("Not a time")
+
+
+def test_hash_file_sync():
+    with tempfile.NamedTemporaryFile() as fout:
+        fout.write(b"This is a test file.")
+        fout.flush()
+
+        expect512 = 'b1df216b5b05e3965c469492744a5de0c945e0b103c42eb1e57476fbed8'\
+                    'f1d489f5cae9b792db37c5d823bc0c6c7d06b056176d6abe5ce076eeadaed414e17a3'
+        assert expect512 == cog.util.hash_file_sync(fout.name)
+        assert expect512 == cog.util.hash_file_sync(fout.name, chunk_size=3)
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_warm():
+    with cog.util.WorkerPool(max_workers=2) as pool:
+        pids = await pool.warm()
+        # Both jobs may land on the same worker, only the number of workers is fixed
+        assert 2 == len(pool._processes)  # pylint: disable=protected-access
+        assert pids <= set(pool._processes)  # pylint: disable=protected-access
+        assert os.getpid() not in pids
+        assert 2 == pool.metrics['worker_pid']['count']
+        assert 0 == pool.pending
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_full():
+    with cog.util.WorkerPool(max_workers=1, max_queued=0) as pool:
+        pool.pending = pool.max_pending
+        with pytest.raises(cog.exc.WorkerPoolFull):
+            pool.submit(cog.util.worker_pid)
+        pool.pending = 0
+
+        assert os.getpid() != await asyncio.get_event_loop().run_in_executor(pool, cog.util.worker_pid)
+        assert 'Pending: 0/1' in str(pool)
+        assert 'worker_pid: count 1, failed 0' in str(pool)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket():
+    bucket = cog.util.TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+
+    # Burst of 2 immediately, then 2 more at 20 per second
+    assert 0.09 < time.monotonic() - start < 0.5
+    assert bucket.delay() > 0
+
+
+def test_token_bucket_refill():
+    bucket = cog.util.TokenBucket(rate=10, capacity=3)
+    bucket.tokens, bucket.last = 0, time.monotonic() - 1
+
+    assert bucket.delay() == 0
+    assert bucket.tokens == 3
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_fifo_cancel():
+    bucket = cog.util.TokenBucket(rate=10, capacity=1)
+    order = []
+
+    async def take(num):
+        await bucket.acquire()
+        order.append(num)
+
+    await bucket.acquire()
+    assert bucket.would_wait()
+    cancelled = asyncio.ensure_future(take(0))
+    waiters = [asyncio.ensure_future(take(num)) for num in range(1, 4)]
+    await asyncio.sleep(0.01)
+    assert bucket.status()['waiting'] == 4
+
+    cancelled.cancel()
+    await asyncio.gather(*waiters)
+    assert order == [1, 2, 3]
+    assert bucket.status()['waiting'] == 0
+    assert bucket.acquired == 4
+    assert 'acquired' in str(bucket)
+
+
+def test_rate_limit():
+    try:
+        bucket = cog.util.rate_limit('inara')
+        assert bucket is cog.util.rate_limit('inara')
+        assert bucket.name == 'inara'
+        assert bucket.rate == cog.util.RATE_LIMITS['inara']['rate']
+        assert cog.util.rate_limit('spy') is not bucket
+    finally:
+        cog.util.RATE_LIMITERS.clear()
+
+    with pytest.raises(KeyError):
+        cog.util.rate_limit('unknown')
+
+
+def test_pool_or_temporary():
+    with cog.util.WorkerPool(max_workers=1) as pool:
+        with cog.util.pool_or_temporary(pool) as used:
+            assert used is pool
+
+    with cog.util.pool_or_temporary() as used:
+        assert used._max_workers == 1
+
+
 def test_clean_fname():
     assert '++++++351Test++;;+,+' == cog.util.clean_fname(r'///---351Test+*;;:,.', replacement='+')
     with pytest.raises(ValueError):
@@ -9,7 +9,8 @@ import tempfile
 import cogdb.common
 import cogdb.spansh
 from cogdb.eddb import SCommodityGroup
-from cogdb.eddb import SettlementSecurity
+from cogdb.eddb import SettlementSecurity, SpyVote
+from cogdb.eddb import System, Faction, HistoryInfluence
 
 
 def test_dump_objs_to_file():
@@ -96,3 +97,45 @@ def test_single_insert_from_file(eddb_session):
         eddb_session.query(SCommodityGroup).\
             filter(SCommodityGroup.id == fake_id).\
             delete()
+
+
+def test_bulk_upsert(eddb_session):
+    try:
+        eddb_session.add(SpyVote(power_id=1, vote=10, updated_at=100))
+        eddb_session.commit()
+
+        rows = [{'power_id': 1, 'vote': 50, 'updated_at': 200}, {'power_id': 2, 'vote': 60, 'updated_at': 200}]
+        cogdb.common.bulk_upsert(eddb_session, cls=SpyVote, rows=rows)
+        cogdb.common.bulk_upsert(eddb_session, cls=SpyVote, rows=[])
+        eddb_session.commit()
+
+        votes = eddb_session.query(SpyVote).order_by(SpyVote.power_id).all()
+        assert [(x.power_id, x.vote, x.updated_at) for x in votes] == [(1, 50, 200), (2, 60, 200)]
+    finally:
+        eddb_session.rollback()
+        eddb_session.query(SpyVote).delete()
+        eddb_session.commit()
+
+
+def test_oldest_for_pairs(eddb_session):
+    system = eddb_session.query(System).first()
+    faction, other = eddb_session.query(Faction).limit(2).all()
+    try:
+        eddb_session.add_all([
+            HistoryInfluence(system_id=system.id, faction_id=faction.id, influence=30, updated_at=200),
+            HistoryInfluence(system_id=system.id, faction_id=faction.id, influence=20, updated_at=100),
+            HistoryInfluence(system_id=system.id, faction_id=faction.id, influence=10, updated_at=100),
+            HistoryInfluence(system_id=system.id, faction_id=other.id, influence=40, updated_at=300),
+        ])
+        eddb_session.commit()
+        pairs = [(system.id, faction.id), (system.id, other.id), (system.id, faction.id)]
+
+        found = cogdb.common.oldest_for_pairs(eddb_session, cls=HistoryInfluence, pairs=pairs)
+        assert found == {(system.id, faction.id): 20, (system.id, other.id): 40}
+        found = cogdb.common.oldest_for_pairs(eddb_session, cls=HistoryInfluence, pairs=pairs, since=150)
+        assert found == {(system.id, faction.id): 30, (system.id, other.id): 40}
+        assert cogdb.common.oldest_for_pairs(eddb_session, cls=HistoryInfluence, pairs=[]) == {}
+    finally:
+        eddb_session.rollback()
+        eddb_session.query(HistoryInfluence).delete()
+        eddb_session.commit()
@@ -538,6 +538,73 @@ def test_add_history_influence_inf_diff(eddb_session):
         eddb_session.query(HistoryTrack).delete()
 
 
+def test_is_history_point_due():
+    kwargs = {'last_influence': 0.2, 'last_updated_at': HISTORY_TIMESTAMP}
+    assert not cogdb.eddb.is_history_point_due(**kwargs, influence=0.2, updated_at=HISTORY_TIMESTAMP + 60)
+    assert not cogdb.eddb.is_history_point_due(**kwargs, influence=0.3, updated_at=HISTORY_TIMESTAMP + 60)
+    assert cogdb.eddb.is_history_point_due(**kwargs, influence=0.3, updated_at=HISTORY_TIMESTAMP + 60 * 60 * 2)
+    assert cogdb.eddb.is_history_point_due(**kwargs, influence=0.2, updated_at=HISTORY_TIMESTAMP + 60 * 60 * 4)
+
+
+def test_history_influence_cache_add_points(eddb_session):
+    system = eddb_session.query(System).first()
+    faction = eddb_session.query(Faction).first()
+    influence = {
+        'system_id': system.id,
+        'faction_id': faction.id,
+        'happiness_id': 1,
+        'influence': 0.2,
+        'is_controlling_faction': False,
+        'updated_at': HISTORY_TIMESTAMP,
+    }
+    cache = cogdb.eddb.HistoryInfluenceCache()
+    try:
+        assert not cache.add_points(eddb_session, [influence])
+
+        eddb_session.add(HistoryTrack(system_id=system.id))
+        eddb_session.commit()
+        cache.clear()
+        assert len(cache.add_points(eddb_session, [influence])) == 1
+        assert not cache.add_points(eddb_session, [influence])
+        influence = dict(influence, influence=0.3, updated_at=HISTORY_TIMESTAMP + 60 * 60 * 2)
+        assert len(cache.add_points(eddb_session, [influence])) == 1
+        eddb_session.commit()
+
+        assert len(eddb_session.query(HistoryInfluence).all()) == 2
+        assert cache.counts[(system.id, faction.id)] == 2
+    finally:
+        eddb_session.rollback()
+        eddb_session.query(HistoryInfluence).delete()
+        eddb_session.query(HistoryTrack).delete()
+
+
+def test_history_influence_cache_limit(eddb_session):
+    system = eddb_session.query(System).first()
+    faction = eddb_session.query(Faction).first()
+    eddb_session.add(HistoryTrack(system_id=system.id))
+    eddb_session.commit()
+    influence = {
+        'system_id': system.id,
+        'faction_id': faction.id,
+        'happiness_id': 1,
+        'influence': 0.2,
+        'is_controlling_faction': False,
+        'updated_at': HISTORY_TIMESTAMP,
+    }
+    cache = cogdb.eddb.HistoryInfluenceCache()
+    try:
+        for _ in range(cogdb.eddb.HISTORY_INF_LIMIT + 10):
+            cache.add_points(eddb_session, [influence])
+            influence = dict(influence, updated_at=influence['updated_at'] + 60 * 60 * 4)
+        eddb_session.commit()
+
+        assert len(eddb_session.query(HistoryInfluence).all()) == cogdb.eddb.HISTORY_INF_LIMIT
+    finally:
+        eddb_session.rollback()
+        eddb_session.query(HistoryInfluence).delete()
+        eddb_session.query(HistoryTrack).delete()
+
+
 def test_get_power_by_name(eddb_session):
     assert "Felicia Winters" == cogdb.eddb.get_power_by_name(eddb_session, 'FW').text
     assert "Zachary Hudson" == cogdb.eddb.get_power_by_name(eddb_session, 'huds').text
@@ -2,9 +2,12 @@
 """
 Tests for cogdb.eddn
 """
+import collections
 import datetime
+import zlib
 
 import pytest
+import zmq
 try:
     import rapidjson as json
 except ImportError:
@@ -563,6 +566,98 @@ def test_timestamp_is_recent():
     assert not cogdb.eddn.timestamp_is_recent(msg, window=1)
 
 
+def test_decode_msg():
+    payload = zlib.compress(EXAMPLE_JOURNAL_STATION.encode())
+    assert cogdb.eddn.decode_msg(payload) == json.loads(EXAMPLE_JOURNAL_STATION)
+
+
+def test_lazy_pformat():
+    lazy = cogdb.eddn.LazyPformat({'b': [1, 2], 'a': 1})
+    assert str(lazy) == "{'a': 1, 'b': [1, 2]}"
+
+
+def test_route_msg():
+    workers = {'journal': 4, 'market': 2}
+    msg = json.loads(EXAMPLE_JOURNAL_STATION)
+    family, index = cogdb.eddn.route_msg(msg, workers)
+
+    assert family == 'journal'
+    assert 0 <= index < 4
+    assert cogdb.eddn.route_msg(msg, workers) == (family, index)
+    assert cogdb.eddn.route_msg(msg, {'journal': 1}) == ('journal', 0)
+    assert cogdb.eddn.route_msg(msg, {'market': 2}) is None
+    # Market schemas are not enabled in SCHEMA_MAP
+    assert cogdb.eddn.route_msg(EXAMPLE_COMMODITY, workers) is None
+
+
+def test_forward_msg(monkeypatch):
+    class FakePush():
+        def __init__(self, full=False):
+            self.full = full
+            self.sent = []
+
+        def send(self, payload, flags=0):
+            if self.full:
+                raise zmq.Again()
+            self.sent += [payload]
+
+    class FakeCapture():
+        def __init__(self):
+            self.payloads = []
+
+        def write_payload(self, payload):
+            self.payloads += [payload]
+
+    monkeypatch.setattr(cogdb.eddn, 'msg_is_wanted', lambda msg: True)
+    monkeypatch.setitem(cogdb.eddn.LOGS, 'all', FakeCapture())
+    workers = {'journal': 1}
+    pushes = {('journal', 0): FakePush()}
+    dropped = collections.Counter()
+    payload = zlib.compress(EXAMPLE_JOURNAL_STATION.encode())
+
+    cogdb.eddn.forward_msg(payload, pushes, workers, dropped)
+    assert pushes[('journal', 0)].sent == [payload]
+    assert cogdb.eddn.LOGS['all'].payloads == [payload]
+
+    # Worker behind, message dropped without blocking
+    pushes[('journal', 0)].full = True
+    cogdb.eddn.forward_msg(payload, pushes, workers, dropped)
+    assert dropped == {('journal', 0): 1}
+
+
+def test_forward_msg_skipped(monkeypatch):
+    class FakeReporter():
+        def __init__(self):
+            self.skipped = []
+
+        def report(self, msg, *, skipped=False):
+            self.skipped += [msg['$schemaRef']] if skipped else []
+
+    class FullPush():
+        def send(self, payload, flags=0):
+            raise zmq.Again()
+
+    class NullCapture():
+        def write_payload(self, payload):
+            pass
+
+    monkeypatch.setattr(cogdb.eddn, 'msg_is_wanted', lambda msg: True)
+    monkeypatch.setitem(cogdb.eddn.LOGS, 'all', NullCapture())
+    reporter = FakeReporter()
+    msg = json.loads(EXAMPLE_JOURNAL_STATION)
+    unrouted = dict(msg, **{'$schemaRef': 'https://eddn.edcd.io/schemas/notAnEDDNSchema/1'})
+
+    # Unknown schema and a worker behind are both reported, the replay tool expects every message
+    workers, pushes = {'journal': 1}, {('journal', 0): FullPush()}
+    for payload in (json.dumps(unrouted), EXAMPLE_JOURNAL_STATION):
+        cogdb.eddn.forward_msg(zlib.compress(payload.encode()), pushes, workers, collections.Counter(), reporter)
+    assert reporter.skipped == [unrouted['$schemaRef'], msg['$schemaRef']]
+
+
+def test_worker_addr():
+    assert cogdb.eddn.worker_addr('journal', 1) == f"ipc://{cogdb.eddn.WORKER_SOCKETS}/journal_1"
+
+
 class MsgParserImpl(cogdb.eddn.MsgParser):
     """
     Used to test shared code in MsgParser base.
@@ -961,6 +1056,33 @@ class TestEDMCJournal:
         assert parser.flushed[2].is_controlling_faction
         assert parser.flushed[2].happiness_id == 2
 
+    def test_flush_influences_to_db_states(self, eddb_session, mapped):
+        msg = json.loads(EXAMPLE_JOURNAL_STATION)
+        parser = cogdb.eddn.create_parser(msg)
+        parser.parse_system()
+        parser.parse_factions()
+        parser.parse_influence()
+        parser.flush_influences_to_db()
+        parser.eddb_session.commit()
+
+        system_id = mapped['systems']['Ahemakino']
+        faction_id = mapped['factions']['Udegobo Silver Power Int']
+        states = eddb_session.query(cogdb.eddb.FactionActiveState).\
+            filter(cogdb.eddb.FactionActiveState.system_id == system_id,
+                   cogdb.eddb.FactionActiveState.faction_id == faction_id).\
+            all()
+        assert [x.state_id for x in states] == [cogdb.eddn.MAPS['FactionState']['War']]
+        assert len(eddb_session.query(cogdb.eddb.Influence).
+                   filter(cogdb.eddb.Influence.system_id == system_id).
+                   all()) == len(msg['message']['Factions'])
+
+    def test_group_by_keys(self):
+        rows = [{'a': 1, 'b': 2}, {'b': 3, 'a': 4}, {'a': 5}]
+        assert cogdb.eddn.group_by_keys(rows) == {
+            ('a', 'b'): [{'a': 1, 'b': 2}, {'b': 3, 'a': 4}],
+            ('a',): [{'a': 5}],
+        }
+
     def test_parse_conflicts(self, mapped):
         expect = [{
             'faction1_days': 1,
@@ -999,6 +1121,95 @@ class TestEDMCJournal:
         assert parser.flushed[1].faction2_id == mapped['factions']['Revolutionary Mpalans Confederation']
 
 
+def test_snapshot_fingerprint():
+    body = json.loads(EXAMPLE_JOURNAL_STATION)['message']
+    fingerprint = cogdb.eddn.snapshot_fingerprint(body)
+
+    other = json.loads(EXAMPLE_JOURNAL_STATION)['message']
+    other['timestamp'] = "2020-08-03T12:04:11Z"
+    other['Factions'] = list(reversed(other['Factions']))
+    for faction in other['Factions']:
+        faction['MyReputation'] = 100.0
+    assert fingerprint == cogdb.eddn.snapshot_fingerprint(other)
+
+    other['Factions'][0]['Influence'] += 0.01
+    assert fingerprint != cogdb.eddn.snapshot_fingerprint(other)
+
+
+def test_snapshot_cache_duplicate():
+    cache = cogdb.eddn.SnapshotCache(size=2)
+    assert not cache.is_duplicate('Rana', 'aaa')
+
+    cache.applied('Rana', 'aaa')
+    assert cache.is_duplicate('Rana', 'aaa')
+    assert not cache.is_duplicate('Rana', 'bbb')
+
+    cache.applied('Sol', 'ccc')
+    cache.applied('Nanomam', 'ddd')
+    assert len(cache) == 2
+    assert not cache.is_duplicate('Rana', 'aaa')
+
+    cache.ttl = 0
+    assert not cache.is_duplicate('Sol', 'ccc')
+
+
+def test_snapshot_cache_should_flush():
+    cache = cogdb.eddn.SnapshotCache(flush_size=2, flush_delay=600)
+    assert not cache.should_flush()
+
+    cache.bump(1, 100)
+    cache.bump(1, 90)
+    assert cache.pending == {1: 100}
+    assert not cache.should_flush()
+
+    cache.bump(2, 100)
+    assert cache.should_flush()
+
+    cache.clear()
+    cache.bump(1, 100)
+    cache.flush_delay = 0
+    assert cache.should_flush()
+
+
+def test_snapshot_cache_flush(eddb_session, mapped):
+    system_id = mapped['systems']['Ahemakino']
+    system = eddb_session.query(cogdb.eddb.System).filter(cogdb.eddb.System.id == system_id).one()
+    old_updated_at = system.updated_at
+    future = old_updated_at + 1000
+
+    try:
+        cache = cogdb.eddn.SnapshotCache()
+        cache.bump(system_id, future)
+        assert cache.flush(eddb_session) == 1
+        assert not cache.pending
+
+        eddb_session.expire_all()
+        assert system.updated_at == future
+    finally:
+        system.updated_at = old_updated_at
+        eddb_session.commit()
+
+
+def test_journal_duplicate_snapshot(mapped):
+    msg = json.loads(EXAMPLE_JOURNAL_STATION)
+    for key in [x for x in msg['message'] if x.startswith('Station')]:
+        del msg['message'][key]
+    cogdb.eddn.SNAPSHOTS.clear()
+
+    try:
+        parser = cogdb.eddn.create_parser(msg)
+        parser.parse_msg()
+        parser.update_database()
+        assert parser.fingerprint
+
+        parser = cogdb.eddn.create_parser(msg)
+        with pytest.raises(cogdb.eddn.SkipDatabaseFlush):
+            parser.parse_msg()
+        assert cogdb.eddn.SNAPSHOTS.pending == {mapped['systems']['Ahemakino']: 1596452651}
+    finally:
+        cogdb.eddn.SNAPSHOTS.clear()
+
+
 class TestCommodityV3:
     """
     Test all related methods of the comodity parser
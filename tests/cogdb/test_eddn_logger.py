@@ -4,8 +4,13 @@ Tests for cogdb.eddn_logger
 import pathlib
 import shutil
 import tempfile
+import zlib
 
 import pytest
+try:
+    import rapidjson as json
+except ImportError:
+    import json
 
 import cogdb.eddn_logger as elog
 
@@ -92,6 +97,81 @@ def test_eddnlog_keep_n():
         shutil.rmtree(tempd)
 
 
+def test_eddncapture_write_msg():
+    tempd = pathlib.Path(tempfile.mkdtemp())
+    try:
+        capture = elog.EDDNCapture(folder=tempd)
+        assert capture.write_msg(FAKE_MSG)
+        assert capture.write_payload(zlib.compress(json.dumps(FAKE_MSG_NOTSTAMP).encode()))
+        capture.close()
+
+        assert len(elog.list_segments(tempd)) == 1
+        assert list(elog.read_captures(tempd)) == [FAKE_MSG, FAKE_MSG_NOTSTAMP]
+    finally:
+        shutil.rmtree(tempd)
+
+
+def test_eddncapture_disabled():
+    tempd = pathlib.Path(tempfile.mkdtemp())
+    try:
+        capture = elog.EDDNCapture(folder=tempd, disabled=True)
+        assert not capture.write_msg(FAKE_MSG)
+        capture.close()
+
+        assert not elog.list_segments(tempd)
+    finally:
+        shutil.rmtree(tempd)
+
+
+def test_eddncapture_rotate():
+    tempd = pathlib.Path(tempfile.mkdtemp())
+    try:
+        capture = elog.EDDNCapture(folder=tempd, segment_size=1, keep_segments=2)
+        for _ in range(5):
+            capture.write_msg(FAKE_MSG)
+        capture.close()
+
+        assert [x.name for x in elog.list_segments(tempd)] == ['segment_000003.eddn', 'segment_000004.eddn']
+        assert len(list(elog.read_captures(tempd))) == 2
+
+        # Resumes numbering after existing segments
+        capture = elog.EDDNCapture(folder=tempd)
+        assert capture.segment_num == 5
+        capture.close()
+    finally:
+        shutil.rmtree(tempd)
+
+
+def test_read_segment_truncated():
+    tempd = pathlib.Path(tempfile.mkdtemp())
+    try:
+        capture = elog.EDDNCapture(folder=tempd)
+        capture.write_msg(FAKE_MSG)
+        capture.close()
+
+        segment = elog.list_segments(tempd)[0]
+        with open(segment, 'ab') as fout:
+            fout.write(elog.RECORD_HEADER.pack(100) + b'partial')
+        assert list(elog.read_captures(segment)) == [FAKE_MSG]
+    finally:
+        shutil.rmtree(tempd)
+
+
+def test_main_reader(capsys):
+    tempd = pathlib.Path(tempfile.mkdtemp())
+    try:
+        capture = elog.EDDNCapture(folder=tempd)
+        capture.write_msg(FAKE_MSG)
+        capture.write_msg(FAKE_MSG_NOTSTAMP)
+        capture.close()
+
+        elog.main([str(tempd), '--last', '1', '--compact', '--schema', 'journal'])
+        out = capsys.readouterr().out
+        assert json.loads(out) == FAKE_MSG_NOTSTAMP
+    finally:
+        shutil.rmtree(tempd)
+
+
 FAKE_MSG = {
     '$schemaRef': 'https://eddn.edcd.io/schemas/journal/1',
     'header': {
@@ -0,0 +1,176 @@
+# pylint: disable=redefined-outer-name,missing-function-docstring,unused-argument
+"""
+Tests for cogdb.eddn_replay
+"""
+import pathlib
+import pprint
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+
+import pytest
+import sqlalchemy as sqla
+import zmq
+try:
+    import rapidjson as json
+except ImportError:
+    import json
+
+import cogdb.eddn_logger
+import cogdb.eddn_replay as replay
+import cogdb.eddn_stats
+
+MSGS = [
+    {
+        '$schemaRef': 'https://eddn.edcd.io/schemas/journal/1',
+        'header': {'gatewayTimestamp': '2023-09-18T17:18:30.000000Z', 'softwareName': 'EDDI'},
+        'message': {'event': 'FSDJump'},
+    },
+    {
+        '$schemaRef': 'https://eddn.edcd.io/schemas/commodity/3',
+        'header': {'gatewayTimestamp': '2023-09-18T17:18:32.000000Z', 'softwareName': 'EDMC'},
+        'message': {'commodities': []},
+    },
+    {
+        '$schemaRef': 'https://eddn.edcd.io/schemas/journal/1',
+        'header': {'gatewayTimestamp': '2023-09-18T17:28:32.000000Z', 'softwareName': 'EDDI'},
+        'message': {'event': 'Location'},
+    },
+]
+
+
+@pytest.fixture
+def f_work_dir():
+    work_dir = pathlib.Path(tempfile.mkdtemp(suffix='replay'))
+    yield work_dir
+    shutil.rmtree(work_dir)
+
+
+def test_load_json_captures(f_work_dir):
+    fname = f_work_dir / 'array.json'
+    with open(fname, 'w', encoding='utf-8') as fout:
+        json.dump(MSGS, fout)
+    assert replay.load_json_captures(fname) == MSGS
+
+    # Format of extras/eddn_capture.py, pretty printed and unterminated
+    fname = f_work_dir / 'journal.json'
+    with open(fname, 'w', encoding='utf-8') as fout:
+        fout.write('[\n' + ''.join(json.dumps(x, indent=2) + ',' for x in MSGS))
+    assert replay.load_json_captures(fname) == MSGS
+
+    fname = f_work_dir / 'journal.jsonl'
+    with open(fname, 'w', encoding='utf-8') as fout:
+        fout.write('\n'.join(json.dumps(x) for x in MSGS) + '\n')
+    assert replay.load_json_captures(fname) == MSGS
+
+
+def test_load_captures_seed():
+    msgs = replay.load_captures(replay.SEED_CORPUS)
+    assert len(msgs) > 100
+    assert all('$schemaRef' in x for x in msgs)
+
+
+def test_load_captures_formats(f_work_dir):
+    capture = cogdb.eddn_logger.EDDNCapture(folder=f_work_dir / 'capture')
+    for msg in MSGS:
+        capture.write_msg(msg)
+    capture.close()
+    assert replay.load_captures(f_work_dir / 'capture') == MSGS
+    assert replay.load_captures(cogdb.eddn_logger.list_segments(f_work_dir / 'capture')[0]) == MSGS
+
+    # Format of EDDNLogger
+    fname = f_work_dir / '000_journal_1_TIMESTAMP_EDDI'
+    with open(fname, 'w', encoding='utf-8') as fout:
+        pprint.pprint(MSGS[0], stream=fout)
+    assert replay.load_captures(fname) == MSGS[:1]
+
+
+def test_msg_schema():
+    assert cogdb.eddn_stats.msg_schema(MSGS[0]) == 'journal/1'
+    assert cogdb.eddn_stats.msg_schema({}) == 'unknown'
+
+
+def test_schedule():
+    assert replay.schedule(MSGS, rate=1) == [0.0, 1.0, 1.0]
+    assert replay.schedule(MSGS, rate=2, max_gap=5) == [0.0, 1.0, 2.5]
+    assert replay.schedule(MSGS, rate=0) == [0.0, 0.0, 0.0]
+
+
+def test_stamp_msg():
+    payload = replay.stamp_msg(MSGS[0], now=1695057512.5)
+    msg = json.loads(zlib.decompress(payload))
+
+    assert msg['header']['gatewayTimestamp'] == '2023-09-18T17:18:32.500000Z'
+    assert msg['header'][cogdb.eddn_stats.REPLAY_KEY] == 1695057512.5
+    assert msg['message'] == MSGS[0]['message']
+    assert cogdb.eddn_stats.REPLAY_KEY not in MSGS[0]['header']
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert replay.percentile(values, 50) == 50
+    assert replay.percentile(values, 99) == 99
+    assert replay.percentile(values, 0) == 1
+    assert replay.percentile([], 50) == 0
+
+
+def test_summarize():
+    records = [
+        {'schema': 'journal/1', 'sent': 10.0, 'done': 10.1, 'queries': 4},
+        {'schema': 'journal/1', 'sent': 10.5, 'done': 10.8, 'queries': 6},
+        {'schema': 'commodity/3', 'sent': 11.0, 'done': 12.1, 'queries': 1},
+        {'schema': 'unknown/1', 'sent': 11.5, 'done': 11.6, 'queries': 0, 'skipped': True},
+    ]
+    summary = replay.summarize(records, sent=4, elapsed=2, backlog=[(0, 1), (1, 2), (2, 3)])
+
+    assert summary['sent_per_second'] == 2.0
+    assert summary['handled'] == 3
+    assert summary['skipped'] == 1
+    assert 'unknown/1' not in summary['schemas']
+    assert summary['handled_per_second'] == 1.5
+    assert summary['backlog_max'] == 3
+    assert summary['backlog_growth_per_second'] == 1.0
+    assert summary['schemas']['journal/1'] == {
+        'count': 2, 'queries_per_msg': 5.0, 'p50_ms': 100.0, 'p90_ms': 300.0, 'p99_ms': 300.0,
+    }
+    assert 'commodity/3' in replay.format_summary(summary)
+
+
+def test_replay_reports(monkeypatch):
+    monkeypatch.setattr(replay, 'SUBSCRIBE_WAIT', 0.5)
+    addr, stats_addr = 'tcp://127.0.0.1:19600', 'tcp://127.0.0.1:19601'
+    engine = sqla.create_engine('sqlite://')
+    collector = replay.StatsCollector(stats_addr)
+    reporter = cogdb.eddn_stats.StatsReporter(stats_addr, [engine])
+
+    def listener():
+        sub = zmq.Context.instance().socket(zmq.SUB)
+        sub.setsockopt(zmq.SUBSCRIBE, b'')
+        sub.setsockopt(zmq.RCVTIMEO, 5000)
+        sub.connect(addr)
+        try:
+            for _ in MSGS:
+                msg = json.loads(zlib.decompress(sub.recv()))
+                with engine.connect() as conn:
+                    conn.execute(sqla.text('SELECT 1'))
+                reporter.report(msg)
+        finally:
+            sub.close(linger=0)
+
+    thread = threading.Thread(target=listener)
+    thread.start()
+    try:
+        sent, _ = replay.replay(MSGS, addr=addr, rate=0, duration=30, limit=len(MSGS), collector=collector)
+        thread.join()
+        time.sleep(0.5)
+    finally:
+        reporter.close()
+        collector.close()
+
+    assert sent == 3
+    assert len(collector.records) == 3
+    assert [x['schema'] for x in collector.records] == ['journal/1', 'commodity/3', 'journal/1']
+    assert collector.records[0]['queries'] == 1
+    assert collector.records[0]['done'] >= collector.records[0]['sent']
@@ -3,6 +3,7 @@
 Test cogdb.query module.
 """
 import datetime
+import time
 import sqlalchemy.orm.exc
 import mock
 import pytest
@@ -11,7 +12,7 @@ import cog.exc
 import cogdb
 from cogdb.schema import (DiscordUser, FortSystem, FortUser, FortOrder,
                           UMUser, UMSystem, UMHold, EUMSheet, AdminPerm, ChannelPerm, RolePerm,
-                          KOS, TrackSystem, TrackSystemCached, TrackByID,
+                          KOS, InaraCache, TrackSystem, TrackSystemCached, TrackByID,
                           Vote, EVoteType, SheetRecord)
 import cogdb.query
 
@@ -542,6 +543,40 @@ def test_kos_add_cmdr(session, f_kos):
     assert results[-1].reason == 'A reason'
 
 
+def test_inara_cache(session, db_cleanup):
+    with pytest.raises(cog.exc.NoMatch):
+        cogdb.query.inara_cache_get(session, 'profile', 'GearsandCogs')
+
+    cogdb.query.inara_cache_put(session, 'profile', 'GearsandCogs', {'userName': 'GearsandCogs'})
+    cogdb.query.inara_cache_put(session, 'profile', 'Nobody', None)
+    session.commit()
+    assert cogdb.query.inara_cache_get(session, 'profile', 'gearsandcogs') == {'userName': 'GearsandCogs'}
+    assert cogdb.query.inara_cache_get(session, 'profile', 'nobody') is None
+    assert session.query(InaraCache).count() == 2
+
+    # Negative results expire before found ones
+    later = time.time() + cogdb.schema.inara_cache.INARA_CACHE_NEGATIVE_TTL + 1
+    assert cogdb.query.inara_cache_get(session, 'profile', 'gearsandcogs', now=later)
+    with pytest.raises(cog.exc.NoMatch):
+        cogdb.query.inara_cache_get(session, 'profile', 'nobody', now=later)
+
+
+def test_inara_cache_get_many(session, db_cleanup):
+    assert cogdb.query.inara_cache_get_many(session, 'profile', []) == {}
+
+    cogdb.query.inara_cache_put(session, 'profile', 'GearsandCogs', {'userName': 'GearsandCogs'})
+    cogdb.query.inara_cache_put(session, 'profile', 'Nobody', None)
+    cogdb.query.inara_cache_put(session, 'squad', 'Missing', {'squad': 'Missing'})
+    session.commit()
+
+    found = cogdb.query.inara_cache_get_many(session, 'profile', ['gearsAndCogs', 'Nobody', 'Missing'])
+    assert found == {'gearsAndCogs': {'userName': 'GearsandCogs'}, 'Nobody': None}
+
+    later = time.time() + cogdb.schema.inara_cache.INARA_CACHE_NEGATIVE_TTL + 1
+    assert list(cogdb.query.inara_cache_get_many(session, 'profile', ['GearsandCogs', 'Nobody'], now=later)) == \
+        ['GearsandCogs']
+
+
 def test_track_add_systems(session, f_track_testbed):
     system_name = "Kappa"
     cogdb.query.track_add_systems(session, [system_name], distance=20)
@@ -804,6 +839,14 @@ def test_get_consolidation_in_range_both(session, f_cons_data):
     assert [x.amount for x in values] == [67, 65, 64]
 
 
+def test_get_consolidation_marker(session, f_cons_data):
+    assert cogdb.query.get_consolidation_marker(session) == max(x.id for x in f_cons_data)
+
+    session.query(cogdb.schema.Consolidation).delete()
+    session.commit()
+    assert cogdb.query.get_consolidation_marker(session) == 0
+
+
 def test_fort_response_normal(session, f_dusers, f_fort_testbed, eddb_session):
     expect = """__Active Targets__
 Prep: **Rhea** 5100/10000 :Fortifying: Atropos - 65.55Ly
@@ -3,6 +3,8 @@
 Test remote queries to sidewinder's db.
 """
 import datetime
+import time
+
 import pytest
 
 from sqlalchemy.sql import text as sql_text
@@ -121,6 +123,35 @@ def test_dash_overview(side_session):
     assert abi_control.id in [2473, 2474, 2475, 2476, 23290, 24164, 49170, 76877]
 
 
+def test_tick_cache(side_session):
+    cogdb.side.TICK_CACHE.clear()
+    try:
+        control, *_ = cogdb.side.dash_overview(side_session, 'Abi')
+        side_session.close()
+        assert control.name == "Abi"
+
+        (result, expires), = cogdb.side.TICK_CACHE.entries.values()
+        assert result[0] is control
+        assert time.time() < expires <= time.time() + cogdb.side.TICK_CACHE_MAX_AGE
+        assert cogdb.side.dash_overview(side_session, 'Abi') is result
+    finally:
+        cogdb.side.TICK_CACHE.clear()
+
+
+def test_tick_cache_stale_fallback(side_session):
+    def query(_, fail):
+        if fail:
+            raise cog.exc.RemoteError("Lost connection to Sidewinder's DB.")
+        return ['result']
+
+    cache = cogdb.side.TickCache()
+    result = cache.get(('query',), query, side_session, (False,), {})
+    cache.entries[('query',)] = (result, 0)  # Expired long ago, queried again
+    assert cache.get(('query',), query, side_session, (True,), {}) is result
+    with pytest.raises(cog.exc.RemoteError):
+        cache.get(('other',), query, side_session, (True,), {})
+
+
 def test_find_favorable(side_session):
     matches = cogdb.side.find_favorable(side_session, 'Nurundere')
     assert matches[1][-1] == "Monarchy of Orisala"
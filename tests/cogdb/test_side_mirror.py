@@ -0,0 +1,67 @@
+# pylint: disable=redefined-outer-name,missing-function-docstring,unused-argument
+"""
+Tests for cogdb.side.mirror
+"""
+import time
+
+import pytest
+import sqlalchemy as sqla
+
+import cogdb
+import cogdb.side.mirror as mirror
+from cogdb.side import BGSTick, System
+
+
+@pytest.fixture
+def mirror_session():
+    mirror.create_mirror()
+    with cogdb.session_scope(cogdb.SideMirrorSession) as mirror_session:
+        yield mirror_session
+        for cls, _ in mirror.INCREMENTAL_TABLES + mirror.FULL_TABLES:
+            mirror_session.execute(cls.__table__.delete())
+        mirror_session.execute(mirror.SideMirrorSync.__table__.delete())
+        mirror_session.commit()
+
+
+def test_mirror_metadata():
+    metadata = mirror.mirror_metadata()
+
+    assert 'influence' in metadata.tables
+    assert 'side_mirror_sync' in metadata.tables
+    assert not any(table.foreign_keys for table in metadata.tables.values())
+    assert metadata.tables['factions'].c.name.index
+
+
+def test_session_maker(monkeypatch):
+    monkeypatch.setitem(mirror.MIRROR_STATE, 'synced_at', 0)
+    assert mirror.session_maker() is cogdb.SideSession
+
+    monkeypatch.setitem(mirror.MIRROR_STATE, 'synced_at', time.time())
+    assert mirror.session_maker() is cogdb.SideMirrorSession
+
+
+def test_sync_incremental(side_session, mirror_session):
+    expected = side_session.query(BGSTick).count()
+    last = side_session.query(sqla.func.max(BGSTick.unix_from)).scalar()
+
+    count, watermark = mirror.sync_incremental(side_session, mirror_session, BGSTick, 'unix_from')
+    assert count == expected
+    assert watermark == last
+    assert mirror_session.query(BGSTick).count() == expected
+
+    count, _ = mirror.sync_incremental(side_session, mirror_session, BGSTick, 'unix_from', watermark=watermark)
+    assert count == side_session.query(BGSTick).\
+        filter(BGSTick.unix_from >= watermark - mirror.SIDE_MIRROR_OVERLAP).\
+        count()
+
+
+def test_sync_table(side_session, mirror_session):
+    state = mirror.SideMirrorSync(name=System.__tablename__, watermark=0, synced_at=0)
+
+    count = mirror.sync_table(side_session, mirror_session, state)
+    assert count == side_session.query(System).count()
+    assert mirror_session.query(System).count() == count
+    assert state.synced_at
+
+    assert mirror.sync_table(side_session, mirror_session, state) is None
+    assert mirror.sync_table(side_session, mirror_session, state, full=True) == count
@@ -615,3 +615,82 @@ def test_write_station_cache():
     assert path.exists()
     with path.open(mode='r', encoding='utf-8') as fin:
         assert fin.read() == expect_station
+
+
+@pytest.fixture
+def f_name_map():
+    work_dir = tempfile.mkdtemp(suffix='ids')
+    map_fname = os.path.join(work_dir, 'factionMap.json')
+    with open(map_fname, 'w', encoding='utf-8') as fout:
+        json.dump({'First': 1, 'Second': 2}, fout)
+
+    yield map_fname
+    shutil.rmtree(work_dir)
+
+
+def new_name_cache(map_fname):
+    known, position = cogdb.spansh.load_name_map(map_fname)
+    return {'known': known, 'next_id': max(known.values()) + 1, 'journal': position}
+
+
+def test_allocate_name_ids(f_name_map):
+    cache = new_name_cache(f_name_map)
+    other = new_name_cache(f_name_map)
+
+    assert cogdb.spansh.allocate_name_ids(['First', 'Third', None], map_fname=f_name_map, cache=cache) == {'Third': 3}
+    # Other process syncs with the journal before allocating
+    assert cogdb.spansh.allocate_name_ids(['Third', 'Fourth'], map_fname=f_name_map, cache=other) == {'Fourth': 4}
+    assert other['known']['Third'] == 3
+
+    # Map itself untouched, assignments only appended
+    with open(f_name_map, 'r', encoding='utf-8') as fin:
+        assert json.load(fin) == {'First': 1, 'Second': 2}
+    assert cogdb.spansh.load_name_map(f_name_map)[0] == {'First': 1, 'Second': 2, 'Third': 3, 'Fourth': 4}
+
+
+def test_read_map_journal(f_name_map):
+    assert cogdb.spansh.read_map_journal(f_name_map) == ({}, (None, 0))
+
+    cache = new_name_cache(f_name_map)
+    cogdb.spansh.allocate_name_ids(['Third'], map_fname=f_name_map, cache=cache)
+    entries, position = cogdb.spansh.read_map_journal(f_name_map)
+    assert entries == {'Third': 3}
+    assert position == cache['journal']
+
+    # Interrupted writer leaves a partial line, it is ignored then dropped by next writer
+    with open(f_name_map + cogdb.spansh.JOURNAL_SUFFIX, 'ab') as fout:
+        fout.write(b'["Fourth", 4')
+    assert cogdb.spansh.read_map_journal(f_name_map, position) == ({}, position)
+    cogdb.spansh.allocate_name_ids(['Fifth'], map_fname=f_name_map, cache=cache)
+    assert cogdb.spansh.read_map_journal(f_name_map, position)[0] == {'Fifth': 4}
+
+
+def test_compact_name_map(f_name_map):
+    cache = new_name_cache(f_name_map)
+    other = new_name_cache(f_name_map)
+    cogdb.spansh.allocate_name_ids(['Third'], map_fname=f_name_map, cache=cache)
+
+    assert cogdb.spansh.compact_name_map(f_name_map) == {'First': 1, 'Second': 2, 'Third': 3}
+    with open(f_name_map, 'r', encoding='utf-8') as fin:
+        assert json.load(fin) == {'First': 1, 'Second': 2, 'Third': 3}
+    assert cogdb.spansh.read_map_journal(f_name_map)[0] == {}
+
+    # A cache that missed the assignment before compaction still never reuses the id
+    assert cogdb.spansh.allocate_name_ids(['Fourth'], map_fname=f_name_map, cache=other) == {'Fourth': 4}
+
+
+def test_allocate_name_ids_compact_carriers(f_name_map):
+    carrier_fname = os.path.join(os.path.dirname(f_name_map), 'carrierMap.json')
+    with open(carrier_fname, 'w', encoding='utf-8') as fout:
+        json.dump({'AAA-111': 10}, fout)
+    cache = new_name_cache(f_name_map)
+
+    with patch('cogdb.spansh.JOURNAL_COMPACT_SIZE', 10):
+        added = cogdb.spansh.allocate_name_ids(['Third', 'K7Q-BQL'], map_fname=f_name_map,
+                                               cache=cache, carrier_fname=carrier_fname)
+    assert added == {'Third': 3, 'K7Q-BQL': 4}
+
+    # Journal was folded, carriers assigned survive in the carrier map
+    assert cogdb.spansh.read_map_journal(f_name_map)[0] == {}
+    with open(carrier_fname, 'r', encoding='utf-8') as fin:
+        assert json.load(fin) == {'AAA-111': 10, 'K7Q-BQL': 4}
@@ -2,18 +2,23 @@
 """
 Tests for cogdb.spy
 """
+import asyncio
+import json
 import os
 import pathlib
+import shutil
+import tempfile
 import time
 
 import pytest
 import sqlalchemy as sqla
 
+import cog.exc
 import cogdb.spy_squirrel as spy
 from cogdb.schema import FortSystem, UMSystem
 from cogdb.spy_squirrel import load_json_secret
 from tests.conftest import GITHUB_FAIL
-from cogdb.eddb import Ship
+from cogdb.eddb import Influence, Ship
 
 
 FIXED_TIMESTAMP = 1662390092
@@ -349,6 +354,14 @@ def test_fetch_load_secret():
     assert base_json
 
 
+def test_add_system_names(eddb_session):
+    rows = [{'ed_system_id': 10477373803, 'merits': 1}, {'ed_system_id': 1, 'merits': 2}]
+    expect = eddb_session.query(spy.System).filter(spy.System.ed_system_id == 10477373803).one().name
+
+    named = spy.add_system_names(eddb_session, rows)
+    assert named == [{'ed_system_id': 10477373803, 'merits': 1, 'system_name': expect}]
+
+
 def test_load_base_json(empty_spy, base_json, eddb_session):
     # Manually insert to test update paths
     eddb_session.add(
@@ -395,6 +408,48 @@ def test_load_refined_json(empty_spy, base_json, refined_json, eddb_session):
         one()
 
 
+def test_spy_snapshots_diff():
+    snapshots = spy.SpySnapshots()
+    tables = {
+        'systems': [
+            {'ed_system_id': 1, 'power_id': 9, 'fort': 10, 'um': 0, 'updated_at': 1},
+            {'ed_system_id': 2, 'power_id': 9, 'fort': 0, 'um': 0, 'updated_at': 1},
+        ],
+        'votes': [{'power_id': 11, 'vote': 50, 'updated_at': 1}],
+    }
+    assert snapshots.diff(tables) == tables
+    snapshots.commit('refined.json', {'validators': {}, 'digest': 'abc'}, tables, skipped={2})
+
+    tables = {
+        'systems': [
+            {'ed_system_id': 1, 'power_id': 9, 'fort': 10, 'um': 0, 'updated_at': 2},
+            {'ed_system_id': 2, 'power_id': 9, 'fort': 0, 'um': 0, 'updated_at': 2},
+            {'ed_system_id': 3, 'power_id': 6, 'fort': 5, 'um': 0, 'updated_at': 2},
+        ],
+        'votes': [{'power_id': 11, 'vote': 51, 'updated_at': 2}],
+    }
+    changed = snapshots.diff(tables)
+    assert changed == {'systems': tables['systems'][1:], 'votes': tables['votes']}
+    assert snapshots.unchanged(tables, changed) == {'systems': tables['systems'][:1], 'votes': []}
+    assert spy.snapshot_power_ids(changed) == {6, 9, 11}
+    assert snapshots.digests == {'refined.json': 'abc'}
+
+
+def test_touch_snapshot(spy_test_bed, eddb_session):
+    spy.touch_snapshot({
+        'systems': [{'ed_system_id': 10477373803, 'power_id': 9, 'fort': 4000, 'updated_at': FIXED_TIMESTAMP + 100}],
+        'votes': [{'power_id': 1, 'vote': 88, 'updated_at': FIXED_TIMESTAMP + 200}],
+        'base': [{'ed_system_id': 10477373803, 'power_id': 9, 'income': 122}],
+    })
+
+    system = eddb_session.query(spy.SpySystem).filter(spy.SpySystem.ed_system_id == 10477373803).one()
+    assert system.updated_at == FIXED_TIMESTAMP + 100
+    assert system.fort == 4000
+    votes = {x.power_id: x.updated_at for x in eddb_session.query(spy.SpyVote)}
+    assert votes[1] == FIXED_TIMESTAMP + 200
+    assert votes[9] == FIXED_TIMESTAMP
+
+
 # Combined test of base then refined
 def test_load_base_and_refined_json(empty_spy, base_json, refined_json, eddb_session):
     spy.load_base_json(base_json)
@@ -572,6 +627,18 @@ def test_load_response_json(empty_spy, response_json, eddb_session):
     assert eddb_session.query(spy.SpyTraffic).all()
 
 
+def test_load_response_json_influences(empty_spy, response_json, eddb_session):
+    now = time.time()
+    eddb_session.close()
+    influence_ids = spy.load_response_json(response_json)
+
+    assert influence_ids
+    assert len(influence_ids) == len(set(influence_ids))
+    influences = eddb_session.query(Influence).filter(Influence.id.in_(influence_ids)).all()
+    assert len(influences) == len(influence_ids)
+    assert all(x.updated_at >= int(now) for x in influences)
+
+
 def test_compare_sheet_fort_systems_to_spy(empty_spy, db_cleanup, session, eddb_session):
     # Manually setup test case where spy > fort systems
     f_status = 4444
@@ -652,3 +719,104 @@ async def test_service_status(spy_test_bed, eddb_session):
 
 def test_convert_json_date():
     assert spy.convert_json_date("7 OCT 3308") == 1665100800.0
+
+
+@pytest.fixture
+def f_scraper():
+    work_dir = pathlib.Path(tempfile.mkdtemp(suffix='scrape'))
+    scraper = spy.ScrapeScheduler(work_dir / 'queue.json', rate=1000, burst=10, concurrency=2)
+    scraper.scraped = []
+    scraper.active = [0, 0]  # Current and max in flight
+
+    async def fake_scrape(entry):
+        scraper.active[0] += 1
+        scraper.active[1] = max(scraper.active)
+        await asyncio.sleep(0.01)
+        scraper.active[0] -= 1
+        if entry['name'] == 'Down':
+            raise cog.exc.RemoteError('Down')
+        if entry['name'] == 'Bad':
+            raise ValueError('Bad response')
+        scraper.scraped += [entry['name']]
+        return [entry['ed_system_id']]
+
+    scraper.scrape = fake_scrape
+    yield scraper
+    shutil.rmtree(work_dir)
+
+
+def scrape_entry(name, ed_system_id, held_updated_at):
+    return {'name': name, 'ed_system_id': ed_system_id, 'held_updated_at': held_updated_at}
+
+
+def test_scrape_entries(spy_test_bed, eddb_session):
+    systems = eddb_session.query(spy.System).filter(spy.System.name.in_(['Nanomam', 'Rana'])).order_by(spy.System.name).all()
+    entries = spy.scrape_entries(eddb_session, systems)
+
+    assert [x['name'] for x in entries] == ['Nanomam', 'Rana']
+    assert entries[0]['ed_system_id'] == systems[0].ed_system_id
+    assert all(x['held_updated_at'] >= 0 for x in entries)
+
+
+@pytest.mark.asyncio
+async def test_scrape_scheduler_stalest_first(f_scraper):
+    f_scraper.concurrency = 1
+    entries = [scrape_entry('Rana', 1, 300), scrape_entry('Sol', 2, 100), scrape_entry('Nanomam', 3, 200)]
+    results = await asyncio.gather(*f_scraper.add(entries))
+
+    assert results == [('Rana', [1]), ('Sol', [2]), ('Nanomam', [3])]
+    assert f_scraper.scraped == ['Sol', 'Nanomam', 'Rana']
+    assert not f_scraper.pending
+    with f_scraper.fname.open('r', encoding='utf-8') as fin:
+        assert json.load(fin) == []
+
+
+@pytest.mark.asyncio
+async def test_scrape_scheduler_concurrency(f_scraper):
+    entries = [scrape_entry(f'System {num}', num, num) for num in range(6)]
+    await asyncio.gather(*f_scraper.add(entries))
+
+    assert len(f_scraper.scraped) == 6
+    assert f_scraper.active[1] == 2
+
+
+@pytest.mark.asyncio
+async def test_scrape_scheduler_resume(f_scraper):
+    with f_scraper.fname.open('w', encoding='utf-8') as fout:
+        json.dump([scrape_entry('Rana', 1, 300), scrape_entry('Sol', 2, 100)], fout)
+    f_scraper.load()
+
+    await f_scraper.resume()
+    await asyncio.gather(*f_scraper.workers)
+    assert f_scraper.scraped == ['Sol', 'Rana']
+
+
+@pytest.mark.asyncio
+async def test_scrape_scheduler_remote_down(f_scraper):
+    f_scraper.concurrency = 1
+    futures = f_scraper.add([scrape_entry('Down', 1, 0), scrape_entry('Rana', 2, 100)])
+
+    with pytest.raises(cog.exc.RemoteError):
+        await asyncio.gather(*futures)
+    await asyncio.gather(*f_scraper.workers)
+
+    # Entries remain queued to resume later
+    assert sorted(f_scraper.pending) == [1, 2]
+    with f_scraper.fname.open('r', encoding='utf-8') as fin:
+        assert len(json.load(fin)) == 2
+
+
+@pytest.mark.asyncio
+async def test_scrape_scheduler_entry_fails(f_scraper):
+    f_scraper.concurrency = 1
+    bad, good = f_scraper.add([scrape_entry('Bad', 1, 0), scrape_entry('Rana', 2, 100)])
+
+    with pytest.raises(ValueError):
+        await bad
+    assert await good == ('Rana', [2])
+    await asyncio.gather(*f_scraper.workers)
+
+    # Failed entry dropped, worker continued with the rest
+    assert not f_scraper.pending
+    with f_scraper.fname.open('r', encoding='utf-8') as fin:
+        assert json.load(fin) == []
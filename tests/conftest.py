@@ -32,7 +32,7 @@ import cogdb.query
 import cogdb.eddb
 from cogdb.eddb import (SModule, SModuleGroup, SModuleSold, SCommodity, SCommodityGroup, SCommodityPricing)
 from cogdb.schema import (DiscordUser, FortSystem, FortPrep, FortDrop, FortUser, FortOrder,
-                          UMSystem, UMExpand, UMOppose, UMUser, UMHold, EUMSheet, KOS,
+                          UMSystem, UMExpand, UMOppose, UMUser, UMHold, EUMSheet, KOS, InaraCache,
                           AdminPerm, ChannelPerm, RolePerm,
                           TrackSystem, TrackSystemCached, TrackByID,
                           Global, Vote, EVoteType,
@@ -133,7 +133,7 @@ def db_cleanup():
         cogdb.schema.empty_tables(session, perm=True)
 
         classes = [DiscordUser, FortUser, FortSystem, FortDrop, FortOrder, UMUser, UMSystem, UMHold,
-                   KOS, TrackSystem, TrackSystemCached, TrackByID, AdminPerm, ChannelPerm, RolePerm]
+                   KOS, InaraCache, TrackSystem, TrackSystemCached, TrackByID, AdminPerm, ChannelPerm, RolePerm]
         for cls in classes:
             assert session.query(cls).all() == []
 
@@ -76,25 +76,26 @@ async def test_cmd_help(f_bot, f_pvp_clean):
 For more information do: `!Command -h`
        Example: `!drop -h`
 
-``` Command  |                           Effect
---------- | ----------------------------------------------------------
-!admin    | The admininstrative commands
-!dist     | Determine the distance from the first system to all others
-!cmdr     | Setup and modify your cmdr settings.
-!donate   | Information on supporting the dev.
-!feedback | Give feedback or report a bug
-!help     | This help command.
-!log      | Show recent PVP events parsed
-!match    | Create and manage pvp matches.
-!near     | Find things near you.
-!privacy  | Display the privacy explanation.
-!repair   | Show the nearest orbitals with shipyards
-!route    | Plot the shortest route between these systems
-!stats    | PVP statistics for you or another CMDR
-!status   | Info about this bot
-!time     | Show game time and time to ticks
-!trigger  | Calculate fort and um triggers for systems
-!whois    | Search for commander on inara.cz```"""
+```  Command    |                           Effect
+------------ | ----------------------------------------------------------
+!admin       | The admininstrative commands
+!dist        | Determine the distance from the first system to all others
+!cmdr        | Setup and modify your cmdr settings.
+!donate      | Information on supporting the dev.
+!feedback    | Give feedback or report a bug
+!help        | This help command.
+!leaderboard | Rank CMDRs by kills, K/D, KOS kills or interdictions
+!log         | Show recent PVP events parsed
+!match       | Create and manage pvp matches.
+!near        | Find things near you.
+!privacy     | Display the privacy explanation.
+!repair      | Show the nearest orbitals with shipyards
+!route       | Plot the shortest route between these systems
+!stats       | PVP statistics for you or another CMDR
+!status      | Info about this bot
+!time        | Show game time and time to ticks
+!trigger     | Calculate fort and um triggers for systems
+!whois       | Search for commander on inara.cz```"""
 
     await action_map(msg, f_bot).execute()
 
@@ -353,6 +354,26 @@ async def test_cmd_privacy_version_selected(f_bot, f_pvp_testbed):
     assert expect in str(f_bot.send_message.call_args).replace("\\n", "\n")
 
 
+@pytest.mark.asyncio
+async def test_cmd_leaderboard(f_bot, f_pvp_testbed):
+    msg = fake_msg_gears("!leaderboard --sort kd")
+
+    await action_map(msg, f_bot).execute()
+    response = str(f_bot.send_message.call_args).replace("\\n", "\n")
+    assert 'Ranked by kd' in response
+    assert '1    | coolGuy | 3     | 2      | 1.5' in response
+
+
+@pytest.mark.asyncio
+async def test_cmd_leaderboard_empty(f_bot, f_pvp_testbed):
+    msg = fake_msg_gears("!leaderboard --days 1")
+
+    await action_map(msg, f_bot).execute()
+    f_bot.send_message.assert_called_with(
+        msg.channel, '__PVP Leaderboard__\n\nRanked by kills over the last 1 days\n\nNo recorded events.'
+    )
+
+
 @pytest.mark.asyncio
 async def test_cmd_stats(f_bot, f_pvp_testbed):
     msg = fake_msg_gears("!stats")
@@ -495,6 +516,19 @@ async def test_process_tempfile_fails(f_pvp_testbed, f_plog_zip, eddb_session, e
         assert 'Unsupported file type: /tmp/original.log' in coro.result()
 
 
+@pytest.mark.asyncio
+async def test_process_tempfile_clears_leaderboard(f_pvp_testbed, f_plog_file, eddb_session):
+    pvp.schema.clear_leaderboard_cache()
+    board = pvp.schema.get_leaderboard(eddb_session)
+    info = [{'attach_fname': '/tmp/original.log', 'fname': f_plog_file}]
+    with cfut.ProcessPoolExecutor(1) as pool:
+        logs = await pvp.actions.process_cmdr_tempfiles_async(pool=pool, cmdr_id=3, info=info)
+
+    assert 'CMDR shootsALot killed CMDR CanNotShoot at 2016-06-10 14:55:22' in logs
+    assert not pvp.schema.LEADERBOARD_CACHE
+    assert board is not pvp.schema.get_leaderboard(eddb_session)
+
+
 def test_get_privacy_versions():
     expect = [1.0, 2.0]
     found = pvp.actions.get_privacy_versions(cog.util.CONF.paths.privacy)
@@ -518,3 +552,25 @@ def test_process_filtered_archive(f_pvp_testbed, f_plog_filtered):
         pvp.actions.process_filtered_archive(fname=f_plog_filtered, cmdr_id=1, attach_fname='fixture_00.zip', log_fname=log.name)
         with open(log.name, 'r', encoding='utf-8') as fin:
             assert fin.read()
+
+
+def test_regenerate_checkpoint():
+    with tempfile.NamedTemporaryFile() as tfile:
+        assert set() == pvp.actions.load_regenerate_checkpoint(tfile.name)
+        pvp.actions.append_regenerate_checkpoint(tfile.name, {'hash'})
+        pvp.actions.append_regenerate_checkpoint(tfile.name, ['hash2', 'hash3'])
+        assert {'hash', 'hash2', 'hash3'} == pvp.actions.load_regenerate_checkpoint(tfile.name)
+
+    assert set() == pvp.actions.load_regenerate_checkpoint('/tmp/not_a_checkpoint_file')
+
+
+def test_prune_processed_archives():
+    cmdr_archives = {
+        1: {10: {'hash', 'hash3'}, 11: {'hash4'}},
+        2: {12: {'hash2'}},
+    }
+    expect = {
+        1: {10: {'hash', 'hash3'}},
+    }
+    assert expect == pvp.actions.prune_processed_archives(cmdr_archives, done_hashes={'hash', 'hash2', 'hash4'})
+    assert cmdr_archives == pvp.actions.prune_processed_archives(cmdr_archives, done_hashes=set())
@@ -0,0 +1,71 @@
+# pylint: disable=redefined-outer-name,missing-function-docstring,unused-argument
+"""
+Tests for pvp.bench
+"""
+import json
+import pathlib
+import shutil
+import tempfile
+
+import pytest
+
+import cogdb
+import pvp.bench
+from pvp.schema import PVPCmdr
+
+
+@pytest.fixture
+def f_work_dir():
+    work_dir = pathlib.Path(tempfile.mkdtemp(suffix='bench'))
+    yield work_dir
+    shutil.rmtree(work_dir)
+
+
+def test_scale_journal(f_work_dir):
+    journal = f_work_dir / 'Journal.bench.01.log'
+    assert 60 == pvp.bench.scale_journal(pvp.bench.TEMPLATE_JOURNAL, journal, num_lines=60)
+
+    with open(journal, 'r', encoding='utf-8') as fin:
+        lines = fin.readlines()
+    assert 60 == len(lines)
+    assert '"event":"Fileheader"' in lines[0]
+    kill_times = [json.loads(x)['timestamp'] for x in lines if '"event":"PVPKill"' in x]
+    assert 2 == len(kill_times)
+    assert kill_times[0] < kill_times[1]
+
+
+def test_count_lines(f_work_dir):
+    journal = f_work_dir / 'Journal.bench.01.log'
+    pvp.bench.scale_journal(pvp.bench.TEMPLATE_JOURNAL, journal, num_lines=30)
+    assert 30 == pvp.bench.count_lines(journal)
+
+
+def test_count_queries(f_pvp_testbed, eddb_session):
+    with pvp.bench.count_queries(cogdb.eddb_engine) as queries:
+        eddb_session.query(PVPCmdr).all()
+        eddb_session.query(PVPCmdr).all()
+
+    assert 2 == queries[0]
+
+
+def test_measure_filter_log(f_work_dir):
+    journal = f_work_dir / 'Journal.bench.01.log'
+    pvp.bench.scale_journal(pvp.bench.TEMPLATE_JOURNAL, journal, num_lines=100)
+
+    result = pvp.bench.measure('filter_log', journal=journal, work_dir=f_work_dir, cmdr_id=pvp.bench.BENCH_CMDR_ID)
+    assert 'filter_log' == result['stage']
+    assert 100 == result['events']
+    assert 0 == result['queries']
+    assert result['peak_rss_mb'] > 0
+    assert (f_work_dir / 'bench.filter.log').exists()
+
+
+def test_format_results():
+    results = [{
+        'lines': 1000, 'stage': 'parse', 'events': 500, 'seconds': 0.5,
+        'events_per_second': 1000.0, 'queries': 20, 'peak_rss_mb': 80.1,
+    }]
+    expect = """Lines | Stage | Events | Seconds | Events/s | Queries | Peak RSS (MB)
+----- | ----- | ------ | ------- | -------- | ------- | -------------
+1000  | parse | 500    | 0.5     | 1000.0   | 20      | 80.1"""
+    assert expect == pvp.bench.format_results(results)
@@ -4,7 +4,10 @@ Tests for pvp.schema
 """
 import tempfile
 import datetime
+import time
+
 import pytest
+from mock import patch
 
 import cog.exc
 import pvp.schema
@@ -163,6 +166,15 @@ def test_pvplog__repr__(f_pvp_testbed, eddb_session):
     assert "PVPLog(id=1, cmdr_id=1, func_used=0, file_hash='hash', filename='first.log', msg_id=1, filtered_msg_id=10, updated_at=1671655377)" == repr(log)
 
 
+def test_filtered_filename(f_pvp_testbed, eddb_session):
+    assert 'Journal.filter.log' == pvp.schema.filtered_filename('Journal.log')
+    assert 'logs.filter.zip' == pvp.schema.filtered_filename('logs.zip')
+    assert 'notes.txt' == pvp.schema.filtered_filename('notes.txt')
+
+    log = eddb_session.query(PVPLog).filter(PVPLog.id == 1).one()
+    assert 'first.filter.log' == log.filtered_filename
+
+
 def test_pvpmatch__repr__(f_pvp_testbed, eddb_session):
     match = eddb_session.query(PVPMatch).filter(PVPMatch.id == 1).one()
     assert "PVPMatch(id=1, limit=10, state=0, created_at=1671655377, updated_at=1671655377)" == repr(match)
@@ -339,6 +351,51 @@ def test_pvp_get_pvp_stats(f_pvp_testbed, eddb_session):
     assert '0' == stats[0]['value']
 
 
+def test_compute_leaderboard(f_pvp_testbed, eddb_session):
+    expect = [
+        {'rank': 1, 'cmdr_id': 1, 'name': 'coolGuy', 'kills': 3, 'deaths': 2, 'kill_ratio': 1.5, 'kos_kills': 0,
+         'interdictions': 2, 'interdiction_successes': 2},
+        {'rank': 2, 'cmdr_id': 2, 'name': 'shyGuy', 'kills': 1, 'deaths': 1, 'kill_ratio': 1.0, 'kos_kills': 0,
+         'interdictions': 1, 'interdiction_successes': 1},
+    ]
+    assert expect == pvp.schema.compute_leaderboard(eddb_session)
+    assert expect[:1] == pvp.schema.compute_leaderboard(eddb_session, sort_by='kd', limit=1)
+
+
+def test_compute_leaderboard_filtered(f_pvp_testbed, eddb_session):
+    board = pvp.schema.compute_leaderboard(eddb_session, system_id=1000)
+    assert [1] == [x['cmdr_id'] for x in board]
+    assert 2 == board[0]['kills']
+    assert 1 == board[0]['deaths']
+
+    board = pvp.schema.compute_leaderboard(eddb_session, sort_by='interdictions', after=1671655377 + 2)
+    assert [(1, 1, 1), (1, 2, 1)] == [(x['rank'], x['cmdr_id'], x['interdiction_successes']) for x in board]
+
+
+def test_get_leaderboard(f_pvp_testbed, eddb_session):
+    pvp.schema.clear_leaderboard_cache()
+    board = pvp.schema.get_leaderboard(eddb_session)
+    assert 3 == board[0]['kills']
+    assert board is pvp.schema.get_leaderboard(eddb_session)
+    assert not pvp.schema.get_leaderboard(eddb_session, days=1)
+
+    pvp.schema.update_kos_kills(eddb_session, kos_list=['LeSuck'])
+    assert not pvp.schema.LEADERBOARD_CACHE
+    assert 2 == pvp.schema.get_leaderboard(eddb_session, sort_by='kos')[0]['kos_kills']
+
+
+def test_get_leaderboard_window_moves(f_pvp_testbed, eddb_session):
+    pvp.schema.clear_leaderboard_cache()
+    board = pvp.schema.get_leaderboard(eddb_session, days=1)
+    assert board is pvp.schema.get_leaderboard(eddb_session, days=1)
+
+    # Next bucket computes the window again and drops the old board
+    later = time.time() + pvp.schema.LEADERBOARD_WINDOW_BUCKET
+    with patch('pvp.schema.time.time', return_value=later):
+        assert board is not pvp.schema.get_leaderboard(eddb_session, days=1)
+    assert 1 == len(pvp.schema.LEADERBOARD_CACHE)
+
+
 def test_pvp_get_event_cmdrs(f_pvp_testbed, eddb_session):
     found = pvp.schema.get_pvp_event_cmdrs(eddb_session, cmdr_ids=[1])
     expect = {
@@ -531,6 +588,30 @@ async def test_pvp_add_pvp_log(f_pvp_testbed, eddb_session):
         assert expect_hash == pvp_log.file_hash
 
 
+def test_pvp_add_pvp_log_hash(f_pvp_testbed, eddb_session):
+    pvp_log = pvp.schema.add_pvp_log_hash(eddb_session, 'hash', cmdr_id=2)
+    assert 1 == pvp_log.id
+    assert 1 == pvp_log.cmdr_id
+
+    pvp_log = pvp.schema.add_pvp_log_hash(eddb_session, 'new_hash', cmdr_id=2)
+    assert 2 == pvp_log.cmdr_id
+    assert 'new_hash' == pvp_log.file_hash
+    assert not pvp_log.msg_id
+
+
+def test_get_pvp_log_by_hash(f_pvp_testbed, eddb_session):
+    assert 1 == pvp.schema.get_pvp_log_by_hash(eddb_session, 'hash').id
+    assert not pvp.schema.get_pvp_log_by_hash(eddb_session, 'not_a_hash')
+
+
+def test_get_filtered_hashes_by_cmdr(f_pvp_testbed, eddb_session):
+    expect = {
+        1: {10: {'hash'}},
+        2: {12: {'hash2'}},
+    }
+    assert expect == pvp.schema.get_filtered_hashes_by_cmdr(eddb_session)
+
+
 def test_pvp_add_pvp_match(f_pvp_testbed, eddb_session):
     old_match = eddb_session.query(PVPMatch).order_by(PVPMatch.id.desc()).limit(1).one()
     assert 10 != old_match.limit
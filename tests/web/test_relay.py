@@ -0,0 +1,86 @@
+# pylint: disable=redefined-outer-name,missing-function-docstring,unused-argument
+"""
+Tests for web.relay
+"""
+import asyncio
+import json
+import pathlib
+import shutil
+import tempfile
+
+import pytest
+
+import web.relay
+
+
+class FakeClient():
+    """
+    Stands in for the rpc client, acknowledges with the acks given in order then True.
+    An exception in acks is raised instead.
+    """
+    def __init__(self, acks=None):
+        self.acks = acks if acks else []
+        self.sent = []
+        self.call = self
+
+    async def remote_func(self, scanner, timestamp):
+        self.sent += [(scanner, timestamp)]
+        ack = self.acks.pop(0) if self.acks else True
+        if isinstance(ack, Exception):
+            raise ack
+
+        return ack
+
+
+@pytest.fixture
+def f_relay():
+    work_dir = pathlib.Path(tempfile.mkdtemp(suffix='relay'))
+    relay = web.relay.PostRelay(work_dir / 'posts.json', window=0.05, retry=0.05)
+    relay.client = FakeClient()
+    yield relay
+    if relay.task:
+        relay.task.cancel()
+    shutil.rmtree(work_dir)
+
+
+@pytest.mark.asyncio
+async def test_post_relay_coalesce(f_relay):
+    f_relay.add('hudson_cattle', 1)
+    f_relay.add('hudson_cattle', 2)
+    f_relay.add('hudson_undermine', 5)
+    await f_relay.task
+
+    assert f_relay.client.sent == [('hudson_cattle', 2), ('hudson_undermine', 5)]
+    assert not f_relay.pending
+    with f_relay.fname.open('r', encoding='utf-8') as fin:
+        assert json.load(fin) == {}
+
+
+@pytest.mark.asyncio
+async def test_post_relay_load(f_relay):
+    f_relay.add('hudson_cattle', 1)
+    f_relay.add('hudson_cattle', 2)
+    f_relay.task.cancel()
+
+    # Restarted relay picks up the pending POST and delivers it
+    relay = web.relay.PostRelay(f_relay.fname, window=0.05, retry=0.05)
+    assert relay.pending == {'hudson_cattle': 2}
+    relay.client = FakeClient()
+    relay.start()
+    await relay.task
+
+    assert relay.client.sent == [('hudson_cattle', 2)]
+    assert not relay.pending
+
+
+@pytest.mark.asyncio
+async def test_post_relay_retry(f_relay):
+    f_relay.client = FakeClient([asyncio.TimeoutError(), False])
+    f_relay.add('hudson_cattle', 1)
+    await f_relay.task
+
+    # Retried until acknowledged, then dropped
+    assert f_relay.client.sent == [('hudson_cattle', 1)] * 3
+    assert not f_relay.pending
+    with f_relay.fname.open('r', encoding='utf-8') as fin:
+        assert json.load(fin) == {}
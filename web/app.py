@@ -1,5 +1,5 @@
 """
-Run a simple server to accept POSTs. Pass POSTs received into the bot over zmq pub/sub.
+Run a simple server to accept POSTs. Relay POSTs received into the bot over zmq rpc, see web.relay.
 
 Async replacement for Flask called Sanic
     https://sanic.readthedocs.io/en/latest/
@@ -14,18 +14,15 @@ Tutorial:
     https://www.digitalocean.com/community/tutorials/how-to-deploy-python-wsgi-apps-using-gunicorn-http-server-behind-nginx
 """
 import asyncio
-import atexit
+import collections
 import datetime
-import functools
 import logging
 import logging.handlers
 import json
 import os
 import tempfile
-import time
+import threading
 
-import aiozmq
-import aiozmq.rpc
 from jinja2 import Template
 import sanic
 import sanic.response
@@ -38,21 +35,20 @@ except ImportError:
 import cog.util
 import cogdb
 import cogdb.query
+import web.relay
 
 
 app = sanic.Sanic('cogweb')
-ADDR = 'tcp://127.0.0.1:{}'.format(cog.util.CONF.ports.zmq)
 LOG_FILE = os.path.join(tempfile.gettempdir(), 'posts')
-PUB = None
-RECV = []
+RECV = collections.deque(maxlen=20)
 CHART_FMT = "%y/%m/%d %H:%M:%S"
 TEMPLATES = {}
+VOTE_CACHE = {}  # (start, end) -> (marker, computed_at, data), see cached_vote_data
+VOTE_CACHE_LOCK = threading.Lock()
+VOTE_CACHE_MAX = 64  # Ranges kept, the oldest computed is dropped first
 
 
-def pub_close(pub):
-    """ Simple atexit hook. """
-    pub.close()
-    time.sleep(0.5)
+RELAY = web.relay.PostRelay()
 
 
 def init_log():
@@ -88,6 +84,59 @@ def get_vote_data(session, start=None, end=None):
     return data
 
 
+def cached_vote_data(start, end):
+    """
+    Retrieve the vote data for a range, reusing the last result while no Consolidation was added.
+    A range that had ended when it was computed is never recomputed.
+    Blocking, run in an executor.
+
+    Args:
+        start: The datetime (UTC) to get data after.
+        end: The datetime (UTC) to get data before.
+
+    Returns: (marker, data), the marker of the latest Consolidation the data includes and the vote data.
+    """
+    key = (start, end)
+    with cogdb.session_scope(cogdb.Session) as session:
+        marker = cogdb.query.get_consolidation_marker(session)
+        with VOTE_CACHE_LOCK:
+            cached = VOTE_CACHE.get(key)
+        if cached and (cached[0] == marker or end <= cached[1]):
+            return cached[0], cached[2]
+
+        data = get_vote_data(session, start, end)
+
+    with VOTE_CACHE_LOCK:
+        VOTE_CACHE.pop(key, None)
+        VOTE_CACHE[key] = (marker, datetime.datetime.utcnow(), data)
+        while len(VOTE_CACHE) > VOTE_CACHE_MAX:
+            del VOTE_CACHE[next(iter(VOTE_CACHE))]
+
+    return marker, data
+
+
+async def vote_response(request, start, end, *, render=None):
+    """
+    Respond with the vote data for a range, answering 304 if the client has the current data.
+    The ETag covers the range as well as the marker, a new cycle never matches the last one.
+
+    Args:
+        request: The request object for sanic.
+        start: The datetime (UTC) to get data after.
+        end: The datetime (UTC) to get data before.
+        render: If set, a function that renders the data to html. Otherwise respond with json.
+    """
+    marker, data = await asyncio.get_event_loop().run_in_executor(None, cached_vote_data, start, end)
+    etag = f'"{marker}-{int(start.timestamp())}-{int(end.timestamp())}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if request.headers.get('If-None-Match') == etag:
+        return sanic.response.empty(status=304, headers=headers)
+
+    if render:
+        return sanic.response.html(render(data), headers=headers)
+    return sanic.response.json(data, headers=headers)
+
+
 @app.route('/vote', methods=['GET'])
 async def vote(request):
     """
@@ -96,10 +145,11 @@ async def vote(request):
     cur_cycle = cog.util.current_cycle()
     start = cog.util.cycle_to_start(cur_cycle)
     end = start + datetime.timedelta(weeks=1)
-    with cogdb.session_scope(cogdb.Session) as session:
-        data = get_vote_data(session, start, end)
 
-    return sanic.response.html(TEMPLATES['vote'].render(request=request, data=data, cycle=cur_cycle))
+    def render(data):
+        return TEMPLATES['vote'].render(request=request, data=data, cycle=cur_cycle)
+
+    return await vote_response(request, start, end, render=render)
 
 
 @app.route('/data/voteRange/<start:int>/<end:int>', methods=['GET'])
@@ -113,8 +163,7 @@ async def vote_range(request, start, end):
     """
     start = datetime.datetime.utcfromtimestamp(start)
     end = datetime.datetime.utcfromtimestamp(end)
-    with cogdb.session_scope(cogdb.Session) as session:
-        return sanic.response.json(get_vote_data(session, start, end))
+    return await vote_response(request, start, end)
 
 
 @app.route('/data/voteCycle/<cycle:int>', methods=['GET'])
@@ -127,30 +176,26 @@ async def vote_cycle(request, cycle):
     """
     start = cog.util.cycle_to_start(cycle)
     end = start + datetime.timedelta(weeks=1)
-    with cogdb.session_scope(cogdb.Session) as session:
-        return sanic.response.json(get_vote_data(session, start, end))
+    return await vote_response(request, start, end)
+
+
+@app.listener('after_server_start')
+async def start_relay(app, loop):
+    """ Resume relaying POSTs left pending by a previous run. """
+    RELAY.start()
 
 
 @app.route('/post', methods=['GET', 'POST'])
 async def post(request):
     """ Handle post requests. """
-    global PUB
-    if not PUB:
-        PUB = await aiozmq.rpc.connect_pubsub(bind=ADDR)
-        atexit.register(functools.partial(pub_close, PUB))
-
     if request.method == 'POST':
         data = request.json
         log = logging.getLogger('posts')
         log.info('%s %s', str(request), data)
-
-        global RECV
-        RECV.insert(0, data)
-        RECV = RECV[:20]
+        RECV.appendleft(data)
 
         try:
-            log.info('Publishing for scanner %s', data['scanner'])
-            await PUB.publish('POSTs').remote_func(data['scanner'], data['time'])
+            RELAY.add(data['scanner'], data['time'])
         except KeyError:
             log.error('JSON request malformed ...' + str(data))
 
@@ -167,7 +212,7 @@ def main():
     init_log()
     port = cog.util.CONF.ports.sanic
     print("Sanic server listening on:", port)
-    print("ZMQ pub/sub binding on:", ADDR)
+    print("ZMQ rpc binding on:", web.relay.ADDR)
 
     # Populate a templates cache myself for use later to render html.
     with open(cog.util.rel_to_abs('web', 'templates', 'vote.html'), 'r', encoding='utf-8') as fin:
@@ -1,23 +1,24 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-Simple zmq publisher of fake data for testing.
+Simple zmq rpc client sending fake POSTs to the bot's scheduler for testing.
 """
 import asyncio
 
 import aiozmq
+import aiozmq.rpc
 
 import web.azmq
 
 
 async def pub():
-    """ Create publisher and begin sending. """
-    publisher = await aiozmq.rpc.connect_pubsub(connect=web.azmq.ADDR)
+    """ Create rpc client and begin sending. """
+    publisher = await aiozmq.rpc.connect_rpc(bind=web.azmq.ADDR)
     for step in range(20):
-        await publisher.publish('POSTs').remote_func(step, 1, 2)
+        print('Acknowledged:', await publisher.call.remote_func(f'scanner_{step}', step))
         await asyncio.sleep(2)
 
-    print("Finished publishing messages.")
+    print("Finished sending messages.")
     publisher.close()
     await publisher.wait_closed()
 
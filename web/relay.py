@@ -0,0 +1,130 @@
+"""
+Relay sheet change POSTs received by web.app to the bot over zmq rpc.
+"""
+import asyncio
+import atexit
+import functools
+import json
+import logging
+import pathlib
+import time
+
+import aiozmq
+import aiozmq.rpc
+
+import cog.util
+
+ADDR = f'tcp://127.0.0.1:{cog.util.CONF.ports.zmq}'
+POST_QUEUE = cog.util.rel_to_abs('data', 'posts_pending.json')
+POST_WINDOW = 5  # Seconds POSTs for a scanner are coalesced before relaying
+POST_RETRY = 10  # Seconds to wait before retrying unacknowledged POSTs
+POST_TIMEOUT = 5  # Seconds to wait for the bot to acknowledge a POST
+
+
+def client_close(client):
+    """ Simple atexit hook. """
+    client.close()
+    time.sleep(0.5)
+
+
+class PostRelay():
+    """
+    Relay sheet change POSTs to the bot's cog.scheduler.Scheduler.
+
+    - POSTs for a scanner are coalesced over a window, only the latest is relayed.
+    - Pending POSTs are persisted to a file on every change, they survive a restart.
+    - A POST is only dropped once the bot acknowledges it, otherwise it is retried.
+    """
+    def __init__(self, fname=POST_QUEUE, *, window=POST_WINDOW, retry=POST_RETRY, timeout=POST_TIMEOUT):
+        self.fname = pathlib.Path(fname)
+        self.window = window
+        self.retry = retry
+        self.timeout = timeout
+        self.pending = {}  # scanner -> timestamp
+        self.client = None
+        self.task = None
+        self.load()
+
+    def __str__(self):
+        return f"POSTs pending: {len(self.pending)}"
+
+    def load(self):
+        """
+        Load the POSTs persisted by a previous run.
+        """
+        try:
+            with self.fname.open('r', encoding='utf-8') as fin:
+                self.pending = json.load(fin)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.pending = {}
+
+    def save(self):
+        """
+        Atomically persist the pending POSTs.
+        """
+        temp = self.fname.with_suffix('.tmp')
+        with temp.open('w', encoding='utf-8') as fout:
+            json.dump(self.pending, fout)
+        temp.replace(self.fname)
+
+    def add(self, scanner, timestamp):
+        """
+        Queue a POST to relay, replacing any pending for the same scanner.
+
+        Args:
+            scanner: The name of the scanner to schedule.
+            timestamp: The time of the change sent with the POST.
+        """
+        self.pending[scanner] = timestamp
+        self.save()
+        self.start()
+
+    def start(self):
+        """
+        Start relaying pending POSTs if not already running.
+        """
+        if self.pending and (not self.task or self.task.done()):
+            self.task = asyncio.ensure_future(self.relay())
+
+    async def connect(self):
+        """
+        Bind the rpc client the bot's scheduler connects to.
+        """
+        if not self.client:
+            self.client = await aiozmq.rpc.connect_rpc(bind=ADDR, timeout=self.timeout)
+            atexit.register(functools.partial(client_close, self.client))
+
+    async def send(self, scanner, timestamp):
+        """
+        Send one POST to the bot and drop it from pending once acknowledged.
+        A newer POST for the scanner received meanwhile stays pending.
+
+        Returns: True if the bot acknowledged the POST.
+        """
+        log = logging.getLogger('posts')
+        try:
+            log.info('Relaying for scanner %s', scanner)
+            acked = await self.client.call.remote_func(scanner, timestamp)
+        except (asyncio.TimeoutError, aiozmq.rpc.Error) as exc:
+            log.warning('POST for scanner %s not acknowledged: %r', scanner, exc)
+            return False
+
+        if acked and self.pending.get(scanner) == timestamp:
+            del self.pending[scanner]
+            self.save()
+
+        return bool(acked)
+
+    async def relay(self):
+        """
+        Wait out the window then relay pending POSTs until all are acknowledged.
+        """
+        await asyncio.sleep(self.window)
+        await self.connect()
+        while self.pending:
+            for scanner, timestamp in list(self.pending.items()):
+                if not await self.send(scanner, timestamp):
+                    break
+
+            if self.pending:
+                await asyncio.sleep(self.retry)